@@ -2,10 +2,13 @@ import sys
 import os
 import json
 import pygame
+from concurrent.futures import ProcessPoolExecutor
 
 from scripts.utils import load_images
-from scripts.tilemap import Tilemap
+from scripts.tilemap import Tilemap, TERRAIN_LAYER
+from scripts.config import MAP_LAYERS
 from scripts.utils import render_centered_text
+from scripts.level_analyzer import analyze_map
 
 RENDER_SCALE = 3.0
 SAVE_STATE_PATH = "data/editor_state.txt"
@@ -77,6 +80,22 @@ class Editor:
         self.flip_x = False
         self.flip_y = False
         self.brush_size = 1
+        self.auto_retile = False
+
+        # Layers in draw order, the ones behind the terrain first, edits go to the selected one
+        self.layer_names = [name for name in MAP_LAYERS if not MAP_LAYERS[name]['front']] + [TERRAIN_LAYER] + [name for name in MAP_LAYERS if MAP_LAYERS[name]['front']]
+        self.layer = TERRAIN_LAYER
+
+        # Every save is checked for unreachable enemies and pickups in a worker process, the editor never waits for it
+        self.analyzer = None
+        self.analysis = None
+        self.problems = None
+        self.warnings = None
+
+    # Returns the tilemap of the layer being edited and the scroll it is drawn at, which differs for parallax layers
+    def active_layer(self, render_scroll):
+        parallax = MAP_LAYERS[self.layer]['parallax'] if self.layer in MAP_LAYERS else 1.0
+        return self.tilemap.get_layer(self.layer), (int(render_scroll[0] * parallax), int(render_scroll[1] * parallax))
 
     # Draws minimap in the upper right coorner
     def draw_minimap(self):
@@ -93,17 +112,26 @@ class Editor:
         self.display.blit(minimap_surface, (self.display.get_width() - width - 2, 2))
 
     # Allows placement of one to mutiple tiles depending on the size of the brush
-    def apply_brush(self, tile_pos):
+    def apply_brush(self, layer, tile_pos):
+        changed = []
         for dy in range(self.brush_size):
             for dx in range(self.brush_size):
                 px, py = tile_pos[0] + dx, tile_pos[1] + dy
-                self.tilemap.tilemap[f"{px};{py}"] = {
+                # While auto retiling, leave tiles of the brush type alone so held clicks don't undo the retile
+                if self.auto_retile:
+                    tile = layer.get_tile((px, py))
+                    if tile and tile['type'] == self.tile_list[self.tile_group]:
+                        continue
+                if layer.set_tile({
                     'type': self.tile_list[self.tile_group],
                     'variant': self.tile_variant,
                     'pos': (px, py),
                     'flip_x': self.flip_x,
                     'flip_y': self.flip_y
-                }
+                }):
+                    changed.append((px, py))
+        if self.auto_retile and changed:
+            layer.autotile_cells(changed)
 
     def run(self):
         while True:
@@ -113,7 +141,10 @@ class Editor:
             self.scroll[1] += (self.movement[3] - self.movement[2]) * 3           
             render_scroll = (int(self.scroll[0]), int(self.scroll[1]))
             
+            self.tilemap.tick()
             self.tilemap.render(self.display, offset = render_scroll)
+            self.tilemap.render_front(self.display, offset = render_scroll)
+            layer, layer_scroll = self.active_layer(render_scroll)
             
             original_img = self.assets[self.tile_list[self.tile_group]][self.tile_variant]
             # Allows for flipping of the asset horizontally and vertically
@@ -124,7 +155,7 @@ class Editor:
             mpos = pygame.mouse.get_pos()
             mpos = (mpos[0] / RENDER_SCALE, mpos[1] / RENDER_SCALE)
             
-            tile_pos = (int((mpos[0] + self.scroll[0]) // self.tilemap.tile_size), int((mpos[1] + self.scroll[1]) // self.tilemap.tile_size))
+            tile_pos = (int((mpos[0] + layer_scroll[0]) // self.tilemap.tile_size), int((mpos[1] + layer_scroll[1]) // self.tilemap.tile_size))
             
             # Display the brush overlay of tile(s)
             if self.ongrid:
@@ -132,26 +163,22 @@ class Editor:
                     for dx in range(self.brush_size):
                         px = tile_pos[0] + dx
                         py = tile_pos[1] + dy
-                        draw_x = px * self.tilemap.tile_size - self.scroll[0]
-                        draw_y = py * self.tilemap.tile_size - self.scroll[1]
+                        draw_x = px * self.tilemap.tile_size - layer_scroll[0]
+                        draw_y = py * self.tilemap.tile_size - layer_scroll[1]
                         self.display.blit(current_tile_img, (draw_x, draw_y))
             else:
                 self.display.blit(current_tile_img, mpos)
             # Use brush on the grid    
             if self.clicking and self.ongrid:
-                self.apply_brush(tile_pos)
+                self.apply_brush(layer, tile_pos)
 
             if self.right_clicking:
-                tile_loc = str(tile_pos[0]) + ';' + str(tile_pos[1])
                 # Remove on grid tiles  
-                if tile_loc in self.tilemap.tilemap:
-                    del self.tilemap.tilemap[tile_loc]
-                # Remove off grid tiles
-                for tile in self.tilemap.offgrid_tiles.copy():
-                    tile_img = self.assets[tile['type']][tile['variant']]
-                    tile_r = pygame.Rect(tile['pos'][0] - self.scroll[0], tile['pos'][1] - self.scroll[1], tile_img.get_width(), tile_img.get_height())
-                    if tile_r.collidepoint(mpos):
-                        self.tilemap.offgrid_tiles.remove(tile)
+                if layer.remove_tile(tile_pos) and self.auto_retile:
+                    layer.autotile_cells([tile_pos])
+                # Remove off grid tiles under the mouse, looked up in the offgrid spatial index
+                for tile in layer.offgrid_at((mpos[0] + layer_scroll[0], mpos[1] + layer_scroll[1])):
+                    layer.remove_offgrid(tile)
                     
             self.display.blit(current_tile_img, (5,5))
             
@@ -165,10 +192,10 @@ class Editor:
                     if event.button == 1:
                         self.clicking = True
                         if not self.ongrid:
-                            self.tilemap.offgrid_tiles.append({
+                            layer.add_offgrid({
                             'type': self.tile_list[self.tile_group],
                             'variant': self.tile_variant,
-                            'pos': (mpos[0] + self.scroll[0], mpos[1] + self.scroll[1]),
+                            'pos': (mpos[0] + layer_scroll[0], mpos[1] + layer_scroll[1]),
                             'flip_x': self.flip_x,
                             'flip_y': self.flip_y
                             })
@@ -210,8 +237,17 @@ class Editor:
                         self.ongrid = not self.ongrid
                     if event.key == pygame.K_o:
                         self.tilemap.save(self.map_files[self.current_map_index])
+                        if self.analyzer is None:
+                            self.analyzer = ProcessPoolExecutor(max_workers=1)
+                        self.analysis = self.analyzer.submit(analyze_map, self.map_files[self.current_map_index])
                     if event.key == pygame.K_t:
-                        self.tilemap.autotile()
+                        layer.autotile()
+                    # Toggles retiling the painted area after every brush stroke
+                    if event.key == pygame.K_r:
+                        self.auto_retile = not self.auto_retile
+                    # Cycles the layer being edited
+                    if event.key == pygame.K_l:
+                        self.layer = self.layer_names[(self.layer_names.index(self.layer) + 1) % len(self.layer_names)]
                     # For holding shift for mousewheel functionality
                     if event.key == pygame.K_LSHIFT:
                         self.shift = True
@@ -229,11 +265,15 @@ class Editor:
                     if event.key == pygame.K_LEFTBRACKET:
                         self.current_map_index = (self.current_map_index - 1) % len(self.map_files)
                         self.tilemap.load(self.map_files[self.current_map_index])
+                        self.problems = None
+                        self.warnings = None
                         with open(SAVE_STATE_PATH, "w") as f:
                             f.write(str(self.current_map_index))                 
                     if event.key == pygame.K_RIGHTBRACKET:
                         self.current_map_index = (self.current_map_index + 1) % len(self.map_files)
                         self.tilemap.load(self.map_files[self.current_map_index])
+                        self.problems = None
+                        self.warnings = None
                         with open(SAVE_STATE_PATH, "w") as f:
                             f.write(str(self.current_map_index))
                 # Handles lifting off of keys to enable holding them down
@@ -249,14 +289,33 @@ class Editor:
                     if event.key == pygame.K_LSHIFT:
                         self.shift = False
 
+            # Reports the check of the last save once the worker has finished it
+            if self.analysis is not None and self.analysis.done():
+                try:
+                    path, self.problems, self.warnings, _ = self.analysis.result()
+                    for message in self.problems + self.warnings:
+                        print(f"[Warning] {path}: {message}")
+                except Exception as e:
+                    print(f"[Warning] Could not check the map: {e}")
+                self.analysis = None
+
             # Draw minimap and level number text
             self.draw_minimap()
             map_name = os.path.basename(self.map_files[self.current_map_index])
             render_centered_text(self.display, f"Level: {map_name}", self.font, 12, (255, 255, 255), 6, False)
+            render_centered_text(self.display, f"Layer: {self.layer}", self.font, 12, (255, 255, 255), 30, False)
+            if self.auto_retile:
+                render_centered_text(self.display, "Auto retile", self.font, 12, (255, 255, 255), 18, False)
+            if self.problems:
+                render_centered_text(self.display, f"Problems: {len(self.problems)}", self.font, 12, (255, 255, 255), 42, False)
+            elif self.warnings:
+                render_centered_text(self.display, f"Possibly unreachable: {len(self.warnings)}", self.font, 12, (255, 255, 255), 42, False)
             
             # Draw screen and update
             self.screen.blit(pygame.transform.scale(self.display, self.screen.get_size()), (0, 0))
             pygame.display.update()
             self.clock.tick(60)
 
-Editor().run()
\ No newline at end of file
+# Worker processes import this file too, only the main process opens the editor
+if __name__ == '__main__':
+    Editor().run()
\ No newline at end of file
@@ -6,8 +6,15 @@ import pygame
 import json
 
 from scripts.utils import  start_menu, show_message_screen
-from scripts.game_utils import load_assets, load_sounds, play_music, render_game_ui, setup_tutorials, load_level, create_player, handle_enemies, handle_projectiles, handle_input, handle_pickups, spawn_particles, check_character_unlocks, stop_dedicated_channels
+from scripts.game_utils import load_assets, load_sounds, play_music, render_game_ui, setup_tutorials, load_level, restart_level, prepare_level, hot_reload, create_player, handle_enemies, handle_projectiles, handle_input, handle_pickups, spawn_particles, check_character_unlocks, stop_dedicated_channels
 from scripts.tilemap import Tilemap
+from scripts.outline import OutlineSurface
+from scripts.damage import DamageSurface
+from scripts.level_prefetch import LevelPrefetcher
+from scripts.map_watch import MapWatcher
+from scripts.map_render import ThumbnailCache
+from scripts.presenter import Presenter
+from scripts.surface_pool import SurfacePool
 from scripts.clouds import Clouds
 from scripts.config import STAGE_THEMES
 from scripts.sparrows import Sparrows
@@ -23,9 +30,13 @@ class Game:
         pygame.display.set_caption('Ninja Hiro')
         pygame.mixer.set_num_channels(32)  
         self.screen = pygame.display.set_mode((WIDTH * 3, HEIGHT * 3))
-        self.display = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
-        self.display_2 = pygame.Surface((WIDTH, HEIGHT))
+        self.display = OutlineSurface((WIDTH, HEIGHT))
+        # Both layers keep track of where they were drawn onto, so presenting sends only the parts of the window that changed
+        self.display_2 = DamageSurface((WIDTH, HEIGHT))
+        self.presenter = Presenter(self.screen)
         self.clock = pygame.time.Clock()
+        # Scratch surfaces for effects drawn each frame, all handed back at the start of the next
+        self.surface_pool = SurfacePool()
 
         self.save_slot = None
         self.save_data = None        
@@ -41,6 +52,10 @@ class Game:
 
         # Assigns tilemap, including tile size for the game
         self.tilemap = Tilemap(self, tile_size=16)
+        # Loads the next level in the background while the current one is played, closing levels prepared for nothing
+        self.prefetcher = LevelPrefetcher(lambda map_id: prepare_level(self, map_id), lambda prepared: prepared['tilemap'].close())
+        # Watches the maps so a level saved in the editor reloads while it is played
+        self.map_watcher = MapWatcher()
  
         # Read character data
         with open("data/characters.json") as f:
@@ -49,6 +64,7 @@ class Game:
         # Visual and sound assets
         self.assets = load_assets()
         self.sfx = load_sounds()
+        self.thumbnails = ThumbnailCache(self)
         self.dedicated_channels = {
             "ambience": pygame.mixer.Channel(5),
             "smoke_bomb": pygame.mixer.Channel(6),
@@ -64,7 +80,7 @@ class Game:
         self.clouds = Clouds(self.assets['clouds'], self.screen.get_height(), count=6)
 
         # Sorted maps for main menu selection
-        self.map_files = sorted(os.listdir('data/maps'), key=lambda f: int(f.split('.')[0]))
+        self.map_files = sorted([f for f in os.listdir('data/maps') if f.endswith('.json')], key=lambda f: int(f.split('.')[0]))
 
     # Loads user save data, used for unlocked characters, unlocked levels and best times
     def load_save(self, slot):
@@ -125,8 +141,10 @@ class Game:
 
         while True:
             self.display.fill((0, 0, 0, 0))
+            self.surface_pool.reset()
             self.display_2.blit(self.assets['background'], (0, 0))
             self.screenshake = max(0, self.screenshake - 1)
+            hot_reload(self)
             
             # Goes to next level when all enemies are defeated
             if not len(self.enemies):
@@ -141,7 +159,7 @@ class Game:
                 if self.transition > 45:
                     # Play END screen if all levels complete
                     if self.level >= len(self.map_files) - 1:
-                        show_message_screen(self.screen, "data/images/backgrounds/HiroReturn.png", self.font_path, title="Welcome Home!", subtitle="A brief rest after clearing the nearby castle, but a greater evil yet lurks...") # おめでとう！
+                        show_message_screen(self.presenter.window(), "data/images/backgrounds/HiroReturn.png", self.font_path, title="Welcome Home!", subtitle="A brief rest after clearing the nearby castle, but a greater evil yet lurks...") # おめでとう！
                         stop_dedicated_channels(self)
                         return "back_to_level_select"
                     # Else go to and unlock next level
@@ -161,13 +179,16 @@ class Game:
                 if self.dead >= 10:
                     self.transition = min(30, self.transition + 1)
                 if self.dead > 40:
-                    load_level(self, self.level)
+                    restart_level(self)
                     
             # Set Render Scroll to track the player near the center but at 1/3 from the bottom of the screen
             self.scroll[0] += (self.player.rect().centerx - self.display.get_width() / 2 - self.scroll[0] + 24) / 30
             target_y = self.display.get_height() * (2/3)
             self.scroll[1] += (self.player.rect().centery - target_y - self.scroll[1]) / 12
             render_scroll = (int(self.scroll[0]), int(self.scroll[1]))
+
+            # Keep the chunks around the view and the player loaded on large streamed levels
+            self.tilemap.stream_view(render_scroll, self.display.get_size(), self.player.pos)
             
             # Draw in normal leaf spawner effects
             spawn_particles(self, self.leaf_spawners)
@@ -190,7 +211,8 @@ class Game:
                 self.rain.update()
                 self.rain.render(self.display_2, offset=render_scroll)
 
-            # Draw the tilemap
+            # Draw the tilemap, animated tiles moving on to their next frame
+            self.tilemap.tick()
             self.tilemap.render(self.display, offset=render_scroll)
 
             # Draw in any solid crumble blocks
@@ -239,12 +261,12 @@ class Game:
                 spark.render(self.display, offset=render_scroll)
                 if kill:
                     self.sparks.remove(spark)
+
+            # Draw the map layers that go in front of the player
+            self.tilemap.render_front(self.display, offset=render_scroll)
                     
             # Border outlines
-            display_mask = pygame.mask.from_surface(self.display)
-            display_sillhouette = display_mask.to_surface(setcolor=(0, 0, 0, 180), unsetcolor=(0, 0, 0, 0))
-            for offset in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
-                self.display_2.blit(display_sillhouette, offset)    
+            self.display.draw_outline(self.display_2)
            
             # Main event loop for player interaction
             input_result = handle_input(self, render_scroll)
@@ -255,7 +277,7 @@ class Game:
                  
             # Draws the transition            
             if self.transition:
-                transition_surf = pygame.Surface(self.display.get_size())
+                transition_surf = self.surface_pool.acquire(self.display.get_size())
                 pygame.draw.circle(transition_surf, (255, 255, 255), (self.display.get_width() // 2, self.display.get_height() // 2), (30 - abs(self.transition)) * 8)
                 transition_surf.set_colorkey((255, 255, 255))
                 self.display.blit(transition_surf, (0, 0))
@@ -267,8 +289,7 @@ class Game:
 
             # Draws the screen and screenshake
             screenshake_offset = (random.random() * self.screenshake - self.screenshake / 2, random.random() * self.screenshake - self.screenshake / 2)
-            self.screen.blit(pygame.transform.scale(self.display_2, self.screen.get_size()), screenshake_offset)
-            pygame.display.update()
+            self.presenter.present(self.display_2, offset=screenshake_offset, view=render_scroll)
             self.clock.tick(60)
 
             # Update timer
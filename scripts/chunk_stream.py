@@ -0,0 +1,113 @@
+import math
+import mmap
+from scripts.config import STREAMING
+from scripts.map_format import read_header, read_directory, read_chunk, read_extras, class_table, CHUNK_ENTRY
+from scripts.tile_chunks import CHUNK_SIZE
+
+# Keeps only the grid chunks around the camera loaded, reading them out of a mapped binary map as the view moves
+# Chunks load within load_margin chunks of the view, stretched ahead by look_ahead frames of camera movement,
+# and only unload once they are unload_margin chunks away, so a camera going back and forth does not reload them
+# Offgrid tiles and the baked collision rects stay resident, they are small next to the chunk arrays
+class ChunkStreamer:
+    def __init__(self, tilemap, path, load_margin=STREAMING['load_margin'], unload_margin=STREAMING['unload_margin'], look_ahead=STREAMING['look_ahead']):
+        self.tilemap = tilemap
+        self.path = path
+        self.load_margin = load_margin
+        self.unload_margin = max(unload_margin, load_margin)
+        self.look_ahead = look_ahead
+        self.file = None
+        self.data = None
+        self.directory = {}
+        self.classes = None
+        self.last_scroll = None
+        self.window = None
+
+    # Maps the file and reads everything but the chunks into the cleared tilemap, returns False if it does not match
+    def open(self, source_hash=None):
+        try:
+            self.file = open(self.path, 'rb')
+            self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            self.close()
+            return False
+        header = read_header(self.data, self.tilemap, source_hash)
+        if header is None:
+            self.close()
+            return False
+        chunk_count, offgrid_count, extras, offset = header
+        self.directory = read_directory(self.data, offset, chunk_count)
+        self.classes = class_table(self.tilemap)
+        read_extras(self.data, offset + CHUNK_ENTRY.size * chunk_count, offgrid_count, extras, self.tilemap)
+        return True
+
+    # Unmaps the file, the tilemap keeps whatever chunks are loaded
+    def close(self):
+        if self.data is not None:
+            self.data.close()
+            self.data = None
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    # Number of chunks in the whole map, loaded or not
+    def chunk_count(self):
+        return len(self.directory)
+
+    # Returns True if a chunk is inside the current load window, entities there are simulated
+    def is_resident(self, key):
+        if self.window is None:
+            return True
+        left, top, right, bottom = self.window
+        return left <= key[0] <= right and top <= key[1] <= bottom
+
+    # Loads the chunks around a view, stretched towards where the camera is heading, and unloads those left far behind
+    # A focus position, such as the player's, is kept loaded too while the camera is still catching up to it
+    def update(self, scroll, view_size, focus=None):
+        size = CHUNK_SIZE * self.tilemap.tile_size
+        if self.last_scroll is None:
+            velocity = (0, 0)
+        else:
+            velocity = (scroll[0] - self.last_scroll[0], scroll[1] - self.last_scroll[1])
+        self.last_scroll = (scroll[0], scroll[1])
+
+        # View in chunks, grown by the load margin on every side and by the look ahead on the side the camera moves to
+        margin = self.load_margin * size
+        left, top = scroll[0] - margin, scroll[1] - margin
+        right, bottom = scroll[0] + view_size[0] + margin, scroll[1] + view_size[1] + margin
+        ahead_x, ahead_y = velocity[0] * self.look_ahead, velocity[1] * self.look_ahead
+        if ahead_x < 0:
+            left += ahead_x
+        else:
+            right += ahead_x
+        if ahead_y < 0:
+            top += ahead_y
+        else:
+            bottom += ahead_y
+        if focus is not None:
+            left, top = min(left, focus[0] - margin), min(top, focus[1] - margin)
+            right, bottom = max(right, focus[0] + margin), max(bottom, focus[1] + margin)
+        window = (math.floor(left / size), math.floor(top / size), math.floor(right / size), math.floor(bottom / size))
+        if window == self.window:
+            return
+        self.window = window
+
+        chunks = self.tilemap.chunks
+        changed = []
+        for cy in range(window[1], window[3] + 1):
+            for cx in range(window[0], window[2] + 1):
+                entry = self.directory.get((cx, cy))
+                if entry is not None and (cx, cy) not in chunks:
+                    chunks[(cx, cy)] = read_chunk(self.data, entry[1], entry[0], self.tilemap, self.classes)
+                    changed.append((cx, cy))
+
+        # Hysteresis, a chunk only goes once it is further out than the unload margin
+        extra = self.unload_margin - self.load_margin
+        for key in list(chunks):
+            if not (window[0] - extra <= key[0] <= window[2] + extra and window[1] - extra <= key[1] <= window[3] + extra):
+                del chunks[key]
+                changed.append(key)
+
+        if changed:
+            self.tilemap.grid_index = None
+            for key in changed:
+                self.tilemap.render_cache.invalidate_chunk(key)
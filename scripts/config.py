@@ -5,6 +5,61 @@ DEFAULT_MUSIC_VOLUME = 0.2
 DEFAULT_SFX_VOLUME = 0.3
 MAX_RAMEN_DURATION = 15 * FPS
 
+# Seconds between checks of data/maps for saved changes, the level being played reloads in place when its map changes
+# 0 turns hot reloading off
+HOT_RELOAD_INTERVAL = 0.5
+
+# How the dark outline around everything on the draw layer is found each frame
+# 'cached' reuses the masks of baked tile chunks and reads back only what else was drawn, 'full' reads back the whole layer
+# every frame as the game always has, 'off' draws no outlines
+OUTLINE_QUALITY = 'cached'
+
+# How frames are scaled up to the window, 'scale', 'integer' or 'sdl', see scripts/presenter.py
+# python -m scripts.presenter times each one on this machine
+PRESENT_MODE = 'scale'
+
+# Bytes of flipped and scaled image copies kept for drawing, the least recently drawn go first past this
+TRANSFORM_CACHE_BYTES = 8 * 1024 * 1024
+
+# Alpha levels effect variants are made for, an alpha that changes every frame is rounded down to a multiple of this
+EFFECT_ALPHA_STEP = 8
+
+# Yurei are drawn at this scale, their alpha pulsing around the first value by up to the second
+YUREI_SCALE = 0.75
+YUREI_ALPHA = (140, 80)
+# Alpha of the spirit blessing flames
+DIVINE_FLAME_ALPHA = 80
+
+# Movement constants in pixels and frames, used by the entities and by the level analyzer so its reachability matches the game
+GRAVITY = 0.1
+MAX_FALL_SPEED = 5
+AIR_RESISTANCE = 0.1
+PLAYER_JUMPS = 2
+COYOTE_FRAMES = 4
+JUMP_VELOCITY = 3.1
+SLIDE_JUMP_BOOST = 1.3
+WALL_JUMP_VELOCITY = (3.5, 2.2)
+WALL_SLIDE_SPEED = 0.5
+SLIDE_SPEED = 2.0
+SLIDE_DECAY = 0.02
+DASH_SPEED = 8
+# A dash counts down from DASH_DURATION and moves the player for the first DASH_MOVE_FRAMES of it
+DASH_DURATION = 60
+DASH_MOVE_FRAMES = 10
+# Falling for longer than this kills the player
+FALL_DEATH_FRAMES = 180
+# Yurei seek the player from this far away, as long as they can see it
+YUREI_SIGHT = 180
+
+# Levels with at least min_chunks chunks stream them around the camera instead of keeping the whole map loaded
+# Margins are in chunks past the view, look_ahead in frames of camera movement loaded ahead of the camera
+STREAMING = {
+    'min_chunks': 256,
+    'load_margin': 1,
+    'unload_margin': 3,
+    'look_ahead': 30
+}
+
 ASSET_PATHS = {
     'tiles': [
         ('grass', 'tiles/grass'),
@@ -78,6 +133,20 @@ ASSET_PATHS = {
     }
 }
 
+# Map layers besides the terrain, in draw order, each a tilemap of its own with its own baked chunk surfaces
+# parallax is how far a layer scrolls for every pixel the camera moves, front layers are drawn over the player and entities
+# Colliding layers add their tiles to the rects entities collide with, the terrain always collides
+MAP_LAYERS = {
+    'background': {'parallax': 0.9, 'front': False, 'collision': False},
+    'foreground': {'parallax': 1.0, 'front': True, 'collision': False}
+}
+
+# Animated tile types, each of a type's variants lists the variants it cycles through as frames, duration is in frames
+# Every animated tile runs off the tilemap's one clock, variants without a frame list stay still
+# e.g. 'water': {'frames': [[0, 1, 2, 3]], 'duration': 8}
+ANIMATED_TILES = {
+}
+
 SFX_PATHS = {
     'jump': ('data/sfx/jump.wav', 0.2),
     'cloud_jump': ('data/sfx/cloud_jump.wav', 0.1),
@@ -0,0 +1,73 @@
+import threading
+import weakref
+import pygame
+
+# Images that never change once made, such as baked tile chunks and scaled backgrounds
+# Blitting one where it was blitted the frame before leaves the pixels under it as they were
+STEADY = weakref.WeakSet()
+# Thumbnails bake chunks on a worker thread while the menu draws, so the set is only touched holding this
+STEADY_LOCK = threading.Lock()
+
+# Marks an image as never changing, see STEADY
+def steady(surf):
+    with STEADY_LOCK:
+        STEADY.add(surf)
+    return surf
+
+# Returns True if an image was marked as never changing
+def is_steady(surf):
+    with STEADY_LOCK:
+        return surf in STEADY
+
+# Marks what pygame.draw drew onto a surface if it keeps track of damage, returning the rect like pygame.draw does
+def mark_drawn(surf, rect):
+    if isinstance(surf, DamageSurface):
+        surf.mark(rect)
+    return rect
+
+# A surface redrawn every frame that keeps track of where its pixels can have changed since the last frame, so presenting it
+# only has to send those areas to the window
+# Anything drawn counts, along with whatever was drawn the frame before since it may have moved away, except steady images
+# blitted exactly where they were last frame, which only count once they are blitted somewhere else or no longer at all
+# Drawing onto it with pygame.draw has to be marked by hand
+class DamageSurface(pygame.Surface):
+    def __init__(self, size, flags=0):
+        super().__init__(size, flags)
+        self.damage = []
+        self.last_damage = []
+        self.steady_blits = set()
+        self.last_steady_blits = set()
+
+    def fill(self, color, rect=None, special_flags=0):
+        result = super().fill(color, rect, special_flags)
+        self.damage.append(result)
+        return result
+
+    # A damage tracking source brings its own damage instead of counting as changed all over
+    def blit(self, source, dest, area=None, special_flags=0):
+        result = super().blit(source, dest, area, special_flags)
+        if isinstance(source, DamageSurface) and area is None:
+            self.damage += [rect.move(int(dest[0]), int(dest[1])) for rect in source.take_damage()]
+        elif area is None and not special_flags and is_steady(source):
+            self.steady_blits.add((source, int(dest[0]), int(dest[1])))
+        else:
+            self.damage.append(result)
+        return result
+
+    # Marks an area drawn onto some other way, such as the rect pygame.draw returns
+    def mark(self, rect):
+        self.damage.append(pygame.Rect(rect))
+
+    # Returns the areas that can have changed this frame, without ending the frame
+    def pending_damage(self):
+        rects = self.damage + self.last_damage
+        for source, x, y in self.steady_blits ^ self.last_steady_blits:
+            rects.append(pygame.Rect((x, y), source.get_size()))
+        return rects
+
+    # Returns the areas that can have changed this frame, and starts keeping track of the next one
+    def take_damage(self):
+        rects = self.pending_damage()
+        self.last_damage, self.damage = self.damage, []
+        self.last_steady_blits, self.steady_blits = self.steady_blits, set()
+        return rects
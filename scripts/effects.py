@@ -0,0 +1,59 @@
+import weakref
+import pygame
+from scripts.config import EFFECT_ALPHA_STEP, YUREI_SCALE, YUREI_ALPHA, DIVINE_FLAME_ALPHA
+from scripts.transform_cache import transforms
+
+# Effect variants of images, hit flashes and faded copies, made once per image and picked from when drawing
+# Variants are kept with their source image and go when it does, such as a flipped frame evicted from the transform cache
+class EffectCache:
+    def __init__(self):
+        self.variants = weakref.WeakKeyDictionary()
+
+    # Returns a variant, making it the first time it is asked for
+    def get(self, img, effect, make):
+        variants = self.variants.get(img)
+        if variants is None:
+            variants = self.variants[img] = {}
+        variant = variants.get(effect)
+        if variant is None:
+            variant = variants[effect] = make()
+        return variant
+
+    # The image brightened to white, as enemies flash while invulnerable
+    def flash(self, img):
+        def make():
+            variant = img.copy()
+            variant.fill((255, 255, 255, 0), special_flags=pygame.BLEND_RGBA_ADD)
+            return variant
+        return self.get(img, 'flash', make)
+
+    # The image drawn at a surface alpha
+    def faded(self, img, alpha):
+        def make():
+            variant = img.copy()
+            variant.set_alpha(alpha)
+            return variant
+        return self.get(img, alpha, make)
+
+# Rounds an alpha that changes every frame down to one of the levels variants are made for
+def quantize_alpha(alpha):
+    return alpha - alpha % EFFECT_ALPHA_STEP
+
+# The one cache every renderer draws its effect variants from
+effects = EffectCache()
+
+# Makes the effect variants enemies and buffs draw, every frame both ways round, so none is made in the middle of play
+def bake_effects(assets):
+    for key, animation in assets.items():
+        if key.startswith('oni/'):
+            for img in animation.images:
+                for flip in (False, True):
+                    effects.flash(transforms.get(img, flip))
+        elif key.startswith('yurei/'):
+            for img in animation.images:
+                for flip in (False, True):
+                    scaled_img = transforms.get(img, flip, scale=YUREI_SCALE)
+                    for alpha in range(quantize_alpha(YUREI_ALPHA[0] - YUREI_ALPHA[1]), YUREI_ALPHA[0] + YUREI_ALPHA[1] + 1, EFFECT_ALPHA_STEP):
+                        effects.flash(effects.faded(scaled_img, alpha))
+    for img in assets['particle/divine_flame'].images:
+        effects.faded(img, DIVINE_FLAME_ALPHA)
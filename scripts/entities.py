@@ -3,6 +3,15 @@ import random
 import pygame
 from scripts.particle import Particle
 from scripts.spark import Spark
+from scripts.damage import mark_drawn
+from scripts.transform_cache import transforms
+from scripts.effects import effects, quantize_alpha
+from scripts.config import (
+    GRAVITY, MAX_FALL_SPEED, AIR_RESISTANCE, PLAYER_JUMPS, COYOTE_FRAMES, JUMP_VELOCITY, SLIDE_JUMP_BOOST,
+    WALL_JUMP_VELOCITY, WALL_SLIDE_SPEED, SLIDE_SPEED, SLIDE_DECAY, DASH_SPEED, DASH_DURATION, DASH_MOVE_FRAMES, FALL_DEATH_FRAMES,
+    YUREI_SIGHT, YUREI_SCALE, YUREI_ALPHA, DIVINE_FLAME_ALPHA,
+)
+from scripts.tilemap import TILE_SOLID, TILE_HARMFUL
 
 # Base physic entity, all entities inherit from it
 class PhysicsEntity:
@@ -104,13 +113,13 @@ class PhysicsEntity:
         # Re-fetch updated rect after physics collision adjustment
         entity_rect = self.rect()
         # Apply gravity
-        self.velocity[1] = min(5, self.velocity[1] + 0.1)
+        self.velocity[1] = min(MAX_FALL_SPEED, self.velocity[1] + GRAVITY)
         # Update animations every frame
         self.animation.update()
         
     # Base render function
     def render(self, surf, offset=(0, 0)):
-        surf.blit(pygame.transform.flip(self.animation.img(), self.flip, False), (self.pos[0] - offset[0] + self.anim_offset[0], self.pos[1] - offset [1] + self.anim_offset[1]))
+        surf.blit(transforms.get(self.animation.img(), self.flip), (self.pos[0] - offset[0] + self.anim_offset[0], self.pos[1] - offset [1] + self.anim_offset[1]))
 
     # To let enemies treat spikes as walls
     def spike_collisions(self):
@@ -122,7 +131,7 @@ class BasePlayer(PhysicsEntity):
         super().__init__(game, 'player', pos, size)
         self.set_action('idle')        
         self.air_time = 0
-        self.jumps = 2
+        self.jumps = PLAYER_JUMPS
         self.wall_slide = False
         self.was_grounded = 0
         self.spike_grace_timer = 0
@@ -181,7 +190,7 @@ class BasePlayer(PhysicsEntity):
         if self.sliding:
             # Apply decaying movement speed during a slide
             if abs(self.velocity[0]) > 0.2:
-                decay_rate = 0.02  # slower decay
+                decay_rate = SLIDE_DECAY  # slower decay
                 if self.velocity[0] > 0:
                     self.velocity[0] = max(self.velocity[0] - decay_rate, 0)
                 elif self.velocity[0] < 0:
@@ -205,8 +214,8 @@ class BasePlayer(PhysicsEntity):
         # Reset jumps, air time and grounded timer when on a tile
         if self.collisions['down']:
             self.air_time = 0
-            self.jumps = 2
-            self.was_grounded = 4
+            self.jumps = PLAYER_JUMPS
+            self.was_grounded = COYOTE_FRAMES
         # Else increment air time and decrement grounded grace period timer
         elif self.was_grounded > 0:
             self.air_time += 1            
@@ -216,7 +225,7 @@ class BasePlayer(PhysicsEntity):
             self.air_time += 1
 
         # Lose a ground jump if you leave the ground, small 4 frame grace window
-        if self.jumps == 2 and self.air_time > 4 and not self.collisions['down']:
+        if self.jumps == PLAYER_JUMPS and self.air_time > COYOTE_FRAMES and not self.collisions['down']:
             self.jumps -= 1
 
         #  Animation Logic, sliding first
@@ -226,7 +235,7 @@ class BasePlayer(PhysicsEntity):
         elif (self.collisions['right'] or self.collisions['left']) and (self.velocity[1] > 0.4 or self.air_time >= 4) and not self.collisions['down'] :
             self.wall_slide = True
             self.air_time = 5
-            self.velocity[1] = min(self.velocity[1], 0.5)
+            self.velocity[1] = min(self.velocity[1], WALL_SLIDE_SPEED)
             if self.collisions['left']:
                 self.flip = True
             elif self.collisions['right']:
@@ -246,7 +255,7 @@ class BasePlayer(PhysicsEntity):
             self.wall_slide = False
 
         # Dash particle burst
-        if abs(self.dashing) in {60, 50}:
+        if abs(self.dashing) in {DASH_DURATION, DASH_DURATION - DASH_MOVE_FRAMES}:
             for _ in range(20):
                 angle = random.random() * math.pi * 2
                 speed = random.random() * 0.5 + 0.5
@@ -296,10 +305,10 @@ class BasePlayer(PhysicsEntity):
             self.dashing = min(0, self.dashing + 1)
 
         # Apply dash movement for the first 10 frames of the cooldown
-        if abs(self.dashing) > 50:
-            self.velocity[0] = (8 if self.dashing > 0 else -8)
+        if abs(self.dashing) > DASH_DURATION - DASH_MOVE_FRAMES:
+            self.velocity[0] = (DASH_SPEED if self.dashing > 0 else -DASH_SPEED)
             # Spawn particle burst right before dash movement goes off
-            if abs(self.dashing) == 51:
+            if abs(self.dashing) == DASH_DURATION - DASH_MOVE_FRAMES + 1:
                 self.velocity[0] *= 0.1
             vel = [random.random() * 3 * (1 if self.dashing > 0 else -1), 0]
             # Use cherry blossoms for NinjaHana, particles otherwise
@@ -317,12 +326,12 @@ class BasePlayer(PhysicsEntity):
         # Air resistance
         if not self.sliding:
             if self.velocity[0] > 0:
-                self.velocity[0] = max(self.velocity[0] - 0.1, 0)
+                self.velocity[0] = max(self.velocity[0] - AIR_RESISTANCE, 0)
             else:
-                self.velocity[0] = min(self.velocity[0] + 0.1, 0)
+                self.velocity[0] = min(self.velocity[0] + AIR_RESISTANCE, 0)
 
         # Death when falling out of bounds, need to fall for more than 3 seconds
-        if self.air_time > 180:
+        if self.air_time > FALL_DEATH_FRAMES:
             if not self.game.dead:
                 self.game.screenshake = max(16, self.game.screenshake)
             self.game.dead += 1
@@ -332,7 +341,7 @@ class BasePlayer(PhysicsEntity):
         # While not in the middle of the initial movement part of a dash
         if abs(self.dashing) <= 50:
             # Get current animation frame
-            frame = pygame.transform.flip(self.animation.img(), self.flip, False)
+            frame = transforms.get(self.animation.img(), self.flip)
             render_x = self.pos[0] + self.anim_offset[0] - offset[0]
             render_y = self.pos[1] + self.anim_offset[1] - offset[1]
 
@@ -340,7 +349,7 @@ class BasePlayer(PhysicsEntity):
             if self.has_sushi_shield:
                 glow_width = frame.get_width()
                 glow_height = frame.get_height()
-                glow_surf = pygame.Surface((glow_width, glow_height), pygame.SRCALPHA)
+                glow_surf = self.game.surface_pool.acquire((glow_width, glow_height), pygame.SRCALPHA)
                 color = (140, 240, 255, 100)
                 pygame.draw.ellipse(glow_surf, color, glow_surf.get_rect())
                 surf.blit(glow_surf, (render_x, render_y))
@@ -357,11 +366,11 @@ class BasePlayer(PhysicsEntity):
                     [flame_x, flame_y],
                     velocity=[random.uniform(-0.05, 0.05), random.uniform(-0.25, -0.15)],
                     frame=random.randint(0, 3),
-                    alpha=80
+                    alpha=DIVINE_FLAME_ALPHA
                 ))
             # Make the player semi-transparent during smoke bomb
             if self.smoke_active_timer > 0:
-                frame = frame.copy()
+                frame = self.game.surface_pool.copy(frame)
                 frame.set_alpha(120)  
 
             # Draw player sprite
@@ -369,7 +378,7 @@ class BasePlayer(PhysicsEntity):
 
             # To display debug hitbox
             if self.game.debug_hitboxes:
-                pygame.draw.rect(surf, (0, 255, 0), self.rect().move(-offset[0], -offset[1]), 1)
+                mark_drawn(surf, pygame.draw.rect(surf, (0, 255, 0), self.rect().move(-offset[0], -offset[1]), 1))
     
     # Handles jumping physics and animations
     def jump(self):
@@ -381,23 +390,23 @@ class BasePlayer(PhysicsEntity):
         # Handle wall jump velocities
         if self.wall_slide:
             if self.flip and self.input_vector[0] < 0:
-                self.velocity[0] = 3.5
-                self.velocity[1] = -2.2
+                self.velocity[0] = WALL_JUMP_VELOCITY[0]
+                self.velocity[1] = -WALL_JUMP_VELOCITY[1]
                 self.air_time = 5
                 self.jumps = max(0, self.jumps - 1)
                 self.game.sfx['jump'].play()
                 return True
             elif not self.flip and self.input_vector[0] > 0:
-                self.velocity[0] = -3.5
-                self.velocity[1] = -2.2
+                self.velocity[0] = -WALL_JUMP_VELOCITY[0]
+                self.velocity[1] = -WALL_JUMP_VELOCITY[1]
                 self.air_time = 5
                 self.jumps = max(0, self.jumps - 1)
                 self.game.sfx['jump'].play()
                 return True            
         # Handle ground and air jumps
         elif self.jumps:
-            slide_boost = 1.3 if self.slide_boost_timer > 0 else 1.0
-            self.velocity[1] = -3.1 * slide_boost
+            slide_boost = SLIDE_JUMP_BOOST if self.slide_boost_timer > 0 else 1.0
+            self.velocity[1] = -JUMP_VELOCITY * slide_boost
             self.jumps -= 1
             self.air_time = 5
 
@@ -422,7 +431,7 @@ class BasePlayer(PhysicsEntity):
             self.slide_locked = False
             self.game.sfx['dash'].play()
             # Sets dashing to 60, dash movement ends at 50
-            self.dashing = -60 if self.flip else 60
+            self.dashing = -DASH_DURATION if self.flip else DASH_DURATION
             self.dash_cooldown_timer = int(self.dash_cooldown_duration * self.dash_cooldown_multiplier)
 
     # Handles player velocity during a slide, also enables dropping from platforms
@@ -444,7 +453,7 @@ class BasePlayer(PhysicsEntity):
 
             # Gives the initially boosted slide speed as long as the player is actually moving
             if abs(self.input_vector[0]) > 0:
-                self.velocity[0] = max(abs(self.velocity[0]), 2.0) * direction
+                self.velocity[0] = max(abs(self.velocity[0]), SLIDE_SPEED) * direction
                 self.game.sfx['slide'].play()
             # Else enter slide animation in place, like a crouch
             else:
@@ -452,7 +461,7 @@ class BasePlayer(PhysicsEntity):
 
             # Put slide on cooldown and set timers
             self.slide_locked = True
-            self.slide_boost_timer = 30
+            self.slide_boost_timer = self.slide_boost_duration
             self.slide_cooldown_timer = self.slide_cooldown_duration
 
     # Reset effects on player, every level
@@ -460,7 +469,7 @@ class BasePlayer(PhysicsEntity):
         # Movement & jump state
         self.velocity = [0, 0]
         self.air_time = 0
-        self.jumps = 2
+        self.jumps = PLAYER_JUMPS
         self.flip = False  # Optional, depends on spawn direction
 
         # Dash
@@ -623,7 +632,7 @@ class Tengu(BasePlayer):
     def render(self, surf, offset=(0, 0)):
         super().render(surf, offset=offset)
         if self.flip:
-            surf.blit(pygame.transform.flip(self.game.assets['blowgun'], True, False), (self.rect().centerx - 4 - self.game.assets['blowgun'].get_width() - offset[0], self.rect().centery - offset[1] -  self.game.assets['blowgun'].get_height() * 2))
+            surf.blit(transforms.get(self.game.assets['blowgun'], True), (self.rect().centerx - 4 - self.game.assets['blowgun'].get_width() - offset[0], self.rect().centery - offset[1] -  self.game.assets['blowgun'].get_height() * 2))
         else:
             surf.blit(self.game.assets['blowgun'], (self.rect().centerx + 4 - offset[0], self.rect().centery - offset[1] -  self.game.assets['blowgun'].get_height() * 2))
 
@@ -646,7 +655,8 @@ class Enemy(PhysicsEntity):
         # Y position just under the feet
         foot_y = self.rect().bottom - 1
         below_y = self.rect().bottom + 1
-        return tilemap.solid_check((ahead_x, below_y)) and not tilemap.is_dangerous_tile((ahead_x, foot_y))
+        below, foot = tilemap.classes_at(((ahead_x, below_y), (ahead_x, foot_y)))
+        return bool(below & TILE_SOLID) and not foot & TILE_HARMFUL
 
     # Basic take damage function, decrementing health until death
     def take_damage(self, amount, ignore_invuln=False):
@@ -790,12 +800,12 @@ class Gunner(Enemy):
     def render(self, surf, offset=(0, 0)):
         super().render(surf, offset=offset)
         if self.flip:
-            surf.blit(pygame.transform.flip(self.game.assets['gun'], True, False), (self.rect().centerx - 4 - self.game.assets['gun'].get_width() - offset[0], self.rect().centery - offset[1]))
+            surf.blit(transforms.get(self.game.assets['gun'], True), (self.rect().centerx - 4 - self.game.assets['gun'].get_width() - offset[0], self.rect().centery - offset[1]))
         else:
             surf.blit(self.game.assets['gun'], (self.rect().centerx + 4 - offset[0], self.rect().centery - offset[1]))
         # Draw hitbox for debugging
         if self.game.debug_hitboxes:
-            pygame.draw.rect(surf, (255, 0, 0), self.rect().move(-offset[0], -offset[1]), 1)
+            mark_drawn(surf, pygame.draw.rect(surf, (255, 0, 0), self.rect().move(-offset[0], -offset[1]), 1))
 
 # Oni
 class Oni(Enemy):
@@ -873,32 +883,30 @@ class Oni(Enemy):
     def render(self, surf, offset=(0, 0)):
         # Draw Oni animations
         img = self.animation.img()
-        img = pygame.transform.flip(img, self.flip, False)
+        img = transforms.get(img, self.flip)
         render_pos = (
             self.pos[0] - offset[0] + self.anim_offset[0],
             self.pos[1] - offset[1] + self.anim_offset[1]
         )
         # Flash while invulnerable after taking damage
         if self.invulnerable_timer > 0 and self.invulnerable_timer % 6 < 3:
-            flash_img = img.copy()
-            flash_img.fill((255, 255, 255, 0), special_flags=pygame.BLEND_RGBA_ADD)
-            surf.blit(flash_img, render_pos)
+            surf.blit(effects.flash(img), render_pos)
         else:
             surf.blit(img, render_pos)
 
         # Draw hitbox for debugging
         if self.game.debug_hitboxes:
-            pygame.draw.rect(surf, (255, 0, 0), self.rect().move(-offset[0], -offset[1]), 1)
+            mark_drawn(surf, pygame.draw.rect(surf, (255, 0, 0), self.rect().move(-offset[0], -offset[1]), 1))
             # Draw line of sight (yellow)
             player_pos = self.game.player.rect().center
             if self.enraged:
-                pygame.draw.line(
+                mark_drawn(surf, pygame.draw.line(
                     surf,
                     (255, 255, 0),
                     (self.rect().centerx - offset[0], self.rect().centery - offset[1]),
                     (player_pos[0] - offset[0], player_pos[1] - offset[1]),
                     1
-                )
+                ))
 
 # Yurei
 class Yurei(Enemy):
@@ -928,7 +936,7 @@ class Yurei(Enemy):
         distance = math.hypot(dx, dy)
 
         # Seeks player if in LOS and within 180 "pixels"
-        if self.has_line_of_sight(tilemap, player_pos) and distance < 180 and distance > 1e-3:
+        if self.has_line_of_sight(tilemap, player_pos) and distance < YUREI_SIGHT and distance > 1e-3:
             speed = 0.5
             dir_x = dx / distance
             dir_y = dy / distance
@@ -965,12 +973,10 @@ class Yurei(Enemy):
 
         # Checks for solid tiles about every 8 pixels in the furthest direction
         steps = int(max(abs(player_x - yurei_x), abs(player_y - yurei_y)) // 8)
-        for i in range(1, steps):
-            x = yurei_x + (player_x - yurei_x) * (i / steps)
-            y = yurei_y + (player_y - yurei_y) * (i / steps)
-            if tilemap.solid_check((x, y)):
-                return False
-        return True
+        return not tilemap.any_solid(
+            (yurei_x + (player_x - yurei_x) * (i / steps), yurei_y + (player_y - yurei_y) * (i / steps))
+            for i in range(1, steps)
+        )
 
     # Deals an instance of touch damage to the player, first checking immunities
     def touch_damage_player(self):
@@ -1005,16 +1011,11 @@ class Yurei(Enemy):
     def render(self, surf, offset=(0, 0)):
         base_img = self.animation.img()
         # Use scaled sprite image        
-        scaled_img = pygame.transform.scale(
-            pygame.transform.flip(base_img, self.flip, False),
-            (int(base_img.get_width() * 0.75), int(base_img.get_height() * 0.75))
-        )
-        img = scaled_img.copy()
+        scaled_img = transforms.get(base_img, self.flip, scale=YUREI_SCALE)
 
-        # Ghostly alpha pulse effect
+        # Ghostly alpha pulse effect, drawn from the baked alpha levels
         t = pygame.time.get_ticks() * 0.001
-        alpha = int(140 + 80 * math.sin(t))
-        img.set_alpha(alpha)
+        img = effects.faded(scaled_img, quantize_alpha(int(YUREI_ALPHA[0] + YUREI_ALPHA[1] * math.sin(t))))
 
         # Sprite position
         render_pos = (
@@ -1023,23 +1024,21 @@ class Yurei(Enemy):
         )
         # Flash if invulnerable
         if self.invulnerable_timer > 0 and self.invulnerable_timer % 6 < 3:
-            flash = img.copy()
-            flash.fill((255, 255, 255, 0), special_flags=pygame.BLEND_RGBA_ADD)
-            surf.blit(flash, render_pos)
+            surf.blit(effects.flash(img), render_pos)
         else:
             surf.blit(img, render_pos)
 
         # For debugging, draws hit boxes and LOS
         if self.game.debug_hitboxes:
             # Draw hitbox (red)
-            pygame.draw.rect(surf, (255, 0, 0), self.rect().move(-offset[0], -offset[1]), 1)
+            mark_drawn(surf, pygame.draw.rect(surf, (255, 0, 0), self.rect().move(-offset[0], -offset[1]), 1))
             # Draw line of sight (yellow)
             player_pos = self.game.player.rect().center
             if self.has_line_of_sight(self.game.tilemap, player_pos):
-                pygame.draw.line(
+                mark_drawn(surf, pygame.draw.line(
                     surf,
                     (255, 255, 0),
                     (self.rect().centerx - offset[0], self.rect().centery - offset[1]),
                     (player_pos[0] - offset[0], player_pos[1] - offset[1]),
                     1
-                )
\ No newline at end of file
+                ))
\ No newline at end of file
@@ -1,3 +1,4 @@
+import os
 import pygame
 import math
 import random
@@ -13,6 +14,14 @@ from scripts.spikes import Spike
 from scripts.weather import RainSystem
 from scripts.config import COLOR_CODES
 from scripts.crumble_blocks import CrumbleBlock
+from scripts.level_bake import load_baked_level
+from scripts.tilemap import Tilemap
+from scripts.transform_cache import transforms
+from scripts.effects import bake_effects
+from scripts.damage import mark_drawn, steady
+
+# Theme backgrounds scaled to the display, keyed by background name and display size
+SCALED_BACKGROUNDS = {}
 
 # Load and group assets
 def load_assets():
@@ -57,6 +66,8 @@ def load_assets():
         for action, (path, dur) in actions.items():
             assets[f'{enemy}/{action}'] = Animation(load_images(path), img_dur=dur)
 
+    # Hit flashes and faded frames are made here once, renderers only pick from them
+    bake_effects(assets)
     return assets
 
 # Load all sfx
@@ -135,6 +146,21 @@ def get_stage_theme_data(level, stage_themes):
         "rain": forest_data.get("rain")
     }
 
+# Returns a theme background scaled to the display, scaled once per background and display size
+def scaled_background(game, name):
+    background_key = (name, game.display.get_size())
+    if background_key not in SCALED_BACKGROUNDS:
+        SCALED_BACKGROUNDS[background_key] = steady(pygame.transform.scale(game.assets[name], game.display.get_size()))
+    return SCALED_BACKGROUNDS[background_key]
+
+# Loads and bakes a level's map into a new tilemap and scales its background, without touching the running level
+# Safe to run on the prefetcher's worker thread
+def prepare_level(game, map_id):
+    tilemap = Tilemap(game, tile_size=game.tilemap.tile_size)
+    level = load_baked_level(tilemap, f"data/maps/{game.map_files[map_id]}")
+    scaled_background(game, get_stage_theme_data(map_id, game.stage_themes)["background"])
+    return {'tilemap': tilemap, 'level': level}
+
 # Calls all functions to handle level setup
 def load_level(game, map_id):
     # Gets theme info
@@ -177,12 +203,8 @@ def load_level(game, map_id):
     else:
         game.dedicated_channels["cicada"].stop()
 
-    # Set background
-    background_image = game.assets[theme_data["background"]]
-    game.assets['background'] = pygame.transform.scale(
-        background_image,
-        game.display.get_size()
-    )
+    # Set background, scaled once per theme and display size
+    game.assets['background'] = scaled_background(game, theme_data["background"])
 
     # Sets rain on applicable themes
     if theme_data.get("rain"):
@@ -192,41 +214,85 @@ def load_level(game, map_id):
     else:
         game.dedicated_channels["rain"].stop()
 
-    # Load tilemap and get level number
-    game.tilemap.load(f"data/maps/{game.map_files[map_id]}")
+    # Swap in the tilemap and baked level data, prepared in the background if the prefetcher got to it, then get level number
+    prepared = game.prefetcher.take(map_id) or prepare_level(game, map_id)
+    if prepared['tilemap'] is not game.tilemap:
+        game.tilemap.close()
+    game.tilemap = prepared['tilemap']
+    level = prepared['level']
     game.current_map_id = int(game.map_files[map_id].split('.')[0])
 
-    # Loads crumble blocks
+    # Start preparing the next level while this one is played
+    if map_id + 1 < len(game.map_files):
+        game.prefetcher.start(map_id + 1)
+
+    # Keep the pristine level in memory so restarts never go back to disk
+    game.level_template = {'map_id': map_id, 'level': level, 'revision': game.tilemap.revision}
+    spawn_level(game, level)
+
+# Restarts the current level from the template kept by load_level, no file reads and no theme or audio changes
+# Falls back to a full load if the level changed or the tilemap was edited since it was loaded
+def restart_level(game):
+    template = getattr(game, 'level_template', None)
+    if template is None or template['map_id'] != game.level or template['revision'] != game.tilemap.revision:
+        return load_level(game, game.level)
+    spawn_level(game, template['level'])
+
+# Reloads the current level in place after its map file was saved, keeping the player where it is
+# Only the chunks whose tiles changed are drawn again, enemies, pickups and spikes are placed again from the new map
+def reload_level(game):
+    prepared = prepare_level(game, game.level)
+    if game.tilemap.streamer is None and prepared['tilemap'].streamer is None:
+        changed = len(game.tilemap.adopt(prepared['tilemap']))
+    else:
+        # Streamed levels only hold part of the map, so there is nothing to compare against
+        game.tilemap.close()
+        game.tilemap = prepared['tilemap']
+        changed = 'all'
+    game.level_template = {'map_id': game.level, 'level': prepared['level'], 'revision': game.tilemap.revision}
+    spawn_level(game, prepared['level'], reset=False)
+    print(f"Reloaded {game.map_files[game.level]}, {changed} chunks changed")
+
+# Reloads the level being played when its map is saved, and prepares the next level again if that one was saved
+def hot_reload(game):
+    for path in game.map_watcher.changed():
+        name = os.path.basename(path)
+        if name not in game.map_files:
+            continue
+        map_id = game.map_files.index(name)
+        try:
+            if map_id == game.level:
+                reload_level(game)
+            elif map_id == game.prefetcher.map_id:
+                stale = game.prefetcher.take(map_id)
+                if stale:
+                    stale['tilemap'].close()
+                game.prefetcher.start(map_id)
+        except Exception as e:
+            print(f"[Warning] Could not reload {path}: {e}")
+
+# Places a level's crumble blocks, leaf spawners, entities, pickups and spikes from its baked data and resets the level state
+# The baked data is never modified, every object gets its own copy of the positions
+# A hot reload passes reset=False to leave the player, camera, timer and tutorials as they are
+def spawn_level(game, level, reset=True):
+    # Loads crumble blocks, skipping variants without an image
     game.crumble_blocks = []
-    if 'crumble_blocks' in game.assets:
-        for i, image in enumerate(game.assets['crumble_blocks']):
-            for tile in game.tilemap.extract([('crumble_blocks', i)]):
-                game.crumble_blocks.append(CrumbleBlock(game, tile, image))
-
-    # Set leaf spawns on specific tree types
-    game.leaf_spawners = []
-    game.sakura_leaf_spawners = []
-
-    # Normal leaves
-    for regular_tree in game.tilemap.extract([('flora', 1)], keep=True):
-        game.leaf_spawners.append({
-            'rect': pygame.Rect(4 + regular_tree['pos'][0], 4 + regular_tree['pos'][1], 23, 13),
-            'type': 'leaf'
-        })
-
-    # Sakura leaves
-    for sakura_tree in game.tilemap.extract([('flora', 2)], keep=True):
-        game.sakura_leaf_spawners.append({
-            'rect': pygame.Rect(26 + sakura_tree['pos'][0], 10 + sakura_tree['pos'][1], 23, 13),
-            'type': 'cherry_blossom'
-        })
+    crumble_images = game.assets.get('crumble_blocks', [])
+    for tile in level['crumble_blocks']:
+        if tile['variant'] < len(crumble_images):
+            game.crumble_blocks.append(CrumbleBlock(game, tile, crumble_images[tile['variant']]))
+
+    # Set leaf spawns on specific tree types, normal and sakura leaves
+    game.leaf_spawners = [{'rect': pygame.Rect(rect), 'type': 'leaf'} for rect in level['leaf_spawners']]
+    game.sakura_leaf_spawners = [{'rect': pygame.Rect(rect), 'type': 'cherry_blossom'} for rect in level['sakura_leaf_spawners']]
 
     # Spawn entities, the player and enemies
     game.enemies = []
-    for spawner in game.tilemap.extract([('spawners', 0), ('spawners', 1), ('spawners', 2), ('spawners', 3)]):
+    for spawner in level['spawners']:
         if spawner['variant'] == 0:
-            game.player.pos = spawner['pos']
-            game.player.reset_effects()
+            if reset:
+                game.player.pos = list(spawner['pos'])
+                game.player.reset_effects()
         elif spawner['variant'] == 1:
             game.enemies.append(Gunner(game, spawner['pos'], (8, 15)))
         elif spawner['variant'] == 2:
@@ -236,7 +302,7 @@ def load_level(game, map_id):
 
     # Spawn pickups
     game.pickups = []
-    for pickup_data in game.tilemap.extract([('pickups', 0), ('pickups', 1), ('pickups', 2)]):
+    for pickup_data in level['pickups']:
         if pickup_data['variant'] == 0:
             pickup_type = 'ramen'
         elif pickup_data['variant'] == 1:
@@ -249,12 +315,14 @@ def load_level(game, map_id):
         image = game.assets[f'pickup/{pickup_type}']
         game.pickups.append(pickup(game, pickup_data['pos'], pickup_type, image))
 
-    # Load spike tiles
+    # Load spike tiles, with the orientation found when the level was baked
     game.spikes = []
-    for tile in game.tilemap.extract([('spikes', 0), ('spikes', 1)], keep = True):
-        game.spikes.append(Spike(game, tile))
+    for tile in level['spikes']:
+        game.spikes.append(Spike(game, tile, tile['type']))
 
     # Reset certain level based game states
+    if not reset:
+        return
     game.projectiles = []
     game.particles = []
     game.sparks = []
@@ -322,7 +390,7 @@ def handle_input(game, render_scroll):
                 if result == "menu":
                     return "back_to_level_select"
                 if result == "restart":
-                    load_level(game, game.level)
+                    restart_level(game)
                     return "restart"
                 if not result:
                     pygame.quit()
@@ -360,18 +428,22 @@ def handle_input(game, render_scroll):
 # Handles all projectiles
 def handle_projectiles(game, render_scroll):
     # Moves projectiles and increments their timer
-    for projectile in game.projectiles.copy():
+    for projectile in game.projectiles:
         projectile["pos"][0] += projectile["vel"][0]
         projectile["pos"][1] += projectile["vel"][1]
         projectile["timer"] += 1
 
+    # Checks every projectile against the walls in one query
+    walls = game.tilemap.solid_points([projectile["pos"] for projectile in game.projectiles])
+
+    for projectile, wall in zip(game.projectiles.copy(), walls):
         #  Last 3 seconds at 60 fps
         if projectile["timer"] > 180:
             game.projectiles.remove(projectile)
             continue
 
         # Checks for wall collisions, if so delete and add sparks
-        if game.tilemap.solid_check(projectile["pos"]):
+        if wall:
             game.projectiles.remove(projectile)
             for _ in range(4):
                 game.sparks.append(Spark(projectile["pos"], random.random() * math.pi * 2, 2 + random.random()))
@@ -415,7 +487,7 @@ def handle_projectiles(game, render_scroll):
         # Flip if necessary 
         if sprite:
             if projectile.get("flip", False):
-                sprite = pygame.transform.flip(sprite, True, False)
+                sprite = transforms.get(sprite, True)
             # Display projectiles
             game.display.blit(sprite, (
                 projectile["pos"][0] - sprite.get_width() // 2 - render_scroll[0],
@@ -423,8 +495,11 @@ def handle_projectiles(game, render_scroll):
             ))
 
 # Handles updating, rendering and tracking whether enemies are alive. Also calls draw for certain enemy health bars.
+# Enemies outside the streamed part of a large level are frozen until the camera comes back near them
 def handle_enemies(game, render_scroll):
     for enemy in game.enemies.copy():
+        if not game.tilemap.is_resident(enemy.pos):
+            continue
         kill = enemy.update(game.tilemap, (0, 0))
         if kill:
             game.enemies.remove(enemy)
@@ -479,8 +554,8 @@ def draw_health_bar(surf, entity, current_health, max_health, offset=(0, 0), hei
     bar_pos = (rect.x - offset[0], rect.y - 8 - offset[1])  # 8px above the enemy
 
     # Draw background and foreground
-    pygame.draw.rect(surf, bg_color, (*bar_pos, max_width, height))  # Background
-    pygame.draw.rect(surf, fg_color, (*bar_pos, bar_width, height))  # Foreground
+    mark_drawn(surf, pygame.draw.rect(surf, bg_color, (*bar_pos, max_width, height)))  # Background
+    mark_drawn(surf, pygame.draw.rect(surf, fg_color, (*bar_pos, bar_width, height)))  # Foreground
 
 # Draws player UI, including cooldowns and buffs
 def draw_player_ui(display, player, assets, font_path, height):
@@ -498,11 +573,12 @@ def draw_player_ui(display, player, assets, font_path, height):
             if player.smoke_cooldown_timer > 0:
                 cooldown_ratio = player.smoke_cooldown_timer / player.smoke_cooldown_duration
                 fill_height = int(icon.get_height() * cooldown_ratio)
-                overlay = pygame.Surface((icon.get_width(), fill_height), pygame.SRCALPHA)
-                overlay.fill((0, 0, 0, 160))
-                display.blit(overlay, (icon_x, icon_y + icon.get_height() - fill_height))
+                # Acquired at the icon's size so every height shares one pooled surface, only the bottom is darkened
+                overlay = player.game.surface_pool.acquire(icon.get_size(), pygame.SRCALPHA)
+                overlay.fill((0, 0, 0, 160), (0, icon.get_height() - fill_height, icon.get_width(), fill_height))
+                display.blit(overlay, (icon_x, icon_y))
             else:
-                pygame.draw.rect(display, (46, 83, 57), (icon_x - 1, icon_y - 1, icon.get_width() + 2, icon.get_height() + 2), 2)
+                mark_drawn(display, pygame.draw.rect(display, (46, 83, 57), (icon_x - 1, icon_y - 1, icon.get_width() + 2, icon.get_height() + 2), 2))
     # Else if blowgun ability, draws blowgun icon with cooldown display   
     elif player.ability_type == "blowgun":
         icon = assets.get('icon/blowgun')
@@ -511,9 +587,10 @@ def draw_player_ui(display, player, assets, font_path, height):
             if player.shoot_timer > 0:
                 cooldown_ratio = player.shoot_timer / player.shoot_cooldown
                 fill_height = int(icon.get_height() * cooldown_ratio)
-                overlay = pygame.Surface((icon.get_width(), fill_height), pygame.SRCALPHA)
-                overlay.fill((0, 0, 0, 160))
-                display.blit(overlay, (icon_x, icon_y + icon.get_height() - fill_height))
+                # Acquired at the icon's size so every height shares one pooled surface, only the bottom is darkened
+                overlay = player.game.surface_pool.acquire(icon.get_size(), pygame.SRCALPHA)
+                overlay.fill((0, 0, 0, 160), (0, icon.get_height() - fill_height, icon.get_width(), fill_height))
+                display.blit(overlay, (icon_x, icon_y))
 
     # Sushi Shield Icon (Above ability)
     if player.has_sushi_shield:
@@ -543,15 +620,15 @@ def draw_player_ui(display, player, assets, font_path, height):
         bar_y = pos[1] + (ramen_icon.get_height() - bar_height) // 2
 
         display.blit(ramen_icon, pos)
-        pygame.draw.rect(display, (50, 50, 50), (bar_x, bar_y, bar_width, bar_height))
-        pygame.draw.rect(display, (255, 100, 0), (bar_x, bar_y, int(bar_width * remaining), bar_height))
+        mark_drawn(display, pygame.draw.rect(display, (50, 50, 50), (bar_x, bar_y, bar_width, bar_height)))
+        mark_drawn(display, pygame.draw.rect(display, (255, 100, 0), (bar_x, bar_y, int(bar_width * remaining), bar_height)))
 
 # Defines intro screen and tutorial messages
 def setup_tutorials(game):
     # Show intro screen only once per run
     if game.level == 0 and "level_0_intro" not in game.tutorial_shown:
         show_message_screen(
-            game.screen,
+            game.presenter.window(),
             "data/images/backgrounds/HiroDeparture.png",
             game.font_path,
             title="Evil forces have invaded!",
@@ -619,7 +696,7 @@ def check_character_unlocks(game):
     if game.level == 10 and "Ninja Hana" not in unlocked:
         unlocked.append("Ninja Hana")
         show_message_screen(
-            game.screen,
+            game.presenter.window(),
             "data/images/backgrounds/HanaUnlock.png",
             game.font_path,
             title="Character Unlocked!",
@@ -632,7 +709,7 @@ def check_character_unlocks(game):
     elif game.level == 20 and "Tengu" not in unlocked:
         unlocked.append("Tengu")
         show_message_screen(
-            game.screen,
+            game.presenter.window(),
             "data/images/backgrounds/TenguUnlock.png",
             game.font_path,
             title="Character Unlocked!",
@@ -0,0 +1,405 @@
+import glob
+import json
+import math
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from scripts.config import (
+    GRAVITY, MAX_FALL_SPEED, AIR_RESISTANCE, PLAYER_JUMPS, COYOTE_FRAMES, JUMP_VELOCITY, SLIDE_JUMP_BOOST,
+    WALL_JUMP_VELOCITY, WALL_SLIDE_SPEED, SLIDE_SPEED, DASH_SPEED, DASH_DURATION, DASH_MOVE_FRAMES, FALL_DEATH_FRAMES, YUREI_SIGHT,
+)
+from scripts.level_bake import SPAWNER_PAIRS, PICKUP_PAIRS, SPIKE_PAIRS
+from scripts.map_format import map_hash, write_atomic
+from scripts.tile_chunks import CHUNK_SIZE
+from scripts.tilemap import Tilemap, TILE_SOLID, TILE_HALF, TILE_PLATFORM, TILE_HARMFUL
+
+# Reports are cached here, named after the map and a hash of its contents and of the analyzer version
+# Bump the version when a change to the analyzer changes what it reports
+ANALYSIS_DIR = 'data/cache/analysis'
+ANALYZER_VERSION = 2
+
+# Hitboxes of the player and of each enemy spawner variant, as the game spawns them
+PLAYER_SIZE = (8, 15)
+ENEMY_SIZES = {1: (8, 15), 2: (8, 15), 3: (8, 20)}
+ENEMY_NAMES = {1: 'gunner', 2: 'oni', 3: 'yurei'}
+# Enemy spawner variants that walk along the ground they land on, yurei fly
+WALKING_ENEMIES = {1, 2}
+PICKUP_NAMES = {0: 'spicy ramen', 1: 'sushi shield', 2: 'spirit blessing'}
+
+# Tiles the player stops against, like the solid collision layer
+BLOCKING = TILE_SOLID | TILE_HALF
+
+# Frames a jump keeps rising for, when the second jump and the dash are tried
+APEX_FRAME = int(JUMP_VELOCITY / GRAVITY)
+
+# Frames a move is followed for, sliding down walls keeps the player from falling to death for longer than FALL_DEATH_FRAMES
+# Climbs go on wall jumping for as long as there is wall, so this also bounds how high a climb goes
+MAX_MOVE_FRAMES = FALL_DEATH_FRAMES * 3
+
+# Ways of climbing walls, up one wall or between two walls by turning around after every wall jump
+CLIMBS = ('wall', 'chimney')
+
+# Moves tried from every standing spot, as (direction, jump, second jump frame, dash frame, climb)
+# Inputs move the player one pixel a frame, like holding a direction in the game
+STANDING_PLANS = [(0, 'jump', air_jump, None, None) for air_jump in (None, APEX_FRAME)] + [
+    (direction, jump, air_jump, dash, None)
+    for direction in (-1, 1)
+    for jump in ('jump', 'slide')
+    for air_jump in (None, APEX_FRAME)
+    for dash in (None, APEX_FRAME + 10)
+]
+# Moves tried when walking off a ledge, the ground jump is already covered by jumping from the ledge
+# Dropping through a platform uses them too
+LEDGE_PLANS = [(0, None, air_jump, dash, None) for air_jump in (None, 8) for dash in (None, 4)]
+
+# Follows the player's movement through a map's collision grid, with the same constants and update order as the game
+class MoveGraph:
+    def __init__(self, tilemap):
+        self.tilemap = tilemap
+        self.size = tilemap.tile_size
+        self.class_cache = {}
+        self.spike_bands = {}
+        self.bottom = max((key[1] + 1) * CHUNK_SIZE * self.size for key in tilemap.chunks) if tilemap.chunks else 0
+
+    # Collision class flags of a tile, looked up once
+    def classes(self, tx, ty):
+        flags = self.class_cache.get((tx, ty))
+        if flags is None:
+            flags = self.class_cache[(tx, ty)] = self.tilemap.class_at(tx, ty)
+        return flags
+
+    # Returns the rows of pixels a spike tile hurts in like the hitboxes of Spike, and whether it hangs from the ceiling
+    # None for tiles that do not hurt
+    def spike_band(self, tx, ty):
+        if (tx, ty) not in self.spike_bands:
+            band = None
+            if self.classes(tx, ty) & TILE_HARMFUL:
+                y = ty * self.size
+                if self.tilemap.solid_check((tx * self.size + 8, y - 4)):
+                    band = (y, y + 6, True)
+                else:
+                    band = (y + 10, y + 16, False)
+            self.spike_bands[(tx, ty)] = band
+        return self.spike_bands[(tx, ty)]
+
+    # Returns the tile the player stands in after landing at a pixel position
+    # The tile under its middle, unless only the edge of its hitbox made it onto the ground
+    def land(self, x, y):
+        w, h = PLAYER_SIZE
+        size = self.size
+        ty = int((y + h / 2) // size)
+        for tx in (int((x + w / 2) // size), int(x // size), int((x + w - 1) // size)):
+            if self.standable(tx, ty):
+                return (tx, ty)
+        return self.drop(x, y)
+
+    # Returns the tiles a walking enemy landing in a tile can walk to, along its ground up to gaps, spikes and walls
+    # like Enemy.is_safe_ahead, which keeps enemies off anything but solid ground
+    def walk_span(self, start):
+        tx, ty = start
+        span = [start]
+        for step in (-1, 1):
+            x = tx + step
+            while self.classes(x, ty + 1) & TILE_SOLID and not self.classes(x, ty) & (BLOCKING | TILE_HARMFUL):
+                span.append((x, ty))
+                x += step
+        return span
+
+    # Returns True if a yurei at a pixel position sees any of the tiles close enough for it to come after the player there
+    # Samples the line between the two every 8 pixels like Yurei.has_line_of_sight
+    def sees(self, x, y, cells):
+        size = self.size
+        for tx, ty in cells:
+            target_x, target_y = (tx + 0.5) * size, (ty + 0.5) * size
+            if math.hypot(target_x - x, target_y - y) >= YUREI_SIGHT:
+                continue
+            steps = int(max(abs(target_x - x), abs(target_y - y)) // 8)
+            if not self.tilemap.any_solid((x + (target_x - x) * (i / steps), y + (target_y - y) * (i / steps)) for i in range(1, steps)):
+                return True
+        return False
+
+    # Returns the tiles a pixel rect overlaps
+    def cells(self, x, y, w, h):
+        size = self.size
+        return [(tx, ty) for tx in range(int(x // size), int((x + w - 1) // size) + 1) for ty in range(int(y // size), int((y + h - 1) // size) + 1)]
+
+    # Returns True if a tile is empty space the player can stand in, with ground or a platform under it
+    # Ceiling spikes do not hurt a sliding player, so the player can stand in their tile by sliding under them
+    def standable(self, tx, ty):
+        flags = self.classes(tx, ty)
+        if flags & BLOCKING or (flags & TILE_HARMFUL and not self.spike_band(tx, ty)[2]):
+            return False
+        return bool(self.classes(tx, ty + 1) & (BLOCKING | TILE_PLATFORM))
+
+    # Returns the tile something lands in when dropped from a pixel position, None if it is in a wall or falls out of the map
+    # Starts from the center of the hitbox, spawners overlap the ground by a pixel or two and the game pushes them out
+    def drop(self, x, y, size=PLAYER_SIZE):
+        tx = int((x + size[0] / 2) // self.size)
+        for ty in range(int((y + size[1] / 2) // self.size), int(self.bottom // self.size) + 1):
+            if self.standable(tx, ty):
+                return (tx, ty)
+            if self.classes(tx, ty) & (BLOCKING | TILE_HARMFUL):
+                return None
+        return None
+
+    # Plays one plan out from a pixel position, returns the tile the player lands in (None on death),
+    # the tiles the middle of the player passed through and whether it slid down a wall on the way
+    # The player is smaller than a tile, so its hitbox never spans more than two columns or two rows
+    def run(self, x, y, plan, grounded=True):
+        direction, jump, air_jump, dash, climb = plan
+        w, h = PLAYER_SIZE
+        size = self.size
+        classes = self.classes
+        class_cache = self.class_cache
+        vx = vy = 0.0
+        jumps = PLAYER_JUMPS
+        air_time = 0 if grounded else COYOTE_FRAMES + 1
+        dashing = 0
+        wall_slide = 0
+        wall_slid = False
+        touched = set()
+        if jump:
+            vy = -JUMP_VELOCITY * (SLIDE_JUMP_BOOST if jump == 'slide' else 1)
+            if jump == 'slide':
+                vx = SLIDE_SPEED * direction
+            jumps -= 1
+            air_time = 5
+
+        for frame in range(MAX_MOVE_FRAMES):
+            # Inputs for this frame, a wall jump needs the direction held towards the wall
+            # The player faces the wall it slides down whichever way is held, so a dash from a wall goes into it
+            if frame == dash and direction:
+                dashing = DASH_DURATION * (wall_slide or direction)
+            if frame == air_jump or (climb and wall_slide):
+                if wall_slide and direction == wall_slide:
+                    vx, vy = -WALL_JUMP_VELOCITY[0] * wall_slide, -WALL_JUMP_VELOCITY[1]
+                    if climb == 'chimney':
+                        direction = -direction
+                    jumps = max(0, jumps - 1)
+                    air_time = 5
+                elif not wall_slide and jumps:
+                    vy = -JUMP_VELOCITY
+                    jumps -= 1
+                    air_time = 5
+
+            # Horizontal then vertical movement, each pushed back out of the tiles it runs into
+            # Collisions are checked with the position truncated to whole pixels, like the pygame.Rect hitbox in the game
+            collided = 0
+            landed = False
+            step = direction + vx
+            x += step
+            left, right = int(x) // size, (int(x) + w - 1) // size
+            top, bottom = int(y) // size, (int(y) + h - 1) // size
+            for tx in (left, right) if left != right else (left,):
+                for ty in (top, bottom) if top != bottom else (top,):
+                    flags = class_cache.get((tx, ty))
+                    if flags is None:
+                        flags = classes(tx, ty)
+                    if flags & BLOCKING:
+                        if step > 0:
+                            x = tx * size - w
+                            collided = 1
+                        elif step < 0:
+                            x = (tx + 1) * size
+                            collided = -1
+            previous_bottom = int(y) + h
+            y += vy
+            left, right = int(x) // size, (int(x) + w - 1) // size
+            top, bottom = int(y) // size, (int(y) + h - 1) // size
+            hazards = None
+            for tx in (left, right) if left != right else (left,):
+                for ty in (top, bottom) if top != bottom else (top,):
+                    flags = class_cache.get((tx, ty))
+                    if flags is None:
+                        flags = classes(tx, ty)
+                    if flags & TILE_HARMFUL:
+                        hazards = (hazards or []) + [(tx, ty)]
+                    if flags & BLOCKING:
+                        if vy > 0:
+                            y = ty * size - h
+                            landed = True
+                        elif vy < 0:
+                            y = (ty + 1) * size
+                        vy = 0
+                    elif flags & TILE_PLATFORM and vy > 0 and previous_bottom <= ty * size + 1.2 and int(y) + h >= ty * size:
+                        y = ty * size - h
+                        landed = True
+                        vy = 0
+            for tx, ty in hazards or ():
+                band = self.spike_band(tx, ty)
+                if y < band[1] and y + h > band[0]:
+                    return None, touched, wall_slid
+            vy = min(MAX_FALL_SPEED, vy + GRAVITY)
+            touched.add((int((x + w / 2) // size), int((y + h / 2) // size)))
+
+            if landed and frame:
+                return self.land(x, y), touched, wall_slid
+            air_time += 1
+            if jumps == PLAYER_JUMPS and air_time > COYOTE_FRAMES:
+                jumps -= 1
+            if collided and (vy > 0.4 or air_time >= 4):
+                wall_slide = collided
+                wall_slid = True
+                air_time = 5
+                vy = min(vy, WALL_SLIDE_SPEED)
+            else:
+                wall_slide = 0
+
+            # Dash movement for its first frames, then air resistance
+            if dashing > 0:
+                dashing -= 1
+            elif dashing < 0:
+                dashing += 1
+            if abs(dashing) > DASH_DURATION - DASH_MOVE_FRAMES:
+                vx = DASH_SPEED if dashing > 0 else -DASH_SPEED
+                if abs(dashing) == DASH_DURATION - DASH_MOVE_FRAMES + 1:
+                    vx *= 0.1
+            vx = max(vx - AIR_RESISTANCE, 0) if vx > 0 else min(vx + AIR_RESISTANCE, 0)
+            if air_time > FALL_DEATH_FRAMES or y > self.bottom + size * 4:
+                return None, touched, wall_slid
+        return None, touched, wall_slid
+
+    # Returns every tile the player can stand in and every tile it can pass through, starting from a standing tile
+    def reachable(self, start):
+        size = self.size
+        w, h = PLAYER_SIZE
+        seen = {start}
+        touched = {start}
+        todo = deque([start])
+        while todo:
+            tx, ty = todo.popleft()
+            landings = []
+            runs = []
+            # Walking along the ground, or off a ledge
+            for step in (-1, 1):
+                if self.standable(tx + step, ty):
+                    landings.append((tx + step, ty))
+                elif not self.classes(tx + step, ty) & (BLOCKING | TILE_HARMFUL):
+                    runs += [((tx + step) * size + (size - w) / 2, (ty + 1) * size - h, (step,) + plan[1:], False) for plan in LEDGE_PLANS]
+            # Sliding through a platform
+            if self.classes(tx, ty + 1) & TILE_PLATFORM:
+                runs += [(tx * size + (size - w) / 2, (ty + 1) * size - h + 2, (direction, None, None, None, None), False) for direction in (-1, 0, 1)]
+            # Jumping from the middle of the tile
+            runs += [(tx * size + (size - w) / 2, (ty + 1) * size - h, plan, True) for plan in STANDING_PLANS]
+            for x, y, plan, grounded in runs:
+                landing, cells, wall_slid = self.run(x, y, plan, grounded)
+                touched |= cells
+                landings.append(landing)
+                # Moves are tried again with both climbs when they end up sliding down a wall
+                if wall_slid and plan[0]:
+                    for climb in CLIMBS:
+                        landing, cells, _ = self.run(x, y, plan[:4] + (climb,), grounded)
+                        touched |= cells
+                        landings.append(landing)
+            for landing in landings:
+                if landing is not None and landing not in seen:
+                    seen.add(landing)
+                    touched.add(landing)
+                    todo.append(landing)
+        return seen, touched
+
+# Returns where the report on a map's current contents is cached
+def report_path(path, data):
+    name = os.path.splitext(os.path.basename(path))[0]
+    key = map_hash(data + f'|analysis {ANALYZER_VERSION}'.encode()).hex()[:16]
+    return os.path.join(ANALYSIS_DIR, f'{name}-{key}.json')
+
+# Checks one map, returns its problems and warnings as messages along with how long the check took, None when the report was cached
+# Problems are mistakes in the map, warnings are what the analyzer could not show the player can get to, which it may well
+def analyze_map(path):
+    start_time = time.perf_counter()
+    with open(path, 'rb') as f:
+        cached_path = report_path(path, f.read())
+    try:
+        with open(cached_path, 'r') as f:
+            report = json.load(f)
+        return path, report['problems'], report['warnings'], None
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+
+    problems, warnings = find_problems(path)
+    os.makedirs(ANALYSIS_DIR, exist_ok=True)
+    name = os.path.splitext(os.path.basename(path))[0]
+    for old_path in glob.glob(os.path.join(ANALYSIS_DIR, f'{glob.escape(name)}-*.json')):
+        os.remove(old_path)
+    write_atomic(cached_path, json.dumps({'problems': problems, 'warnings': warnings}).encode())
+    return path, problems, warnings, time.perf_counter() - start_time
+
+# Returns the problems found in a map and the warnings about enemies and pickups the player may not get to, as messages
+def find_problems(path):
+    tilemap = Tilemap(None)
+    tilemap.load(path)
+    graph = MoveGraph(tilemap)
+    size = tilemap.tile_size
+    problems = []
+    warnings = []
+
+    # Spikes take their orientation from the solid tiles above and below them, like when the level is baked
+    for tile in tilemap.extract(SPIKE_PAIRS, keep=True):
+        x, y = tile['pos']
+        if not tilemap.solid_check((x + 8, y - 4)) and not tilemap.solid_check((x + 8, y + 18)):
+            problems.append(f"Spike at {tuple(tile['pos'])} has no solid tile above or below it")
+
+    # Spawners have to start in open space, their hitboxes may overlap the ground a little
+    spawners = tilemap.extract(SPAWNER_PAIRS, keep=True)
+    pickups = tilemap.extract(PICKUP_PAIRS, keep=True)
+    for spawner in spawners:
+        w, h = ENEMY_SIZES.get(spawner['variant'], PLAYER_SIZE)
+        if graph.classes(int((spawner['pos'][0] + w / 2) // size), int((spawner['pos'][1] + h / 2) // size)) & BLOCKING:
+            name = ENEMY_NAMES.get(spawner['variant'], 'player')
+            problems.append(f"Spawner ({name}) at {tuple(spawner['pos'])} is inside a wall")
+
+    players = [spawner for spawner in spawners if spawner['variant'] == 0]
+    if not players:
+        problems.append("No player spawner")
+    else:
+        start = graph.drop(*players[0]['pos'])
+        if start is None:
+            problems.append(f"Player spawner at {tuple(players[0]['pos'])} has no ground below it")
+        else:
+            standing, touched = graph.reachable(start)
+
+            # Enemies count as reached when the player gets next to them, gunners and oni walk along the ground they land on
+            # and yurei come after the player from wherever they can see it
+            for spawner in spawners:
+                if spawner['variant'] == 0:
+                    continue
+                w, h = ENEMY_SIZES.get(spawner['variant'], PLAYER_SIZE)
+                landing = graph.drop(spawner['pos'][0], spawner['pos'][1], (w, h))
+                cells = set(graph.cells(spawner['pos'][0] - size, spawner['pos'][1] - size, w + size * 2, h + size * 2))
+                if landing is not None and spawner['variant'] in WALKING_ENEMIES:
+                    cells |= {(tx + dx, ty + dy) for tx, ty in graph.walk_span(landing) for dx in (-1, 0, 1) for dy in (-1, 0, 1)}
+                if cells & touched:
+                    continue
+                if spawner['variant'] not in WALKING_ENEMIES and graph.sees(spawner['pos'][0] + w / 2, spawner['pos'][1] + h / 2, touched):
+                    continue
+                warnings.append(f"Possibly unreachable enemy ({ENEMY_NAMES.get(spawner['variant'], spawner['variant'])}) at {tuple(spawner['pos'])}")
+
+            # Pickups are collected by touching them, which the middle of the player does anywhere half its size around one
+            for pickup in pickups:
+                w, h = PLAYER_SIZE
+                if not set(graph.cells(pickup['pos'][0] - w / 2, pickup['pos'][1] - h / 2, size + w, size + h)) & touched:
+                    warnings.append(f"Possibly unreachable pickup ({PICKUP_NAMES.get(pickup['variant'], pickup['variant'])}) at {tuple(pickup['pos'])}")
+    return problems, warnings
+
+# Checks every map across all cores and prints each map's problems and warnings, returns 1 if any problems were found
+# Reports are cached by map contents, so only maps changed since the last run are checked again
+# Usage: python -m scripts.level_analyzer [maps...], defaulting to every map in data/maps
+def main(args):
+    paths = args or sorted(glob.glob('data/maps/*.json'), key=lambda path: int(os.path.basename(path).split('.')[0]))
+    start_time = time.perf_counter()
+    found = warned = 0
+    with ProcessPoolExecutor() as pool:
+        for path, problems, warnings, duration in pool.map(analyze_map, paths):
+            print(f"{path}: {len(problems)} problems, {len(warnings)} warnings ({'cached' if duration is None else f'{duration * 1000:.0f} ms'})")
+            for message in problems + warnings:
+                print(f"  [Warning] {message}")
+            found += len(problems)
+            warned += len(warnings)
+    print(f"{len(paths)} maps checked in {time.perf_counter() - start_time:.2f}s, {found} problems, {warned} warnings")
+    return 1 if found else 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,102 @@
+import json
+import os
+from scripts.config import STREAMING
+from scripts.map_format import read_map, write_map, write_atomic, map_hash, MAP_VERSION
+
+# Baked levels live here, a JSON sidecar of derived level data and a binary copy of the map with those tiles taken out
+BAKE_DIR = 'data/cache/levels'
+
+# Bump whenever the bake below changes, or the assets it measures do, so old sidecars are rebuilt
+BAKE_VERSION = 2
+
+# Tiles taken out of the map on load and handed to the level as objects instead
+SPAWNER_PAIRS = [('spawners', 0), ('spawners', 1), ('spawners', 2), ('spawners', 3)]
+PICKUP_PAIRS = [('pickups', 0), ('pickups', 1), ('pickups', 2)]
+SPIKE_PAIRS = [('spikes', 0), ('spikes', 1)]
+
+# Returns the key a baked level is stored under, covering the map file and the bake and map format versions
+def bake_key(data):
+    return map_hash(data + f'|bake {BAKE_VERSION}|map {MAP_VERSION}'.encode())
+
+# Returns the sidecar and baked map paths for a map file
+def bake_paths(path):
+    name = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(BAKE_DIR, name + '.json'), os.path.join(BAKE_DIR, name + '.nhmap')
+
+# Works out everything a level derives from its map, taking spawners, pickups and crumble blocks out of the tilemap
+def bake_level(tilemap):
+    # Every crumble block variant in the map, each becomes its own falling block
+    crumble_pairs = sorted({
+        ('crumble_blocks', variant)
+        for tile_id, variant in tilemap.get_grid_index()
+        if tilemap.tile_types[tile_id] == 'crumble_blocks'
+    } | {pair for pair in tilemap.offgrid_index if pair[0] == 'crumble_blocks'})
+    crumble_blocks = []
+    for pair in crumble_pairs:
+        crumble_blocks += tilemap.extract([pair])
+
+    # Spikes stay in the map, those under a solid tile hang from the ceiling and all others stand on the floor
+    spikes = []
+    for tile in tilemap.extract(SPIKE_PAIRS, keep=True):
+        x, y = tile['pos']
+        above = tilemap.solid_check((x + 8, y - 4))
+        spikes.append({'pos': tile['pos'], 'variant': tile['variant'], 'type': 'ceiling' if above else 'floor'})
+
+    return {
+        'crumble_blocks': [{'pos': tile['pos'], 'variant': tile['variant']} for tile in crumble_blocks],
+        'leaf_spawners': [
+            [4 + tree['pos'][0], 4 + tree['pos'][1], 23, 13] for tree in tilemap.extract([('flora', 1)], keep=True)
+        ],
+        'sakura_leaf_spawners': [
+            [26 + tree['pos'][0], 10 + tree['pos'][1], 23, 13] for tree in tilemap.extract([('flora', 2)], keep=True)
+        ],
+        'spawners': [{'pos': tile['pos'], 'variant': tile['variant']} for tile in tilemap.extract(SPAWNER_PAIRS)],
+        'pickups': [{'pos': tile['pos'], 'variant': tile['variant']} for tile in tilemap.extract(PICKUP_PAIRS)],
+        'spikes': spikes,
+        'collision': tilemap.collision_rects.export(),
+        'chunks': len(tilemap.chunks),
+    }
+
+# Loads a map into the tilemap with its extractable tiles already gone and returns the baked level data
+# Reads the baked copy when it was made from this exact map file, otherwise loads and bakes the map and stores the result
+# Large maps are streamed from the baked copy around the camera instead of being read whole
+def load_baked_level(tilemap, path):
+    try:
+        with open(path, 'rb') as f:
+            key = bake_key(f.read())
+    except FileNotFoundError:
+        print(f"[Warning] Map file not found: {path}")
+        tilemap.clear()
+        return bake_level(tilemap)
+
+    sidecar_path, map_path = bake_paths(path)
+    try:
+        with open(sidecar_path, 'r') as f:
+            baked = json.load(f)
+        if baked.get('key') == key.hex():
+            tilemap.clear()
+            if baked['chunks'] >= STREAMING['min_chunks']:
+                loaded = tilemap.stream(map_path, key)
+            else:
+                loaded = read_map(map_path, tilemap, key)
+            if loaded:
+                tilemap.collision_rects.restore(baked['collision'])
+                return baked
+    except (OSError, ValueError, KeyError):
+        pass
+
+    # Missing, stale or unreadable, bake the level again
+    tilemap.load(path)
+    baked = bake_level(tilemap)
+    try:
+        os.makedirs(BAKE_DIR, exist_ok=True)
+        write_map(map_path, tilemap, key)
+        write_atomic(sidecar_path, json.dumps({'key': key.hex(), **baked}).encode())
+    except OSError as e:
+        print(f"[Warning] Could not store baked level '{sidecar_path}': {e}")
+        return baked
+
+    # Switch a large map over to streaming from the copy just written, it stays fully loaded if that fails
+    if baked['chunks'] >= STREAMING['min_chunks'] and tilemap.stream(map_path, key):
+        tilemap.collision_rects.restore(baked['collision'])
+    return baked
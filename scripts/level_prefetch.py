@@ -0,0 +1,58 @@
+import threading
+
+# Prepares one upcoming level on a worker thread, so the main loop only has to swap it in when the level starts
+# A level asked for again before it was taken starts over, workers left behind by that hand what they made to discard
+class LevelPrefetcher:
+    def __init__(self, prepare, discard=None):
+        self.prepare = prepare
+        self.discard = discard
+        self.lock = threading.Lock()
+        self.map_id = None
+        self.thread = None
+        self.prepared = None
+
+    # Starts preparing a level in the background, unless it is already being prepared
+    def start(self, map_id):
+        with self.lock:
+            if map_id == self.map_id:
+                return
+            stale, self.prepared = self.prepared, None
+            self.map_id = map_id
+            self.thread = threading.Thread(target=self.run, args=(map_id,), daemon=True)
+            self.thread.start()
+        self.drop(stale)
+
+    # Worker thread body, a failed prefetch is only reported since the level will be loaded normally instead
+    # Only the worker started last keeps its level, an older one may finish after it was replaced
+    def run(self, map_id):
+        try:
+            prepared = self.prepare(map_id)
+        except Exception as e:
+            print(f"[Warning] Could not prefetch level {map_id}: {e}")
+            return
+        with self.lock:
+            if threading.current_thread() is self.thread:
+                self.prepared, prepared = prepared, None
+        self.drop(prepared)
+
+    # Hands a prepared level that will never be taken to discard
+    def drop(self, prepared):
+        if prepared is not None and self.discard is not None:
+            self.discard(prepared)
+
+    # Returns the prepared level if it is the one asked for, waiting for its worker if it has not finished yet
+    # Hands each prepared level out once, None means the caller has to prepare it itself
+    def take(self, map_id):
+        with self.lock:
+            if self.thread is None or map_id != self.map_id:
+                return None
+            thread = self.thread
+        thread.join()
+        with self.lock:
+            if thread is not self.thread:
+                return None
+            prepared = self.prepared
+            self.map_id = None
+            self.thread = None
+            self.prepared = None
+        return prepared
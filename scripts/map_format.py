@@ -0,0 +1,242 @@
+import glob
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from scripts.tile_chunks import TileChunk, CHUNK_AREA, FLIP_X, FLIP_Y, HAS_FLIP_X, HAS_FLIP_Y
+
+# Binary map files sit next to the JSON maps they were converted from
+MAP_MAGIC = b'NHMP'
+MAP_VERSION = 2
+MAP_EXTENSION = '.nhmap'
+
+# Little endian layout, in file order:
+#   header, type table (length prefixed names), extras JSON, chunk directory, offgrid records, chunk data
+# Each chunk's data is its raw arrays back to back: types (u16), variants (u16) and flags (u8), CHUNK_AREA of each
+# The header keeps the key of the JSON it came from, so a stale binary is never loaded
+HEADER = struct.Struct('<4sHH20sHIII')
+CHUNK_ENTRY = struct.Struct('<iiHI')
+OFFGRID_RECORD = struct.Struct('<ddHHB')
+CHUNK_BYTES = CHUNK_AREA * 5
+
+# Offgrid positions are stored as doubles, these bits remember which were whole numbers in the JSON
+POS_INT_X = 16
+POS_INT_Y = 32
+
+# Returns the hash of a map file's contents, for caches of what is derived from a map
+def map_hash(data):
+    return hashlib.sha1(data).digest()
+
+# Returns the key a binary copy of a JSON map is matched against, the JSON file's size and modification time
+# Only needs a stat, so checking a binary copy is fresh does not read the JSON, while any save of it changes the key
+def source_key(path):
+    stat = os.stat(path)
+    return struct.pack('<QQ4x', stat.st_size, stat.st_mtime_ns)
+
+# Writes a file through a temporary copy next to it, so nothing ever reads it half written
+# The temporary name is unique to the process, several workers can write the same file safely
+def write_atomic(path, data):
+    temp_path = f'{path}.{os.getpid()}.tmp'
+    try:
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+    except OSError:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+# Returns the path of the binary copy of a JSON map
+def binary_path(path):
+    return os.path.splitext(path)[0] + MAP_EXTENSION
+
+# Writes a loaded tilemap as a binary map, straight from its chunk arrays
+def write_map(path, tilemap, source_hash=bytes(20)):
+    # Offgrid tiles keep their order, types only placed offgrid are added to a copy of the grid's type table as they are found
+    # The tilemap's own table is left alone, writing a map does not change it
+    tile_types = list(tilemap.tile_types)
+    type_ids = dict(tilemap.type_ids)
+    offgrid = b''
+    offgrid_extras = {}
+    for i, tile in enumerate(tilemap.offgrid_tiles):
+        flags = 0
+        if 'flip_x' in tile:
+            flags |= HAS_FLIP_X | (FLIP_X if tile['flip_x'] else 0)
+        if 'flip_y' in tile:
+            flags |= HAS_FLIP_Y | (FLIP_Y if tile['flip_y'] else 0)
+        if isinstance(tile['pos'][0], int):
+            flags |= POS_INT_X
+        if isinstance(tile['pos'][1], int):
+            flags |= POS_INT_Y
+        tile_id = type_ids.get(tile['type'])
+        if tile_id is None:
+            tile_id = type_ids[tile['type']] = len(tile_types)
+            tile_types.append(tile['type'])
+        offgrid += OFFGRID_RECORD.pack(tile['pos'][0], tile['pos'][1], tile_id, tile['variant'], flags)
+        extras = {k: v for k, v in tile.items() if k not in ('type', 'variant', 'pos', 'flip_x', 'flip_y')}
+        if extras:
+            offgrid_extras[i] = extras
+    type_table = b''.join(bytes([len(name.encode())]) + name.encode() for name in tile_types[1:])
+
+    # Map layers other than the terrain are small, they ride along in the extras JSON
+    extras = b''
+    layers = tilemap.layers_dict()
+    if tilemap.tile_extras or offgrid_extras or layers:
+        extras = json.dumps({
+            'grid': {f'{x};{y}': tile_extras for (x, y), tile_extras in tilemap.tile_extras.items()},
+            'offgrid': offgrid_extras,
+            'layers': layers,
+        }).encode()
+
+    # Chunk data follows everything else, the directory points at it
+    data_start = HEADER.size + len(type_table) + len(extras) + CHUNK_ENTRY.size * len(tilemap.chunks) + len(offgrid)
+    directory = b''
+    chunk_data = []
+    for i, (key, chunk) in enumerate(tilemap.chunks.items()):
+        directory += CHUNK_ENTRY.pack(key[0], key[1], chunk.count, data_start + i * CHUNK_BYTES)
+        types, variants = array('H', chunk.types), array('H', chunk.variants)
+        if sys.byteorder == 'big':
+            types.byteswap()
+            variants.byteswap()
+        chunk_data += [types.tobytes(), variants.tobytes(), bytes(chunk.flags)]
+
+    header = HEADER.pack(
+        MAP_MAGIC, MAP_VERSION, tilemap.tile_size, source_hash,
+        len(tile_types) - 1, len(tilemap.chunks), len(tilemap.offgrid_tiles), len(extras),
+    )
+    write_atomic(path, header + type_table + extras + directory + offgrid + b''.join(chunk_data))
+
+# Reads the header and type table of a mapped binary map into a cleared tilemap
+# Returns the chunk count, offgrid count, extras and where the chunk directory starts, or None if the file does not match
+def read_header(data, tilemap, source_hash=None):
+    if len(data) < HEADER.size:
+        return None
+    magic, version, tile_size, file_hash, type_count, chunk_count, offgrid_count, extras_size = HEADER.unpack_from(data)
+    if magic != MAP_MAGIC or version != MAP_VERSION:
+        return None
+    if source_hash is not None and file_hash != source_hash:
+        return None
+
+    # Type table, added in file order so the ids in the chunk arrays line up with the tilemap's
+    offset = HEADER.size
+    for _ in range(type_count):
+        length = data[offset]
+        tilemap.type_id(data[offset + 1:offset + 1 + length].decode())
+        offset += 1 + length
+    extras = json.loads(data[offset:offset + extras_size]) if extras_size else {}
+    tilemap.tile_size = tile_size
+    return chunk_count, offgrid_count, extras, offset + extras_size
+
+# Returns the chunk directory of a mapped binary map, each chunk's tile count and data offset keyed by chunk coords
+def read_directory(data, offset, chunk_count):
+    directory = {}
+    for i in range(chunk_count):
+        cx, cy, count, chunk_offset = CHUNK_ENTRY.unpack_from(data, offset + i * CHUNK_ENTRY.size)
+        directory[(cx, cy)] = (count, chunk_offset)
+    return directory
+
+# Collision classes are looked up a whole chunk at a time, through the low bytes when every id fits in one
+def class_table(tilemap):
+    if len(tilemap.type_classes) > 256:
+        return None
+    return bytes(tilemap.type_classes) + bytes(256 - len(tilemap.type_classes))
+
+# Copies one chunk's arrays out of a mapped binary map
+def read_chunk(data, chunk_offset, count, tilemap, classes):
+    chunk = TileChunk.__new__(TileChunk)
+    chunk.types = array('H', data[chunk_offset:chunk_offset + CHUNK_AREA * 2])
+    chunk.variants = array('H', data[chunk_offset + CHUNK_AREA * 2:chunk_offset + CHUNK_AREA * 4])
+    if sys.byteorder == 'big':
+        chunk.types.byteswap()
+        chunk.variants.byteswap()
+    chunk.flags = bytearray(data[chunk_offset + CHUNK_AREA * 4:chunk_offset + CHUNK_BYTES])
+    if classes is not None:
+        chunk.classes = bytearray(data[chunk_offset:chunk_offset + CHUNK_AREA * 2:2].translate(classes))
+    else:
+        chunk.classes = bytearray(tilemap.type_classes[tile_id] for tile_id in chunk.types)
+    chunk.count = count
+    return chunk
+
+# Reads the grid tile extras and the offgrid tiles of a mapped binary map into the tilemap
+def read_extras(data, offset, offgrid_count, extras, tilemap):
+    for key, tile_extras in extras.get('grid', {}).items():
+        x, y = key.split(';')
+        tilemap.tile_extras[(int(x), int(y))] = tile_extras
+
+    # Offgrid tiles become dicts again, they are few and the rest of the game uses them as dicts
+    offgrid_extras = extras.get('offgrid', {})
+    for i in range(offgrid_count):
+        x, y, tile_id, variant, flags = OFFGRID_RECORD.unpack_from(data, offset)
+        offset += OFFGRID_RECORD.size
+        tile = {
+            'type': tilemap.tile_types[tile_id],
+            'variant': variant,
+            'pos': [int(x) if flags & POS_INT_X else x, int(y) if flags & POS_INT_Y else y],
+        }
+        if flags & HAS_FLIP_X:
+            tile['flip_x'] = bool(flags & FLIP_X)
+        if flags & HAS_FLIP_Y:
+            tile['flip_y'] = bool(flags & FLIP_Y)
+        tile.update(offgrid_extras.get(str(i), ()))
+        tilemap.add_offgrid(tile)
+    tilemap.load_layers(extras.get('layers', {}))
+
+# Loads a binary map into a cleared tilemap, the chunk arrays are copied straight out of the mapped file
+# Returns False without touching the tilemap if the file is missing, from another version, or not converted from source_hash
+# The binary copy of a JSON map is written with the JSON's source_key, a baked level with its bake key
+def read_map(path, tilemap, source_hash=None):
+    try:
+        f = open(path, 'rb')
+    except FileNotFoundError:
+        return False
+    with f:
+        if os.fstat(f.fileno()).st_size < HEADER.size:
+            return False
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            header = read_header(data, tilemap, source_hash)
+            if header is None:
+                return False
+            chunk_count, offgrid_count, extras, offset = header
+            classes = class_table(tilemap)
+            for key, (count, chunk_offset) in read_directory(data, offset, chunk_count).items():
+                tilemap.chunks[key] = read_chunk(data, chunk_offset, count, tilemap, classes)
+            read_extras(data, offset + CHUNK_ENTRY.size * chunk_count, offgrid_count, extras, tilemap)
+    return True
+
+# Converts JSON maps to binary maps next to them, or with --check verifies each one loads back identically
+# Usage: python -m scripts.map_format [--check] [maps...], defaulting to every map in data/maps
+def main(args):
+    from scripts.tilemap import Tilemap
+
+    check = '--check' in args
+    paths = [arg for arg in args if arg != '--check'] or sorted(glob.glob('data/maps/*.json'))
+    failed = 0
+    for path in paths:
+        with open(path, 'rb') as f:
+            source = f.read()
+        source_map = json.loads(source)
+        tilemap = Tilemap(None)
+        tilemap.load(path)
+        out_path = binary_path(path)
+        if not check:
+            write_map(out_path, tilemap, source_key(path))
+
+        # Round trip, the binary copy has to give back the same grid, offgrid tiles and tile size as the JSON
+        binary = Tilemap(None)
+        if not read_map(out_path, binary, source_key(path)):
+            print(f"[Error] {out_path} is missing or was not converted from {path}")
+            failed += 1
+            continue
+        if (binary.grid_dict() != source_map.get('tilemap', {}) or binary.offgrid_tiles != source_map.get('offgrid', [])
+                or binary.layers_dict() != source_map.get('layers', {}) or binary.tile_size != source_map.get('tile_size', binary.tile_size)):
+            print(f"[Error] {out_path} does not round trip to {path}")
+            failed += 1
+            continue
+        print(f"{path} -> {out_path} ({len(source)} -> {os.path.getsize(out_path)} bytes)")
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
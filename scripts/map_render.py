@@ -0,0 +1,215 @@
+import glob
+import os
+import queue
+import struct
+import sys
+import threading
+import types
+import zlib
+import pygame
+from scripts.config import ASSET_PATHS
+from scripts.level_bake import SPAWNER_PAIRS, PICKUP_PAIRS
+from scripts.map_format import map_hash
+from scripts.tile_chunks import CHUNK_SIZE
+from scripts.tilemap import Tilemap
+
+# Level thumbnails are cached here, named after the map and a hash of its contents so a changed map gets a new one
+THUMBNAIL_DIR = 'data/cache/thumbnails'
+THUMBNAIL_SIZE = (320, 120)
+
+# Loads a map for drawing, without the spawner and pickup markers that only the editor shows
+def load_map(game, path):
+    tilemap = Tilemap(game)
+    tilemap.load(path)
+    tilemap.extract(SPAWNER_PAIRS + PICKUP_PAIRS)
+    return tilemap
+
+# Returns the pixel rect holding every chunk and offgrid tile of a map and its layers, None for an empty map
+def map_bounds(tilemap):
+    size = CHUNK_SIZE * tilemap.tile_size
+    rects = []
+    for layer in [tilemap] + list(tilemap.layers.values()):
+        rects += [pygame.Rect(cx * size, cy * size, size, size) for cx, cy in layer.chunks]
+        rects += [layer.offgrid_rect(tile) for tile in layer.offgrid_tiles]
+    if not rects:
+        return None
+    return rects[0].unionall(rects[1:])
+
+# Draws a map in horizontal strips one chunk tall, yielding (top, strip) so only one strip is ever held in memory
+# Layers are drawn without parallax, lined up with the terrain as they are in the editor
+def render_strips(tilemap, bounds):
+    strip_height = CHUNK_SIZE * tilemap.tile_size
+    strip = pygame.Surface((bounds.width, strip_height), pygame.SRCALPHA)
+    for top in range(bounds.top, bounds.bottom, strip_height):
+        strip.fill((0, 0, 0, 0))
+        tilemap.render(strip, offset=(bounds.left, top), parallax=False)
+        tilemap.render_front(strip, offset=(bounds.left, top), parallax=False)
+        yield top, strip.subsurface((0, 0, bounds.width, min(strip_height, bounds.bottom - top)))
+
+# Writes a full resolution PNG of a map, compressed a strip at a time since a large map would not fit in one surface
+def export_image(tilemap, path):
+    bounds = map_bounds(tilemap)
+    if bounds is None:
+        print(f"[Warning] Nothing to export in {path}")
+        return False
+
+    # Returns one PNG chunk, its length, type, data and CRC
+    def png_chunk(chunk_type, data):
+        return struct.pack('>I', len(data)) + chunk_type + data + struct.pack('>I', zlib.crc32(chunk_type + data))
+
+    compressor = zlib.compressobj()
+    with open(path, 'wb') as f:
+        f.write(b'\x89PNG\r\n\x1a\n' + png_chunk(b'IHDR', struct.pack('>IIBBBBB', bounds.width, bounds.height, 8, 6, 0, 0, 0)))
+        row_size = bounds.width * 4
+        for top, strip in render_strips(tilemap, bounds):
+            pixels = pygame.image.tobytes(strip, 'RGBA')
+            # Each row starts with its filter type, 0 for none
+            rows = b''.join(b'\x00' + pixels[i:i + row_size] for i in range(0, len(pixels), row_size))
+            data = compressor.compress(rows)
+            if data:
+                f.write(png_chunk(b'IDAT', data))
+        f.write(png_chunk(b'IDAT', compressor.flush()) + png_chunk(b'IEND', b''))
+    return True
+
+# Draws a map scaled down to fit in a size, strip by strip so a huge map costs no more memory than a small one
+def make_thumbnail(tilemap, size=THUMBNAIL_SIZE):
+    thumbnail = pygame.Surface(size, pygame.SRCALPHA)
+    bounds = map_bounds(tilemap)
+    if bounds is None:
+        return thumbnail
+    scale = min(size[0] / bounds.width, size[1] / bounds.height)
+    width = max(1, round(bounds.width * scale))
+    x = (size[0] - width) // 2
+    y = (size[1] - round(bounds.height * scale)) // 2
+    for top, strip in render_strips(tilemap, bounds):
+        # Rows are rounded from both edges of the strip so neighboring strips meet without gaps
+        first, last = round((top - bounds.top) * scale), round((top - bounds.top + strip.get_height()) * scale)
+        if last > first:
+            thumbnail.blit(pygame.transform.smoothscale(strip, (width, last - first)), (x, y + first))
+    return thumbnail
+
+# Returns where the thumbnail of a map's current contents is cached
+def thumbnail_path(path, data, size=THUMBNAIL_SIZE):
+    name = os.path.splitext(os.path.basename(path))[0]
+    key = map_hash(data + f'|thumbnail {size[0]}x{size[1]}'.encode()).hex()[:16]
+    return os.path.join(THUMBNAIL_DIR, f'{name}-{key}.png')
+
+# Draws a map's thumbnail and stores it in the disk cache, replacing those of older versions of the map
+def save_thumbnail(game, path, cached_path, size=THUMBNAIL_SIZE):
+    thumbnail = make_thumbnail(load_map(game, path), size)
+    os.makedirs(THUMBNAIL_DIR, exist_ok=True)
+    name = os.path.splitext(os.path.basename(path))[0]
+    for old_path in glob.glob(os.path.join(THUMBNAIL_DIR, f'{glob.escape(name)}-*.png')):
+        os.remove(old_path)
+    # Saved under a temporary name first so a menu never loads a half written image, pygame picks the format from the extension
+    temp_path = f'{os.path.splitext(cached_path)[0]}.{os.getpid()}.tmp.png'
+    pygame.image.save(thumbnail, temp_path)
+    os.replace(temp_path, cached_path)
+    return thumbnail
+
+# Returns a stand in for the game holding just the tile images, for drawing maps outside of the game
+# Tile images are converted like in the game, which needs a display even if nothing is shown on it
+def render_game():
+    from scripts.utils import load_images
+
+    pygame.display.init()
+    pygame.display.set_mode((1, 1), pygame.HIDDEN)
+    return types.SimpleNamespace(assets={key: load_images(path) for key, path in ASSET_PATHS['tiles']})
+
+# Level thumbnails for menus, read from the disk cache and drawn on a worker thread when missing or out of date
+# get never blocks, a thumbnail still being drawn is None until the worker has finished it
+class ThumbnailCache:
+    def __init__(self, game, size=THUMBNAIL_SIZE):
+        self.game = game
+        self.size = size
+        self.thumbnails = {}
+        self.pending = set()
+        self.queue = queue.Queue()
+        self.thread = None
+
+    # Returns the thumbnail of a map, asking the worker to draw it if it is not cached for the map's current contents
+    def get(self, path):
+        if path in self.thumbnails:
+            return self.thumbnails[path]
+        if path in self.pending:
+            return None
+        try:
+            with open(path, 'rb') as f:
+                cached_path = thumbnail_path(path, f.read(), self.size)
+        except OSError:
+            self.thumbnails[path] = None
+            return None
+        if os.path.exists(cached_path):
+            try:
+                self.thumbnails[path] = pygame.image.load(cached_path)
+                return self.thumbnails[path]
+            except pygame.error:
+                pass
+        self.pending.add(path)
+        self.queue.put((path, cached_path))
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run, daemon=True)
+            self.thread.start()
+        return None
+
+    # Worker thread body, draws queued thumbnails and stores them until stop queues None
+    def run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                self.queue.task_done()
+                return
+            path, cached_path = item
+            try:
+                thumbnail = save_thumbnail(self.game, path, cached_path, self.size)
+            except Exception as e:
+                print(f"[Warning] Could not make a thumbnail of {path}: {e}")
+                thumbnail = None
+            self.thumbnails[path] = thumbnail
+            self.pending.discard(path)
+            self.queue.task_done()
+
+    # Drops the thumbnails still queued and waits for the worker to finish the one it is on, once the menu that wanted them closes
+    # The worker draws through caches the game shares, so none of its work may overlap with gameplay
+    def stop(self):
+        if self.thread is None:
+            return
+        while True:
+            try:
+                path, _ = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            self.pending.discard(path)
+            self.queue.task_done()
+        self.queue.put(None)
+        self.thread.join()
+        self.thread = None
+
+# Writes a full resolution image of each map, or with --thumbnails refreshes the cached thumbnails
+# Usage: python -m scripts.map_render [--thumbnails] [--out directory] [maps...], defaulting to every map in data/maps
+def main(args):
+    out = 'data/cache/images'
+    if '--out' in args:
+        out = args[args.index('--out') + 1]
+        args = args[:args.index('--out')] + args[args.index('--out') + 2:]
+    thumbnails = '--thumbnails' in args
+    paths = [arg for arg in args if arg != '--thumbnails'] or sorted(glob.glob('data/maps/*.json'))
+
+    game = render_game()
+    if thumbnails:
+        cache = ThumbnailCache(game)
+        for path in paths:
+            cache.get(path)
+        cache.queue.join()
+        print(f"{len(paths)} thumbnails in {THUMBNAIL_DIR}")
+        return 0
+
+    os.makedirs(out, exist_ok=True)
+    for path in paths:
+        image_path = os.path.join(out, os.path.splitext(os.path.basename(path))[0] + '.png')
+        if export_image(load_map(game, path), image_path):
+            print(f"{path} -> {image_path}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,142 @@
+import argparse
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from scripts.config import ASSET_PATHS
+from scripts.level_analyzer import analyze_map
+from scripts.level_bake import load_baked_level
+from scripts.map_format import read_map, write_map, binary_path, source_key
+from scripts.tilemap import Tilemap
+from scripts.utils import BASE_IMG_PATH
+
+# Tiles only the editor draws, marking where the level spawns enemies and pickups
+MARKER_PATHS = [('spawners', 'tiles/spawners'), ('pickups', 'tiles/pickups')]
+
+# Map steps, run in the order given on the command line, each takes a map path and returns a note, any problems and any warnings
+# Problems fail the run, warnings are only reported
+# Every file a step writes is written to a temporary copy first, so a map is never left half written
+
+# Autotiles the terrain and every layer, saving the map only if a tile changed
+def autotile_step(path):
+    tilemap = Tilemap(None)
+    tilemap.load(path)
+    before = (tilemap.grid_dict(), tilemap.layers_dict())
+    tilemap.autotile()
+    for layer in tilemap.layers.values():
+        layer.autotile()
+    if (tilemap.grid_dict(), tilemap.layers_dict()) == before:
+        return 'unchanged', [], []
+    tilemap.save(path)
+    return 'retiled', [], []
+
+# Converts the map to its binary copy
+def binary_step(path):
+    source_hash = source_key(path)
+    tilemap = Tilemap(None)
+    if read_map(binary_path(path), tilemap, source_hash):
+        return 'up to date', [], []
+    tilemap.load(path)
+    write_map(binary_path(path), tilemap, source_hash)
+    return f'{os.path.getsize(binary_path(path))} bytes', [], []
+
+# Checks for tiles without images, a stale binary copy, and anything the level analyzer finds
+# What the analyzer could not show the player gets to is only a warning, its movement model is not exhaustive
+def validate_step(path):
+    source_hash = source_key(path)
+    tilemap = Tilemap(None)
+    tilemap.load(path)
+    problems = []
+    variant_counts = {tile_type: len(os.listdir(BASE_IMG_PATH + folder)) for tile_type, folder in ASSET_PATHS['tiles'] + MARKER_PATHS}
+    for layer_name, layer in [(None, tilemap)] + list(tilemap.layers.items()):
+        where = f" in layer '{layer_name}'" if layer_name else ''
+        pairs = {(layer.tile_types[tile_id], variant) for tile_id, variant in layer.get_grid_index()} | set(layer.offgrid_index)
+        for tile_type in sorted({tile_type for tile_type, _ in pairs} - set(variant_counts)):
+            problems.append(f"Unknown tile type '{tile_type}'{where}")
+        for tile_type, variant in sorted(pairs):
+            if tile_type in variant_counts and not 0 <= variant < variant_counts[tile_type]:
+                problems.append(f"Tile '{tile_type}' has no variant {variant}{where}")
+    if os.path.exists(binary_path(path)) and not read_map(binary_path(path), Tilemap(None), source_hash):
+        problems.append(f"Binary copy {binary_path(path)} is out of date")
+    _, analyzer_problems, warnings, _ = analyze_map(path)
+    problems += analyzer_problems
+    return f'{len(problems)} problems, {len(warnings)} warnings', problems, warnings
+
+# Bakes the level sidecar and its binary copy in data/cache/levels, unless they are already up to date
+def bake_step(path):
+    tilemap = Tilemap(None)
+    baked = load_baked_level(tilemap, path)
+    tilemap.clear()
+    return f"{len(baked['spawners'])} spawners, {len(baked['pickups'])} pickups", [], []
+
+# Draws the level's menu thumbnail, unless it is already cached for the map's current contents
+def thumbnail_step(path):
+    from scripts.map_render import render_game, save_thumbnail, thumbnail_path
+
+    global render_assets
+    with open(path, 'rb') as f:
+        cached_path = thumbnail_path(path, f.read())
+    if os.path.exists(cached_path):
+        return 'up to date', [], []
+    if render_assets is None:
+        render_assets = render_game()
+    save_thumbnail(render_assets, path, cached_path)
+    return cached_path, [], []
+
+# Tile images for thumbnails, loaded once per worker process and only if a thumbnail has to be drawn
+render_assets = None
+
+STEPS = {
+    'autotile': autotile_step,
+    'binary': binary_step,
+    'validate': validate_step,
+    'bake': bake_step,
+    'thumbnail': thumbnail_step,
+}
+
+# Worker body, runs every step on one map and times each
+# A failed step is reported and stops the rest of that map's steps, other maps carry on
+def run_steps(path, steps):
+    results = []
+    for step in steps:
+        start_time = time.perf_counter()
+        try:
+            note, problems, warnings = STEPS[step](path)
+        except Exception as e:
+            results.append((step, time.perf_counter() - start_time, 'failed', [], [], f'{type(e).__name__}: {e}'))
+            break
+        results.append((step, time.perf_counter() - start_time, note, problems, warnings, None))
+    return path, results
+
+# Runs map steps over every map across all cores and prints per map timings, returns 1 if anything failed or any problem was found
+# Usage: python -m scripts.map_tool autotile binary validate bake thumbnail [--maps maps...] [--jobs N]
+def main(args):
+    parser = argparse.ArgumentParser(prog='python -m scripts.map_tool', description='Run steps over every map in parallel.')
+    parser.add_argument('steps', nargs='+', choices=list(STEPS), help='steps to run on each map, in order')
+    parser.add_argument('--maps', nargs='+', help='maps to process, defaulting to every map in data/maps')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count(), help='worker processes')
+    options = parser.parse_args(args)
+    paths = options.maps or sorted(glob.glob('data/maps/*.json'), key=lambda path: int(os.path.basename(path).split('.')[0]))
+
+    start_time = time.perf_counter()
+    failed = found = 0
+    step_times = dict.fromkeys(options.steps, 0)
+    with ProcessPoolExecutor(max_workers=max(1, options.jobs)) as pool:
+        for path, results in pool.map(run_steps, paths, [options.steps] * len(paths)):
+            total = sum(result[1] for result in results)
+            print(f"{path} ({total * 1000:.0f} ms): " + ', '.join(f"{step} {duration * 1000:.0f} ms ({note})" for step, duration, note, _, _, _ in results))
+            for step, duration, note, problems, warnings, error in results:
+                step_times[step] += duration
+                for message in problems + warnings:
+                    print(f"  [Warning] {message}")
+                found += len(problems)
+                if error:
+                    print(f"  [Error] {step} failed: {error}")
+                    failed += 1
+    print(f"{len(paths)} maps in {time.perf_counter() - start_time:.2f}s on {max(1, options.jobs)} processes, "
+          + ', '.join(f"{step} {duration:.2f}s" for step, duration in step_times.items()))
+    return 1 if failed or found else 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,37 @@
+import glob
+import os
+import time
+from scripts.config import HOT_RELOAD_INTERVAL
+
+# Notices map files being saved, by polling their modification times so it works the same on every platform
+# Maps are saved through a temporary file, so a changed time always means a complete new map is in place
+class MapWatcher:
+    def __init__(self, folder='data/maps', interval=HOT_RELOAD_INTERVAL):
+        self.folder = folder
+        self.interval = interval
+        self.stamps = self.read_stamps()
+        self.next_check = time.monotonic() + interval
+
+    # Returns the modification time and size of every map, keyed by path
+    def read_stamps(self):
+        stamps = {}
+        for path in glob.glob(os.path.join(self.folder, '*.json')):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            stamps[os.path.normpath(path)] = (stat.st_mtime_ns, stat.st_size)
+        return stamps
+
+    # Returns the paths of the maps written since the last call, checking the folder at most once per interval
+    def changed(self):
+        if not self.interval:
+            return []
+        now = time.monotonic()
+        if now < self.next_check:
+            return []
+        self.next_check = now + self.interval
+        stamps = self.read_stamps()
+        changed = [path for path, stamp in stamps.items() if self.stamps.get(path) != stamp]
+        self.stamps = stamps
+        return changed
@@ -0,0 +1,108 @@
+import argparse
+import math
+import os
+import random
+import sys
+import pygame
+from scripts.config import ASSET_PATHS
+from scripts.tilemap import Tilemap, AUTOTILE_TYPES
+from scripts.utils import BASE_IMG_PATH
+
+# Generated maps go here by default, out of data/maps so they never show up as levels
+GENERATED_DIR = 'data/cache/generated'
+
+# Terrain changes type every this many columns, so every autotiled type shows up in a large map
+BIOME_WIDTH = 64
+
+# Spawner variants for the player and for each enemy type, and the pickup variants
+PLAYER_SPAWNER = 0
+ENEMY_SPAWNERS = [1, 2, 3]
+PICKUP_VARIANTS = [0, 1, 2]
+
+# Returns the image sizes of every variant of a tile type, read from disk so no display is needed
+def variant_sizes(path):
+    folder = BASE_IMG_PATH + path
+    return [pygame.image.load(os.path.join(folder, name)).get_size() for name in sorted(os.listdir(folder))]
+
+# Builds a map shaped like the hand made levels, a long strip of terrain with decor, hazards and enemies on top
+# tiles is the number of terrain tiles, decor the chance of a decor tile on each surface column, the rest are counts
+def generate(tiles, decor=0.1, spawners=0, spikes=0, pickups=0, crumbles=0, seed=0):
+    rng = random.Random(seed)
+    tile_paths = dict(ASSET_PATHS['tiles'])
+    terrain_types = [tile_type for tile_type in tile_paths if tile_type in AUTOTILE_TYPES]
+    decor_types = [tile_type for tile_type in ('small_decor', 'large_decor', 'flora', 'village_decor') if tile_type in tile_paths]
+    decor_sizes = {tile_type: variant_sizes(tile_paths[tile_type]) for tile_type in decor_types}
+    tilemap = Tilemap(None)
+    tile_size = tilemap.tile_size
+
+    # Wide rather than deep, about eight columns for every row of terrain, with the surface wandering up and down
+    width = max(16, math.ceil(math.sqrt(tiles * 8)))
+    depth, extra = divmod(tiles, width)
+    surface = []
+    height = 0
+    for x in range(width):
+        if x % 4 == 0:
+            height = max(-8, min(8, height + rng.choice((-1, 0, 0, 1))))
+        surface.append(height)
+    for x in range(width):
+        tile_type = terrain_types[(x // BIOME_WIDTH) % len(terrain_types)]
+        for y in range(surface[x], surface[x] + depth + (1 if x < extra else 0)):
+            tilemap.set_tile({'type': tile_type, 'variant': 0, 'pos': [x, y]})
+    tilemap.autotile()
+
+    # Spikes sit on the surface and crumble blocks float above it, each on its own column away from the player start
+    columns = list(range(8, width))
+    if spikes + crumbles > len(columns):
+        print(f"[Warning] Only {len(columns)} columns for {spikes + crumbles} spikes and crumble blocks")
+    columns = rng.sample(columns, min(spikes + crumbles, len(columns)))
+    for x in columns[:spikes]:
+        tilemap.set_tile({'type': 'spikes', 'variant': 0, 'pos': [x, surface[x] - 1]})
+    for x in columns[spikes:]:
+        tilemap.set_tile({'type': 'crumble_blocks', 'variant': 0, 'pos': [x, surface[x] - 4]})
+
+    # Decor stands on the surface, drawn under the grid like in the editor
+    for x in range(width):
+        if decor_types and rng.random() < decor:
+            tile_type = rng.choice(decor_types)
+            variant = rng.randrange(len(decor_sizes[tile_type]))
+            tile_width, tile_height = decor_sizes[tile_type][variant]
+            tilemap.add_offgrid({
+                'type': tile_type,
+                'variant': variant,
+                'pos': [float(x * tile_size + rng.randint(0, max(0, tile_size - tile_width))), float(surface[x] * tile_size - tile_height)],
+            })
+
+    # The player starts at the left end, enemies and pickups drop onto the surface from just above it
+    def above_surface(x):
+        return [float(x * tile_size + 4), float((surface[x] - 2) * tile_size)]
+    tilemap.add_offgrid({'type': 'spawners', 'variant': PLAYER_SPAWNER, 'pos': above_surface(2)})
+    for _ in range(spawners):
+        tilemap.add_offgrid({'type': 'spawners', 'variant': rng.choice(ENEMY_SPAWNERS), 'pos': above_surface(rng.randrange(8, width))})
+    for _ in range(pickups):
+        tilemap.add_offgrid({'type': 'pickups', 'variant': rng.choice(PICKUP_VARIANTS), 'pos': above_surface(rng.randrange(8, width))})
+    return tilemap
+
+# Writes generated maps for benchmarks, one per tile count so a single run can sweep level sizes
+# Usage: python -m scripts.mapgen --tiles 10000 100000 1000000 [--decor 0.1] [--spawners N] [--spikes N] [--pickups N] [--crumbles N]
+def main(args):
+    parser = argparse.ArgumentParser(prog='python -m scripts.mapgen', description='Generate large maps in the game\'s map format.')
+    parser.add_argument('--tiles', type=int, nargs='+', default=[10000], help='terrain tile counts, one map each')
+    parser.add_argument('--decor', type=float, default=0.1, help='chance of a decor tile on each surface column')
+    parser.add_argument('--spawners', type=int, default=0, help='number of enemy spawners')
+    parser.add_argument('--spikes', type=int, default=0, help='number of spikes')
+    parser.add_argument('--pickups', type=int, default=0, help='number of pickups')
+    parser.add_argument('--crumbles', type=int, default=0, help='number of crumble blocks')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', default=GENERATED_DIR, help='directory the maps are written to')
+    options = parser.parse_args(args)
+
+    os.makedirs(options.out, exist_ok=True)
+    for tiles in options.tiles:
+        tilemap = generate(tiles, options.decor, options.spawners, options.spikes, options.pickups, options.crumbles, options.seed)
+        path = os.path.join(options.out, f'gen_{tiles}_{options.seed}.json')
+        tilemap.save(path)
+        print(f"{path}: {tilemap.tile_count()} grid tiles, {len(tilemap.offgrid_tiles)} offgrid tiles, {len(tilemap.chunks)} chunks")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,83 @@
+import threading
+import weakref
+import pygame
+from scripts.config import OUTLINE_QUALITY
+from scripts.damage import DamageSurface
+
+# Shifts the silhouette of the draw layer is blitted at, one pixel each way
+OUTLINE_OFFSETS = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+
+# Masks of images that never change once made, such as baked tile chunks, found once when the image is made
+STATIC_MASKS = weakref.WeakKeyDictionary()
+# Thumbnails bake chunks on a worker thread while the menu draws, so the masks are only touched holding this
+MASKS_LOCK = threading.Lock()
+
+# Marks an image as never changing, so blitting it onto an outlined layer reuses its mask instead of reading pixels back
+# Images with faint pixels are left out, two faint pixels drawn over each other can add up to a solid one
+def bake_mask(surf):
+    mask = pygame.mask.from_surface(surf)
+    if mask.count() == pygame.mask.from_surface(surf, 0).count():
+        with MASKS_LOCK:
+            STATIC_MASKS[surf] = mask
+    return surf
+
+# The game's draw layer, keeps track of which of its pixels are solid as things are drawn onto it
+# Static images bring their own mask, anything else marks the area it covered to be read back once at the end of the frame
+# Drawing onto it with pygame.draw has to be marked by hand, see scripts.damage.mark_drawn
+class OutlineSurface(DamageSurface):
+    def __init__(self, size, quality=OUTLINE_QUALITY):
+        super().__init__(size, pygame.SRCALPHA)
+        self.quality = quality
+        self.mask = pygame.mask.Mask(size)
+        self.dirty = []
+        self.silhouette = pygame.Surface(size, pygame.SRCALPHA)
+
+    # Clearing the whole layer clears the mask and starts the frame, any other fill is read back
+    def fill(self, color, rect=None, special_flags=0):
+        if rect is None and not special_flags and pygame.Color(color).a == 0:
+            self.mask.clear()
+            self.dirty = []
+            return pygame.Surface.fill(self, color)
+        result = super().fill(color, rect, special_flags)
+        self.dirty.append(result)
+        return result
+
+    def blit(self, source, dest, area=None, special_flags=0):
+        result = super().blit(source, dest, area, special_flags)
+        mask = None
+        if area is None and not special_flags:
+            with MASKS_LOCK:
+                mask = STATIC_MASKS.get(source)
+        if mask is not None:
+            self.mask.draw(mask, (int(dest[0]), int(dest[1])))
+        else:
+            self.dirty.append(result)
+        return result
+
+    # Marks an area drawn onto some other way, such as the rect pygame.draw returns
+    def mark(self, rect):
+        super().mark(rect)
+        self.dirty.append(rect)
+
+    # Darkens the pixels around everything drawn onto the layer so far, blitting its silhouette shifted onto the target
+    # 'full' reads the whole layer back every frame, 'cached' only the areas not covered by static masks, 'off' skips outlines
+    def draw_outline(self, target, color=(0, 0, 0, 180)):
+        if self.quality == 'off':
+            return
+        if self.quality == 'full':
+            mask = pygame.mask.from_surface(self)
+        else:
+            mask = self.mask
+            bounds = self.get_rect()
+            for rect in self.dirty:
+                rect = bounds.clip(rect)
+                if rect.width and rect.height:
+                    mask.draw(pygame.mask.from_surface(self.subsurface(rect)), rect.topleft)
+            self.dirty = []
+        mask.to_surface(self.silhouette, setcolor=color, unsetcolor=(0, 0, 0, 0))
+        for offset in OUTLINE_OFFSETS:
+            pygame.Surface.blit(target, self.silhouette, offset)
+        # The outline can only have changed a pixel around where the layer did
+        if isinstance(target, DamageSurface):
+            for rect in self.pending_damage():
+                target.mark(rect.inflate(2, 2))
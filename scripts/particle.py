@@ -1,3 +1,5 @@
+from scripts.effects import effects
+
 # Base particle class, runs for a full animation cycle
 class Particle:
     def __init__(self, game, p_type, pos, velocity=[0, 0], frame=0, alpha=255):
@@ -25,8 +27,7 @@ class Particle:
     def render(self, surf, offset=(0, 0)):
         img = self.animation.img()
         if self.alpha < 255:
-            img = img.copy()
-            img.set_alpha(self.alpha)
+            img = effects.faded(img, self.alpha)
         surf.blit(img, (
             self.pos[0] - offset[0] - img.get_width() // 2,
             self.pos[1] - offset[1] - img.get_height() // 2
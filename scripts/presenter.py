@@ -0,0 +1,195 @@
+import argparse
+import sys
+import time
+import pygame
+from scripts.config import PRESENT_MODE
+from scripts.damage import DamageSurface
+
+# Ways frames are scaled up to the window
+# 'scale' scales straight into the window, 'integer' scales by the largest whole number that fits and centers the frame,
+# 'sdl' opens the window at the frame's size with the SCALED flag and leaves the upscale to SDL
+PRESENT_MODES = ['scale', 'integer', 'sdl']
+
+# Puts finished frames on the window, sending only the areas that changed since the last present
+# Frames drawn on a DamageSurface report those areas themselves, menus drawing straight onto the window pass the rects they drew
+# Frames where the camera moved or the screen shakes change nearly everywhere, those are presented whole
+class Presenter:
+    def __init__(self, screen, mode=PRESENT_MODE, max_rects=32):
+        self.screen = screen
+        # Size menus are laid out for, the window is only ever smaller while 'sdl' mode has it at the frame's size
+        self.size = screen.get_size()
+        self.mode = mode if mode in PRESENT_MODES else 'scale'
+        # More changed areas than this are sent as the one rect around them all
+        self.max_rects = max_rects
+        self.source = None
+        self.view = None
+        self.whole = True
+        self.last_damage = []
+        self.scaled = False
+        self.shaken = None
+        self.full_presents = 0
+        self.partial_presents = 0
+        # Seconds spent presenting and number of presents, per mode
+        self.timings = {}
+
+    # Makes the next present a whole one, for after something draws straight onto the window
+    def invalidate(self):
+        self.whole = True
+
+    # Returns the window at the size menus are laid out for, with the last frame scaled up on it
+    # Anything drawing straight onto the window gets it from here, since 'sdl' mode shrinks it during play
+    def window(self):
+        if self.scaled:
+            pygame.display.set_mode(self.size)
+            self.scaled = False
+            if self.source is not None and self.source is not self.screen:
+                pygame.transform.scale(self.source, self.size, self.screen)
+        self.whole = True
+        return self.screen
+
+    # Where a frame goes on the window, as (scale, left, top), or None when it only fits stretched
+    def placement(self, surf):
+        width, height = surf.get_size()
+        if self.mode == 'integer':
+            scale = max(1, min(self.size[0] // width, self.size[1] // height))
+            return scale, (self.size[0] - width * scale) // 2, (self.size[1] - height * scale) // 2
+        if self.size[0] % width or self.size[1] % height or self.size[0] // width != self.size[1] // height:
+            return None
+        return self.size[0] // width, 0, 0
+
+    # Opens the window at the frame's size for 'sdl' mode, falling back to 'scale' if SDL can not scale this window
+    def shrink_window(self, size):
+        try:
+            pygame.display.set_mode(size, pygame.SCALED)
+        except pygame.error as e:
+            print(f"[Warning] SCALED window unavailable, presenting with 'scale' instead: {e}")
+            self.mode = 'scale'
+            pygame.display.set_mode(self.size)
+            return
+        self.scaled = True
+        self.whole = True
+
+    # Presents a frame, scaled up to the window from surf, or the window itself when surf is None
+    # view is what the frame looks at, such as the camera scroll, a new view is always presented whole
+    # offset shifts the frame on the window, in window pixels
+    # damage lists the window rects drawn onto since the last present when surf is None, without it the window is presented whole
+    def present(self, surf=None, offset=(0, 0), view=None, damage=None):
+        start_time = time.perf_counter()
+        if surf is not None and self.mode == 'sdl' and not self.scaled:
+            self.shrink_window(surf.get_size())
+        source = surf if surf is not None else self.screen
+        whole = self.whole or source is not self.source or view != self.view or offset[0] or offset[1]
+        self.whole = False
+        self.source = source
+        self.view = view
+
+        # Damage is taken even for whole presents, so the next frame still knows what this one drew
+        if surf is not None:
+            rects = surf.take_damage() if isinstance(surf, DamageSurface) else None
+        else:
+            rects = None if damage is None else list(damage) + self.last_damage
+            self.last_damage = list(damage or [])
+        if surf is not None and self.scaled:
+            self.present_scaled(surf, offset)
+        else:
+            self.present_window(surf, offset, None if whole else rects)
+        timing = self.timings.setdefault(self.mode, [0, 0])
+        timing[0] += time.perf_counter() - start_time
+        timing[1] += 1
+
+    # SDL scales the whole window anyway, so the frame is copied over whole, shifted by the offset in frame pixels
+    def present_scaled(self, surf, offset):
+        self.screen.blit(surf, (offset[0] * surf.get_width() / self.size[0], offset[1] * surf.get_height() / self.size[1]))
+        pygame.display.flip()
+        self.full_presents += 1
+
+    # Scales into the window itself, or into a surface kept for shaken frames, so presenting allocates no window sized surface
+    # rects are the areas of the source that changed, None to present it whole
+    def present_window(self, surf, offset, rects):
+        placement = self.placement(surf) if surf is not None else (1, 0, 0)
+        # Areas only line up with the window at whole number scales
+        if rects is not None and placement:
+            rects = merge_rects(rects, (surf if surf is not None else self.screen).get_rect(), self.max_rects)
+        else:
+            rects = None
+        if rects is None:
+            if surf is not None:
+                self.scale_whole(surf, offset, placement)
+            pygame.display.update()
+            self.full_presents += 1
+            return
+
+        # Scale only the changed areas, the window keeps the rest from earlier presents
+        if surf is not None:
+            scale, left, top = placement
+            screen_rects = []
+            for rect in rects:
+                screen_rect = pygame.Rect(left + rect.x * scale, top + rect.y * scale, rect.width * scale, rect.height * scale)
+                pygame.transform.scale(surf.subsurface(rect), screen_rect.size, self.screen.subsurface(screen_rect))
+                screen_rects.append(screen_rect)
+            rects = screen_rects
+        if rects:
+            pygame.display.update(rects)
+        self.partial_presents += 1
+
+    # Scales a whole frame onto the window
+    def scale_whole(self, surf, offset, placement):
+        if placement:
+            scale, left, top = placement
+            size = (surf.get_width() * scale, surf.get_height() * scale)
+            if left or top:
+                self.screen.fill((0, 0, 0))
+        else:
+            left = top = 0
+            size = self.size
+        if not offset[0] and not offset[1]:
+            pygame.transform.scale(surf, size, self.screen.subsurface((left, top, *size)))
+            return
+        if self.shaken is None or self.shaken.get_size() != size:
+            self.shaken = pygame.Surface(size)
+        pygame.transform.scale(surf, size, self.shaken)
+        self.screen.blit(self.shaken, (left + offset[0], top + offset[1]))
+
+    # Average milliseconds per present of every mode used so far
+    def report(self):
+        return ', '.join(f"{mode} {seconds / presents * 1000:.3f} ms over {presents} presents" for mode, (seconds, presents) in self.timings.items())
+
+# Returns changed rects clipped to bounds, overlapping ones joined, or the one rect around them all if there are more than max_rects
+def merge_rects(rects, bounds, max_rects):
+    merged = []
+    for rect in rects:
+        rect = bounds.clip(rect)
+        if not rect.width or not rect.height:
+            continue
+        index = rect.collidelist(merged)
+        while index != -1:
+            rect.union_ip(merged.pop(index))
+            index = rect.collidelist(merged)
+        merged.append(rect)
+    if len(merged) > max_rects:
+        return [merged[0].unionall(merged[1:])]
+    return merged
+
+# Times whole presents of a game sized frame in every mode, to pick the cheapest PRESENT_MODE for this machine
+# Usage: python -m scripts.presenter [--frames N]
+def main(args):
+    parser = argparse.ArgumentParser(prog='python -m scripts.presenter', description='Time every present mode.')
+    parser.add_argument('--frames', type=int, default=300, help='frames to present in each mode')
+    options = parser.parse_args(args)
+
+    pygame.init()
+    screen = pygame.display.set_mode((320 * 3, 240 * 3))
+    frame = pygame.Surface((320, 240))
+    for mode in PRESENT_MODES:
+        presenter = Presenter(screen, mode)
+        for index in range(options.frames):
+            frame.fill((index % 256, 64, 128))
+            # A new view each frame, so every present is a whole one
+            presenter.present(frame, view=index)
+        presenter.window()
+        print(presenter.report())
+    pygame.quit()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
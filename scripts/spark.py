@@ -1,5 +1,6 @@
 import math
 import pygame
+from scripts.damage import mark_drawn
 
 # Individual sparks, they run until they have no speed
 class Spark:
@@ -27,4 +28,4 @@ class Spark:
             (self.pos[0] + math.cos(self.angle + math.pi) * self.speed * 3 - offset[0], self.pos[1] + math.sin(self.angle + math.pi) * self.speed * 3 - offset[1]),
             (self.pos[0] + math.cos(self.angle - math.pi * 0.5) * self.speed * 0.5 - offset[0], self.pos[1] + math.sin(self.angle - math.pi * 0.5) * self.speed * 0.5 - offset[1]),
         ]
-        pygame.draw.polygon(surf, (255, 255, 255), render_points)
\ No newline at end of file
+        mark_drawn(surf, pygame.draw.polygon(surf, (255, 255, 255), render_points))
\ No newline at end of file
@@ -2,6 +2,8 @@ import pygame
 import random
 import math
 from scripts.animation import Animation
+from scripts.transform_cache import transforms
+from scripts.damage import mark_drawn
 
 # Defines spawn, movemement, and animation behavior for individual sparrows
 class Sparrow:
@@ -73,22 +75,23 @@ class Sparrow:
         (self.direction == -1 and parallax_x < -despawn_margin):
             self.dead = True
 
-    # Displays birds on screen with potential hitbugs, works with and without parallax (start menu)
+    # Displays birds on screen with potential hitbugs, works with and without parallax (start menu), returns the rect drawn onto
     def render(self, surface, game=None, offset=None):
         img = self.animation.img()  
         if self.flip:
-            img = pygame.transform.flip(img, True, False) 
+            img = transforms.get(img, True)
 
         x, y = self.x, self.y
         # Apply parallax effect based on depth        
         if offset:
             x -= offset[0] * self.depth
             y -= offset[1] * self.depth * .21
-        surface.blit(img, (int(x), int(y)))  
+        drawn = surface.blit(img, (int(x), int(y)))
 
         # Debug red circle for bird spawn points
         if game and getattr(game, "debug_hitboxes", False):
-            pygame.draw.circle(surface, (255, 0, 0), (int(x), int(y)), 4)
+            drawn.union_ip(mark_drawn(surface, pygame.draw.circle(surface, (255, 0, 0), (int(x), int(y)), 4)))
+        return drawn
 
 # Handles multiple bird instances
 class Sparrows:
@@ -0,0 +1,72 @@
+# Uniform grid over pixel rects, every item is filed under each cell its rect touches
+# Items come back in the order they were inserted, so draw order survives a lookup
+class GridIndex:
+    def __init__(self, cell_size):
+        self.cell_size = cell_size
+        self.cells = {}
+        self.items = {}
+        self.inserted = 0
+
+    # Number of items in the index
+    def __len__(self):
+        return len(self.items)
+
+    # Returns the keys of the cells a pixel rect touches
+    def cells_for(self, rect):
+        size = self.cell_size
+        return [
+            (cx, cy)
+            for cx in range(rect.left // size, (rect.right - 1) // size + 1)
+            for cy in range(rect.top // size, (rect.bottom - 1) // size + 1)
+        ]
+
+    # Files an item under its rect, items are told apart by identity
+    def insert(self, item, rect):
+        self.inserted += 1
+        self.items[id(item)] = (self.inserted, item, rect)
+        for key in self.cells_for(rect):
+            self.cells.setdefault(key, {})[id(item)] = item
+
+    # Takes an item out of the index, returns True if it was there
+    def remove(self, item):
+        entry = self.items.pop(id(item), None)
+        if entry is None:
+            return False
+        for key in self.cells_for(entry[2]):
+            cell = self.cells[key]
+            del cell[id(item)]
+            if not cell:
+                del self.cells[key]
+        return True
+
+    # Returns the rect an item was filed under
+    def rect_of(self, item):
+        return self.items[id(item)][2]
+
+    # Returns where an item comes in insertion order, for sorting items gathered from several lookups
+    def order_of(self, item):
+        return self.items[id(item)][0]
+
+    # Returns the items filed under one cell, in insertion order
+    def cell(self, key):
+        return list(self.cells.get(key, {}).values())
+
+    # Returns the items whose rect overlaps a pixel rect, in insertion order
+    def query_rect(self, rect):
+        found = {}
+        for key in self.cells_for(rect):
+            for item_ref, item in self.cells.get(key, {}).items():
+                if item_ref not in found and self.items[item_ref][2].colliderect(rect):
+                    found[item_ref] = item
+        return sorted(found.values(), key=lambda item: self.items[id(item)][0])
+
+    # Returns the items whose rect contains a pixel position, in insertion order
+    def query_point(self, pos):
+        size = self.cell_size
+        cell = self.cells.get((int(pos[0] // size), int(pos[1] // size)), {})
+        return [item for item_ref, item in cell.items() if self.items[item_ref][2].collidepoint(pos)]
+
+    # Empties the index
+    def clear(self):
+        self.cells.clear()
+        self.items.clear()
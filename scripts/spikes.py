@@ -3,10 +3,11 @@ import math
 import random
 from scripts.spark import Spark
 from scripts.particle import Particle
+from scripts.transform_cache import transforms
 
 # Handles spikes as harmful tiles, with trigger based damage and collision
 class Spike:
-    def __init__(self, game, tile):
+    def __init__(self, game, tile, orientation=None):
         self.game = game
         self.cooldown = 0
         self.x = tile['pos'][0]
@@ -15,14 +16,18 @@ class Spike:
         self.image = game.assets['spikes'][self.variant]
 
         # Check above and below to determine a given spike orientation, gaurds against spikes that are a full tile size
-        above = game.tilemap.solid_check((self.x + 8, self.y - 4))
-        below = game.tilemap.solid_check((self.x + 8, self.y + 18))
-        if above:
-            self.type = 'ceiling'
-        elif below:
-            self.type = 'floor'
+        # Baked levels already know it
+        if orientation:
+            self.type = orientation
         else:
-            self.type = 'floor'  # Default to floor 
+            above = game.tilemap.solid_check((self.x + 8, self.y - 4))
+            below = game.tilemap.solid_check((self.x + 8, self.y + 18))
+            if above:
+                self.type = 'ceiling'
+            elif below:
+                self.type = 'floor'
+            else:
+                self.type = 'floor'  # Default to floor 
 
         # Define hitbox depending on tile type, ceiling or floor
         if self.type == 'floor':
@@ -62,7 +67,7 @@ class Spike:
     def render(self, surf, offset=(0, 0)):
         # Flip variant 0 if ceiling spike, leave variant 1 untouched, as it is already upside down
         if self.type == 'ceiling':
-            image = self.image if self.variant == 1 else pygame.transform.flip(self.image, False, True)
+            image = self.image if self.variant == 1 else transforms.get(self.image, False, True)
         else:
             image = self.image
         surf.blit(image, (self.x - offset[0], self.y - offset[1]))
@@ -0,0 +1,61 @@
+import pygame
+
+# Scratch surfaces for drawing that only lasts a frame, kept by (size, flags, depth) and handed out again instead of made anew
+# Surfaces acquired during a frame are all given back by reset at the start of the next, or earlier with release
+class SurfacePool:
+    def __init__(self):
+        self.free = {}
+        self.used = []
+        self.allocated = 0
+        # Acquires served by a kept surface instead of a new one
+        self.avoided = 0
+
+    # Returns a surface like a freshly made one, transparent or black, with no colorkey or surface alpha
+    def acquire(self, size, flags=0, depth=0):
+        key = (tuple(size), flags & pygame.SRCALPHA, depth)
+        free = self.free.get(key)
+        if free:
+            surf = free.pop()
+            surf.fill((0, 0, 0, 0))
+            surf.set_colorkey(None)
+            surf.set_alpha(255 if key[1] else None, 0)
+            self.avoided += 1
+        else:
+            # A depth of 0 is left out, pygame only picks a depth for per pixel alpha surfaces when none is given
+            surf = pygame.Surface(key[0], key[1], key[2]) if key[2] else pygame.Surface(key[0], key[1])
+            self.allocated += 1
+        self.used.append((key, surf))
+        return surf
+
+    # Returns a scratch copy of an image that draws the same as surf.copy()
+    def copy(self, surf):
+        flags = surf.get_flags()
+        scratch = self.acquire(surf.get_size(), flags, surf.get_bitsize())
+        colorkey = surf.get_colorkey()
+        if not flags & pygame.SRCALPHA:
+            scratch.blit(surf, (0, 0))
+            scratch.set_colorkey(colorkey)
+            scratch.set_alpha(surf.get_alpha())
+            return scratch
+
+        # Max onto the cleared scratch copies the pixels as they are, alpha included, instead of blending them
+        scratch.blit(surf, (0, 0), special_flags=pygame.BLEND_RGBA_MAX)
+        # Copying turns colorkeyed pixels of per pixel alpha images transparent
+        if colorkey:
+            pygame.mask.from_threshold(surf, colorkey, (1, 1, 1, 255)).to_surface(scratch, setcolor=(0, 0, 0, 0), unsetcolor=None)
+        scratch.set_alpha(surf.get_alpha(), pygame.RLEACCEL if flags & pygame.RLEACCELOK else 0)
+        return scratch
+
+    # Gives a surface back before the frame ends, for surfaces needed only briefly
+    def release(self, surf):
+        for index, (key, used) in enumerate(self.used):
+            if used is surf:
+                del self.used[index]
+                self.free.setdefault(key, []).append(surf)
+                return
+
+    # Gives back every surface acquired since the last reset, called once at the start of each frame
+    def reset(self):
+        for key, surf in self.used:
+            self.free.setdefault(key, []).append(surf)
+        self.used.clear()
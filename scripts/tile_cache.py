@@ -0,0 +1,298 @@
+import math
+import pygame
+from collections import OrderedDict
+from scripts.config import ANIMATED_TILES
+from scripts.outline import bake_mask
+from scripts.damage import steady
+from scripts.transform_cache import transforms
+from scripts.tile_chunks import CHUNK_SIZE, CHUNK_SHIFT, CHUNK_MASK, FLIP_X, FLIP_Y
+
+# Bakes grid tiles and offgrid decor into one surface per chunk, so drawing the map is a handful of blits
+# Animated tiles are left out of the bake and drawn over it each frame, so only their own cells are ever redrawn
+class ChunkRenderCache:
+    def __init__(self, tilemap, max_surfaces=48):
+        self.tilemap = tilemap
+        self.max_surfaces = max_surfaces
+        self.surfaces = OrderedDict()
+        self.overflow = None
+        self.overflow_types = 0
+        self.animated = {}
+        self.frames = None
+        self.frame_types = 0
+        self.scaled_frames = {}
+
+    # Size of a chunk in pixels
+    def chunk_pixels(self):
+        return CHUNK_SIZE * self.tilemap.tile_size
+
+    # Drops every baked surface, used after loads and whole map edits
+    def clear(self):
+        self.surfaces.clear()
+        self.overflow = None
+        self.animated.clear()
+        self.frames = None
+        self.scaled_frames.clear()
+
+    # Drops the baked surfaces of the given chunks at every scale and target type
+    def invalidate(self, keys):
+        keys = set(keys)
+        for cached in [cached for cached in self.surfaces if cached[0] in keys]:
+            del self.surfaces[cached]
+        for key in keys:
+            self.animated.pop(key, None)
+
+    # Drops the chunks a grid tile is drawn into, including neighbors its image can spill over to
+    def invalidate_tile(self, tx, ty):
+        if not self.surfaces and not self.animated:
+            return
+        spill_x, spill_y = self.get_overflow()
+        self.invalidate(
+            (cx, cy)
+            for cx in range(tx >> CHUNK_SHIFT, ((tx + spill_x) >> CHUNK_SHIFT) + 1)
+            for cy in range(ty >> CHUNK_SHIFT, ((ty + spill_y) >> CHUNK_SHIFT) + 1)
+        )
+
+    # Drops the chunks a whole grid chunk is drawn into, used when chunks are streamed in and out
+    def invalidate_chunk(self, key):
+        if not self.surfaces and not self.animated:
+            return
+        spill_x, spill_y = self.get_overflow()
+        self.invalidate(
+            (cx, cy)
+            for cx in range(key[0], (((key[0] + 1) * CHUNK_SIZE - 1 + spill_x) >> CHUNK_SHIFT) + 1)
+            for cy in range(key[1], (((key[1] + 1) * CHUNK_SIZE - 1 + spill_y) >> CHUNK_SHIFT) + 1)
+        )
+
+    # Drops the chunks an offgrid tile covers, the offgrid grid uses chunk sized cells so its cell keys are chunk keys
+    # Grown a pixel right and down to reach chunks it is baked into while moved across the edge of the view, see edge_shifts
+    def invalidate_decor(self, tile):
+        if self.surfaces:
+            rect = self.tilemap.offgrid_rect(tile)
+            self.invalidate(self.tilemap.get_offgrid_grid().cells_for(pygame.Rect(rect.x, rect.y, rect.width + 1, rect.height + 1)))
+
+    # How many tiles right and down a grid tile's image can reach past its own cell
+    def get_overflow(self):
+        tile_types = self.tilemap.tile_types
+        if self.overflow is None or self.overflow_types != len(tile_types):
+            size = self.tilemap.tile_size
+            assets = self.tilemap.game.assets
+            width = height = size
+            for tile_type in tile_types[1:]:
+                for img in assets.get(tile_type, ()):
+                    width = max(width, img.get_width())
+                    height = max(height, img.get_height())
+            self.overflow = (math.ceil(width / size) - 1, math.ceil(height / size) - 1)
+            self.overflow_types = len(tile_types)
+        return self.overflow
+
+    # Returns the frame images of every animated tile id and variant, as {tile_id: {variant: [images]}}
+    # Variants of an animated type without a frame list of their own are baked like any other tile
+    def get_frames(self):
+        tile_types = self.tilemap.tile_types
+        if self.frames is None or self.frame_types != len(tile_types):
+            assets = self.tilemap.game.assets
+            self.frames = {}
+            for tile_id, tile_type in enumerate(tile_types):
+                if tile_type in ANIMATED_TILES:
+                    self.frames[tile_id] = {
+                        variant: [assets[tile_type][frame] for frame in frames]
+                        for variant, frames in enumerate(ANIMATED_TILES[tile_type]['frames'])
+                    }
+            self.frame_types = len(tile_types)
+        return self.frames
+
+    # Returns the chunks whose grid tiles can be drawn into a chunk, itself and the neighbors left and up that spill over into it
+    def source_chunks(self, key):
+        spill_x, spill_y = self.get_overflow()
+        return [
+            (cx, cy)
+            for cx in range((key[0] * CHUNK_SIZE - spill_x) >> CHUNK_SHIFT, key[0] + 1)
+            for cy in range((key[1] * CHUNK_SIZE - spill_y) >> CHUNK_SHIFT, key[1] + 1)
+        ]
+
+    # Yields (tile x, tile y, chunk, index) of the grid tiles drawn into a chunk, in column order
+    # Starts far enough left and up to catch images spilling into the chunk
+    def drawn_tiles(self, key):
+        spill_x, spill_y = self.get_overflow()
+        chunks = self.tilemap.chunks
+        first_x, first_y = key[0] * CHUNK_SIZE, key[1] * CHUNK_SIZE
+        for x in range(first_x - spill_x, first_x + CHUNK_SIZE):
+            for y in range(first_y - spill_y, first_y + CHUNK_SIZE):
+                chunk = chunks.get((x >> CHUNK_SHIFT, y >> CHUNK_SHIFT))
+                if chunk is None:
+                    continue
+                index = ((y & CHUNK_MASK) << CHUNK_SHIFT) | (x & CHUNK_MASK)
+                if chunk.types[index]:
+                    yield x, y, chunk, index
+
+    # Returns the cells drawn over a chunk's bake each frame as (tile x, tile y, frames, duration, flags), found on first use
+    # Those are its animated tiles, and the still tiles drawn after one of them that cover it, so the order tiles overlap in
+    # is kept, still tiles come with a single frame
+    def get_animated(self, key):
+        cells = self.animated.get(key)
+        if cells is None:
+            cells = self.animated[key] = []
+            frames = self.get_frames()
+            chunks = self.tilemap.chunks
+            if frames and any(chunk_key in chunks and not frames.keys().isdisjoint(chunks[chunk_key].types) for chunk_key in self.source_chunks(key)):
+                tilemap = self.tilemap
+                assets = tilemap.game.assets
+                tile_size = tilemap.tile_size
+                covered = []
+                for x, y, chunk, index in self.drawn_tiles(key):
+                    tile_id = chunk.types[index]
+                    variant = chunk.variants[index]
+                    variant_frames = frames.get(tile_id, {}).get(variant)
+                    if variant_frames:
+                        duration = ANIMATED_TILES[tilemap.tile_types[tile_id]]['duration']
+                        size = (max(img.get_width() for img in variant_frames), max(img.get_height() for img in variant_frames))
+                    else:
+                        variant_frames = [assets[tilemap.tile_types[tile_id]][variant]]
+                        duration = 1
+                        size = variant_frames[0].get_size()
+                        rect = pygame.Rect((x * tile_size, y * tile_size), size)
+                        if rect.collidelist(covered) == -1:
+                            continue
+                    covered.append(pygame.Rect((x * tile_size, y * tile_size), size))
+                    cells.append((x, y, variant_frames, duration, chunk.flags[index]))
+        return cells
+
+    # Returns the decor lying across the top or left edge of the view at a half pixel position, by the chunks it is baked into
+    # Blits truncate positions toward zero, so the map has always drawn such decor a pixel further right or down than its
+    # floored position while its edge is past the view's, chunks holding it are baked again with it moved for those frames
+    # Given as {chunk key: ((offgrid id, dx, dy), ...)}, the shifts are part of the key the moved bake is cached under
+    def edge_shifts(self, surf, offset):
+        tilemap = self.tilemap
+        if not tilemap.offgrid:
+            return {}
+        left, top = int(offset[0]), int(offset[1])
+        width, height = surf.get_size()
+        grid = tilemap.get_offgrid_grid()
+        # One pixel before the edge too, a tile ending right on the edge still shows its last column once moved
+        edges = tilemap.offgrid_in(pygame.Rect(left - 1, top - 1, 2, height + 1)) + tilemap.offgrid_in(pygame.Rect(left - 1, top - 1, width + 1, 2))
+        shifts = {}
+        for tile in edges:
+            x, y = tile['pos']
+            dx = int(x < left and x != math.floor(x))
+            dy = int(y < top and y != math.floor(y))
+            if not dx and not dy:
+                continue
+            rect = tilemap.offgrid_rect(tile)
+            shift = (id(tile), dx, dy)
+            for key in set(grid.cells_for(rect) + grid.cells_for(rect.move(dx, dy))):
+                if shift not in shifts.setdefault(key, []):
+                    shifts[key].append(shift)
+        return {key: tuple(sorted(key_shifts)) for key, key_shifts in shifts.items()}
+
+    # Draws one chunk onto its own surface, offgrid decor first and then grid tiles, like the map has always been drawn
+    # Alpha targets get a transparent chunk, opaque targets a colorkeyed one so edge pixels blend exactly as direct blits would
+    # shifts moves decor by a pixel as given by edge_shifts
+    def bake(self, key, alpha=True, shifts=()):
+        tilemap = self.tilemap
+        assets = tilemap.game.assets
+        tile_size = tilemap.tile_size
+        grid = tilemap.get_offgrid_grid()
+        decor = grid.cell(key)
+        moved = {tile_id: (dx, dy) for tile_id, dx, dy in shifts}
+        # Decor moved in from the chunk to the left or above, drawn in its place in the map's draw order
+        drawn = {id(tile) for tile in decor}
+        extra = [tilemap.offgrid[tile_id] for tile_id in moved if tile_id not in drawn]
+        if extra:
+            decor = sorted(decor + extra, key=grid.order_of)
+
+        # Skip chunks with nothing in them or in the neighbors that can spill over into them
+        if not decor and not any(chunk_key in tilemap.chunks for chunk_key in self.source_chunks(key)):
+            return None
+
+        size = self.chunk_pixels()
+        origin_x, origin_y = key[0] * size, key[1] * size
+        if alpha:
+            surf = pygame.Surface((size, size), pygame.SRCALPHA)
+        else:
+            surf = pygame.Surface((size, size))
+            surf.set_colorkey((0, 0, 0))
+
+        # Offgrid decor overlapping the chunk
+        for tile in decor:
+            img = assets[tile['type']][tile['variant']]
+            if tile.get('flip_x') or tile.get('flip_y'):
+                img = transforms.get(img, tile.get('flip_x', False), tile.get('flip_y', False))
+            # Floor so decor lands on the same pixel whichever chunk it is drawn into
+            dx, dy = moved.get(id(tile), (0, 0))
+            surf.blit(img, (math.floor(tile['pos'][0] - origin_x) + dx, math.floor(tile['pos'][1] - origin_y) + dy))
+
+        # Grid tiles in column order, leaving out the cells drawn over the bake each frame
+        live = {(x, y) for x, y, _, _, _ in self.get_animated(key)}
+        for x, y, chunk, index in self.drawn_tiles(key):
+            if (x, y) in live:
+                continue
+            img = assets[tilemap.tile_types[chunk.types[index]]][chunk.variants[index]]
+            flags = chunk.flags[index]
+            if flags & (FLIP_X | FLIP_Y):
+                img = transforms.get(img, flags & FLIP_X, flags & FLIP_Y)
+            surf.blit(img, (x * tile_size - origin_x, y * tile_size - origin_y))
+        return surf
+
+    # Returns the baked surface of a chunk at a scale, baking it if needed and evicting the least recently used
+    def get(self, key, scale=1.0, alpha=True, shifts=()):
+        cached = (key, scale, alpha, shifts)
+        if cached in self.surfaces:
+            self.surfaces.move_to_end(cached)
+            return self.surfaces[cached]
+        if scale == 1.0:
+            surf = self.bake(key, alpha, shifts)
+            # Alpha chunks are drawn onto the outlined layer, their mask is found once here instead of every frame
+            if surf and alpha:
+                bake_mask(surf)
+        else:
+            surf = self.get(key, alpha=alpha)
+            if surf:
+                scaled_size = math.ceil(surf.get_width() * scale)
+                surf = pygame.transform.scale(surf, (scaled_size, scaled_size))
+        # Drawn unchanged every frame, so presenting only counts it once it moves
+        if surf:
+            steady(surf)
+        self.surfaces[cached] = surf
+        while len(self.surfaces) > self.max_surfaces:
+            self.surfaces.popitem(last=False)
+        return surf
+
+    # Returns a frame image at a scale, flipped like its tile, keeping every scaled copy since there are few frames
+    def frame_image(self, img, scale, flags):
+        cached = (img, scale, flags)
+        if cached not in self.scaled_frames:
+            frame = img
+            if flags & (FLIP_X | FLIP_Y):
+                frame = pygame.transform.flip(frame, bool(flags & FLIP_X), bool(flags & FLIP_Y))
+            if scale != 1.0:
+                frame = pygame.transform.scale(frame, (math.ceil(frame.get_width() * scale), math.ceil(frame.get_height() * scale)))
+            self.scaled_frames[cached] = frame
+        return self.scaled_frames[cached]
+
+    # Blits the chunks overlapping the view, each followed by its animated tiles at the frame the clock is on
+    def render(self, surf, offset=(0, 0), scale=1.0, clock=0):
+        alpha = bool(surf.get_flags() & pygame.SRCALPHA)
+        size = self.chunk_pixels() * scale
+        first_x = int(math.floor(offset[0] / size))
+        first_y = int(math.floor(offset[1] / size))
+        last_x = int(math.floor((offset[0] + surf.get_width()) / size))
+        last_y = int(math.floor((offset[1] + surf.get_height()) / size))
+        shifts = self.edge_shifts(surf, offset) if scale == 1.0 else {}
+        frames = self.get_frames()
+        tile_size = self.tilemap.tile_size * scale
+        for cy in range(first_y, last_y + 1):
+            for cx in range(first_x, last_x + 1):
+                left, top = int(cx * size - offset[0]), int(cy * size - offset[1])
+                img = self.get((cx, cy), scale, alpha, shifts.get((cx, cy), ()))
+                if img:
+                    surf.blit(img, (left, top))
+                if not frames:
+                    continue
+                # Cells drawn each frame go on right after their chunk and only inside it, each chunk is drawn complete in turn
+                chunk_rect = pygame.Rect(left, top, math.ceil(size), math.ceil(size))
+                for tx, ty, tile_frames, duration, flags in self.get_animated((cx, cy)):
+                    img = self.frame_image(tile_frames[clock // duration % len(tile_frames)], scale, flags)
+                    pos = (int(tx * tile_size - offset[0]), int(ty * tile_size - offset[1]))
+                    clip = img.get_rect(topleft=pos).clip(chunk_rect)
+                    if clip:
+                        surf.blit(img, clip.topleft, clip.move(-pos[0], -pos[1]))
@@ -0,0 +1,68 @@
+from array import array
+
+# Chunks are 16 x 16 tiles, keyed by integer tuples instead of "x;y" strings
+CHUNK_SHIFT = 4
+CHUNK_SIZE = 1 << CHUNK_SHIFT
+CHUNK_MASK = CHUNK_SIZE - 1
+CHUNK_AREA = CHUNK_SIZE * CHUNK_SIZE
+
+# Per tile flag bits, the HAS bits remember if a flip key was saved so maps round trip exactly
+FLIP_X = 1
+FLIP_Y = 2
+HAS_FLIP_X = 4
+HAS_FLIP_Y = 8
+
+# Returns the chunk key and the index inside that chunk for a tile position
+def chunk_coords(tx, ty):
+    return (tx >> CHUNK_SHIFT, ty >> CHUNK_SHIFT), ((ty & CHUNK_MASK) << CHUNK_SHIFT) | (tx & CHUNK_MASK)
+
+# Returns the tile position of an index inside a given chunk
+def tile_coords(key, index):
+    return (key[0] << CHUNK_SHIFT) | (index & CHUNK_MASK), (key[1] << CHUNK_SHIFT) | (index >> CHUNK_SHIFT)
+
+# A block of tiles stored as compact arrays, type 0 is an empty cell and other ids index the tilemap's type table
+# Classes hold each tile's collision flags so physics queries never look at type names
+class TileChunk:
+    def __init__(self):
+        self.types = array('H', bytes(CHUNK_AREA * 2))
+        self.variants = array('H', bytes(CHUNK_AREA * 2))
+        self.flags = bytearray(CHUNK_AREA)
+        self.classes = bytearray(CHUNK_AREA)
+        self.count = 0
+
+    # Places a tile in a cell, replacing what was there
+    def set(self, index, type_id, variant, flags, tile_class):
+        if not self.types[index]:
+            self.count += 1
+        self.types[index] = type_id
+        self.variants[index] = variant
+        self.flags[index] = flags
+        self.classes[index] = tile_class
+
+    # Empties a cell, returns True if there was a tile to remove
+    def clear(self, index):
+        if not self.types[index]:
+            return False
+        self.types[index] = 0
+        self.variants[index] = 0
+        self.flags[index] = 0
+        self.classes[index] = 0
+        self.count -= 1
+        return True
+
+    # Yields the index of every filled cell
+    def filled(self):
+        types = self.types
+        for index in range(CHUNK_AREA):
+            if types[index]:
+                yield index
+
+    # Returns an independent copy of the chunk
+    def copy(self):
+        chunk = TileChunk.__new__(TileChunk)
+        chunk.types = array('H', self.types)
+        chunk.variants = array('H', self.variants)
+        chunk.flags = bytearray(self.flags)
+        chunk.classes = bytearray(self.classes)
+        chunk.count = self.count
+        return chunk
@@ -0,0 +1,97 @@
+import pygame
+from scripts.tile_chunks import CHUNK_SIZE, CHUNK_SHIFT, CHUNK_MASK
+
+# Collision layers, each a class mask and whether runs may also merge downwards
+# Platforms only merge along rows so every merged platform keeps a single top edge to land on
+SOLID_LAYER = 'solid'
+SPIKE_LAYER = 'spikes'
+PLATFORM_LAYER = 'platform'
+
+# Merges runs of adjacent collision tiles into as few rects as possible, one set per chunk per layer
+class CollisionRects:
+    def __init__(self, tilemap, layers):
+        self.tilemap = tilemap
+        self.layers = layers
+        self.rects = {}
+        # Lookup tables turning a cell's class flags into 1 if it belongs to a layer's mask and 0 if not
+        self.tables = {mask: bytes(1 if flags & mask else 0 for flags in range(256)) for mask, vertical in layers.values()}
+
+    # Drops every merged rect, used after loads and whole map edits
+    def clear(self):
+        self.rects.clear()
+
+    # Merges every chunk up front so the first frames of a level do no merging
+    def build(self):
+        self.rects.clear()
+        for key in self.tilemap.chunks:
+            self.get(key)
+
+    # Returns every chunk's merged rects as plain lists, keyed by "x;y", for storing with a baked level
+    def export(self):
+        self.build()
+        return {
+            f'{key[0]};{key[1]}': {layer: [list(rect) for rect in rects] for layer, rects in merged.items()}
+            for key, merged in self.rects.items()
+        }
+
+    # Puts back merged rects stored by export, the tilemap must hold the same tiles they were merged from
+    def restore(self, exported):
+        self.rects.clear()
+        for key, merged in exported.items():
+            cx, cy = key.split(';')
+            self.rects[(int(cx), int(cy))] = {layer: [pygame.Rect(rect) for rect in rects] for layer, rects in merged.items()}
+
+    # Drops the merged rects of the chunk holding a tile, they are merged again on the next lookup
+    def invalidate_tile(self, tx, ty):
+        self.rects.pop((tx >> CHUNK_SHIFT, ty >> CHUNK_SHIFT), None)
+
+    # Greedily merges one chunk, widest run along each row first and then as many identical rows below as possible
+    # The chunk's classes are turned into a byte per cell marking the layer's tiles, so runs are found with bytes.find
+    def merge(self, chunk, mask, vertical, origin):
+        size = self.tilemap.tile_size
+        todo = chunk.classes.translate(self.tables[mask])
+        rects = []
+        index = todo.find(1)
+        while index != -1:
+            y, x = index >> CHUNK_SHIFT, index & CHUNK_MASK
+            row_end = (y + 1) << CHUNK_SHIFT
+            end = todo.find(0, index, row_end)
+            width = (end if end != -1 else row_end) - index
+            run = bytes([1]) * width
+            height = 1
+            while vertical and y + height < CHUNK_SIZE and todo[index + (height << CHUNK_SHIFT):index + (height << CHUNK_SHIFT) + width] == run:
+                height += 1
+            for merged_row in range(height):
+                start = index + (merged_row << CHUNK_SHIFT)
+                todo[start:start + width] = bytes(width)
+            rects.append(pygame.Rect(origin[0] + x * size, origin[1] + y * size, width * size, height * size))
+            index = todo.find(1, index + width)
+        return rects
+
+    # Returns the merged rects of a chunk for every layer, merging it if needed
+    def get(self, key):
+        merged = self.rects.get(key)
+        if merged is None:
+            chunk = self.tilemap.chunks.get(key)
+            if chunk is None:
+                return None
+            origin = (key[0] * CHUNK_SIZE * self.tilemap.tile_size, key[1] * CHUNK_SIZE * self.tilemap.tile_size)
+            merged = self.rects[key] = {
+                layer: self.merge(chunk, mask, vertical, origin) for layer, (mask, vertical) in self.layers.items()
+            }
+        return merged
+
+    # Returns the merged rects of the given layers that overlap a pixel area
+    def query(self, area, layers):
+        size = CHUNK_SIZE * self.tilemap.tile_size
+        found = []
+        for cy in range(area.top // size, (area.bottom - 1) // size + 1):
+            for cx in range(area.left // size, (area.right - 1) // size + 1):
+                merged = self.get((cx, cy))
+                if not merged:
+                    continue
+                for layer in layers:
+                    for rect in merged[layer]:
+                        if rect.colliderect(area):
+                            found.append(rect)
+        return found
@@ -1,6 +1,14 @@
 import json
-import pygame
 import math
+import os
+import pygame
+from scripts.chunk_stream import ChunkStreamer
+from scripts.config import MAP_LAYERS
+from scripts.tile_cache import ChunkRenderCache
+from scripts.tile_collision import CollisionRects, SOLID_LAYER, SPIKE_LAYER, PLATFORM_LAYER
+from scripts.map_format import read_map, write_map, write_atomic, binary_path, source_key, MAP_EXTENSION
+from scripts.spatial_index import GridIndex
+from scripts.tile_chunks import TileChunk, chunk_coords, tile_coords, CHUNK_SIZE, CHUNK_SHIFT, CHUNK_MASK, CHUNK_AREA, FLIP_X, FLIP_Y, HAS_FLIP_X, HAS_FLIP_Y
 
 # Specifies how to autotile specific blocks with 9 tiles, 0 is top left and it continues in a clockwise spiral
 AUTOTILE_MAP = {
@@ -15,44 +23,435 @@ AUTOTILE_MAP = {
     tuple(sorted([(1, 0), (-1, 0), (0, 1), (0, -1)])): 8,
 }
 
+# Neighbor bits for autotiling, right, left, up and down, and AUTOTILE_MAP as a table keyed by those bits
+AUTOTILE_BITS = {(1, 0): 1, (-1, 0): 2, (0, -1): 4, (0, 1): 8}
+AUTOTILE_MASKS = {sum(AUTOTILE_BITS[shift] for shift in neighbors): variant for neighbors, variant in AUTOTILE_MAP.items()}
+
 NEIGHBOR_OFFSETS = [(-1, 0), (-1, -1), (0, -1), (1, -1), (1, 0), (0, 0), (-1, 1), (0, 1), (1, 1)]
 PHYSICS_TILES = {'grass', 'stone', 'sand', 'pagoda', 'cursed_pagoda'}
 PLATFORM_TILES = {'platform'}
 HARMFUL_TILES = {'spikes'}
 AUTOTILE_TYPES = {'grass', 'stone', 'sand', 'pagoda', 'cursed_pagoda'}
 
-# Maps of 16 x 16 blocks 
+# Where each chunk cell sits in a chunk padded with a one tile border, used by the full autotile pass
+PADDED_CELLS = [((index >> CHUNK_SHIFT) + 1) * (CHUNK_SIZE + 2) + (index & CHUNK_MASK) + 1 for index in range(CHUNK_AREA)]
+
+# Collision class flags kept per tile, a tile can have several
+TILE_SOLID = 1
+TILE_PLATFORM = 2
+TILE_HALF = 4
+TILE_HARMFUL = 8
+
+# Returns the collision class flags for a tile type
+def tile_class(tile_type):
+    flags = 0
+    if tile_type in PHYSICS_TILES:
+        flags |= TILE_SOLID
+    if tile_type in PLATFORM_TILES:
+        flags |= TILE_PLATFORM
+    if tile_type == 'half_tile':
+        flags |= TILE_HALF
+    if tile_type in HARMFUL_TILES:
+        flags |= TILE_HARMFUL
+    return flags
+
+# Layers of merged collision rects, the class mask merged into each and whether it merges downwards too
+COLLISION_LAYERS = {
+    SOLID_LAYER: (TILE_SOLID | TILE_HALF, True),
+    SPIKE_LAYER: (TILE_HARMFUL, True),
+    PLATFORM_LAYER: (TILE_PLATFORM, False),
+}
+
+# The map's own grid and offgrid tiles, the layer everything collides with and the game extracts its objects from
+TERRAIN_LAYER = 'terrain'
+
+# Keys every grid tile has, anything else is kept aside so maps round trip losslessly
+TILE_KEYS = {'type', 'variant', 'pos', 'flip_x', 'flip_y'}
+
+# Maps of 16 x 16 blocks, stored in chunks of compact arrays keyed by integer tuples
 class Tilemap:
     def __init__(self, game, tile_size=16):
         self.game = game
         self.tile_size = tile_size
-        self.tilemap = {}
-        self.offgrid_tiles = []
+        self.chunks = {}
+        self.tile_types = [None]
+        self.type_classes = [0]
+        self.type_ids = {}
+        self.tile_extras = {}
+        self.offgrid = {}
+        self.grid_index = None
+        self.offgrid_index = {}
+        self.offgrid_grid = None
+        self.placed = 0
+        self.revision = 0
+        self.clock = 0
+        self.streamer = None
+        self.layers = {}
+        self.colliding_layers = []
         self.PLATFORM_TILES = {'platform'}
+        self.render_cache = ChunkRenderCache(self)
+        self.collision_rects = CollisionRects(self, COLLISION_LAYERS)
+
+    # Offgrid tiles in the order they were added, stored by identity so removing one is O(1)
+    @property
+    def offgrid_tiles(self):
+        return list(self.offgrid.values())
+
+    # Returns the id of a tile type, adding it to the type table when first seen
+    def type_id(self, tile_type):
+        tile_id = self.type_ids.get(tile_type)
+        if tile_id is None:
+            tile_id = len(self.tile_types)
+            self.tile_types.append(tile_type)
+            self.type_classes.append(tile_class(tile_type))
+            self.type_ids[tile_type] = tile_id
+        return tile_id
+
+    # Returns the type id at a tile position, 0 when empty
+    def tile_id(self, tx, ty):
+        chunk = self.chunks.get((tx >> CHUNK_SHIFT, ty >> CHUNK_SHIFT))
+        if chunk is None:
+            return 0
+        return chunk.types[((ty & CHUNK_MASK) << CHUNK_SHIFT) | (tx & CHUNK_MASK)]
+
+    # Builds the dict form of a stored tile, the same layout used in the map files
+    def make_tile(self, chunk, index, tx, ty):
+        tile = {'type': self.tile_types[chunk.types[index]], 'variant': chunk.variants[index], 'pos': [tx, ty]}
+        flags = chunk.flags[index]
+        if flags & HAS_FLIP_X:
+            tile['flip_x'] = bool(flags & FLIP_X)
+        if flags & HAS_FLIP_Y:
+            tile['flip_y'] = bool(flags & FLIP_Y)
+        if self.tile_extras:
+            tile.update(self.tile_extras.get((tx, ty), ()))
+        return tile
+
+    # Places a grid tile given in the map file dict layout, replacing any tile already there, returns True if anything changed
+    def set_tile(self, tile):
+        tx, ty = int(tile['pos'][0]), int(tile['pos'][1])
+        flags = 0
+        if 'flip_x' in tile:
+            flags |= HAS_FLIP_X | (FLIP_X if tile['flip_x'] else 0)
+        if 'flip_y' in tile:
+            flags |= HAS_FLIP_Y | (FLIP_Y if tile['flip_y'] else 0)
+        key, index = chunk_coords(tx, ty)
+        chunk = self.chunks.get(key)
+        if chunk is None:
+            chunk = self.chunks[key] = TileChunk()
+        tile_id = self.type_id(tile['type'])
+
+        # Keep any unknown keys to write them back on save
+        extras = {k: v for k, v in tile.items() if k not in TILE_KEYS}
+        if extras:
+            self.tile_extras[(tx, ty)] = extras
+        else:
+            self.tile_extras.pop((tx, ty), None)
+
+        # Painting over an identical tile changes nothing, so the baked chunks stay valid
+        if chunk.types[index] == tile_id and chunk.variants[index] == tile['variant'] and chunk.flags[index] == flags:
+            return False
+        if chunk.types[index]:
+            self.unindex_tile(chunk.types[index], chunk.variants[index], tx, ty)
+        self.index_tile(tile_id, tile['variant'], tx, ty)
+        chunk.set(index, tile_id, tile['variant'], flags, self.type_classes[tile_id])
+        self.revision += 1
+        self.render_cache.invalidate_tile(tx, ty)
+        self.collision_rects.invalidate_tile(tx, ty)
+        return True
+
+    # Removes the grid tile at a tile position, returns True if one was removed
+    def remove_tile(self, tile_pos):
+        key, index = chunk_coords(int(tile_pos[0]), int(tile_pos[1]))
+        chunk = self.chunks.get(key)
+        if chunk is None or not chunk.types[index]:
+            return False
+        self.unindex_tile(chunk.types[index], chunk.variants[index], int(tile_pos[0]), int(tile_pos[1]))
+        chunk.clear(index)
+        self.revision += 1
+        if not chunk.count:
+            del self.chunks[key]
+        self.tile_extras.pop((int(tile_pos[0]), int(tile_pos[1])), None)
+        self.render_cache.invalidate_tile(int(tile_pos[0]), int(tile_pos[1]))
+        self.collision_rects.invalidate_tile(int(tile_pos[0]), int(tile_pos[1]))
+        return True
+
+    # Returns the grid tile index by type id and variant, built from the chunks on first use so loading a map skips it
+    def get_grid_index(self):
+        if self.grid_index is None:
+            self.grid_index = {}
+            for key, chunk in self.chunks.items():
+                for index in chunk.filled():
+                    tx, ty = tile_coords(key, index)
+                    self.index_tile(chunk.types[index], chunk.variants[index], tx, ty)
+        return self.grid_index
+
+    # Records a grid tile under its type id and variant, remembering when it was placed so extract keeps map order
+    def index_tile(self, tile_id, variant, tx, ty):
+        if self.grid_index is None:
+            return
+        self.placed += 1
+        self.grid_index.setdefault((tile_id, variant), {})[(tx, ty)] = self.placed
+
+    # Forgets a grid tile from the type and variant index
+    def unindex_tile(self, tile_id, variant, tx, ty):
+        if self.grid_index is None:
+            return
+        positions = self.grid_index[(tile_id, variant)]
+        del positions[(tx, ty)]
+        if not positions:
+            del self.grid_index[(tile_id, variant)]
+
+    # Reskins a stored grid tile, moving it in the index without losing its place in the map order
+    def set_variant(self, chunk, index, tx, ty, variant):
+        tile_id = chunk.types[index]
+        if chunk.variants[index] == variant:
+            return
+        self.revision += 1
+        if self.grid_index is None:
+            chunk.variants[index] = variant
+            return
+        positions = self.grid_index[(tile_id, chunk.variants[index])]
+        placed = positions.pop((tx, ty))
+        if not positions:
+            del self.grid_index[(tile_id, chunk.variants[index])]
+        self.grid_index.setdefault((tile_id, variant), {})[(tx, ty)] = placed
+        chunk.variants[index] = variant
+
+    # Returns the grid tile at a tile position, None when empty
+    def get_tile(self, tile_pos):
+        tx, ty = int(tile_pos[0]), int(tile_pos[1])
+        key, index = chunk_coords(tx, ty)
+        chunk = self.chunks.get(key)
+        if chunk is None or not chunk.types[index]:
+            return None
+        return self.make_tile(chunk, index, tx, ty)
+
+    # Yields every grid tile in the map file dict layout
+    def iter_tiles(self):
+        for key, chunk in self.chunks.items():
+            for index in chunk.filled():
+                tx, ty = tile_coords(key, index)
+                yield self.make_tile(chunk, index, tx, ty)
+
+    # Number of grid tiles in the map
+    def tile_count(self):
+        return sum(chunk.count for chunk in self.chunks.values())
+
+    # Lets go of the streamed map file, for a tilemap being replaced by another, chunks already loaded stay usable
+    def close(self):
+        if self.streamer is not None:
+            self.streamer.close()
+            self.streamer = None
+
+    # Removes every grid and offgrid tile
+    def clear(self):
+        self.close()
+        self.chunks = {}
+        self.tile_types = [None]
+        self.type_classes = [0]
+        self.type_ids = {}
+        self.tile_extras = {}
+        self.offgrid = {}
+        self.grid_index = None
+        self.offgrid_index = {}
+        self.offgrid_grid = None
+        self.layers = {}
+        self.colliding_layers = []
+        self.revision += 1
+        self.render_cache.clear()
+        self.collision_rects.clear()
+
+    # Takes over the tiles of another tilemap loaded from a newer version of the same map, such as after a save in the editor
+    # Baked chunk surfaces are only dropped for chunks whose tiles or decor changed, returns the keys of those chunks
+    def adopt(self, other):
+        # Type ids can differ between the two loads, so chunks are compared through the other map's ids
+        translate = [other.type_ids.get(tile_type, -1) for tile_type in self.tile_types]
+        translate[0] = 0
+        same_ids = translate == list(range(len(translate)))
+        changed = set(self.chunks) ^ set(other.chunks)
+        for key in set(self.chunks) & set(other.chunks):
+            chunk, other_chunk = self.chunks[key], other.chunks[key]
+            if chunk.variants != other_chunk.variants or chunk.flags != other_chunk.flags:
+                changed.add(key)
+            elif chunk.types != other_chunk.types if same_ids else [translate[tile_id] for tile_id in chunk.types] != list(other_chunk.types):
+                changed.add(key)
+        for key in changed:
+            self.render_cache.invalidate_chunk(key)
+
+        # Decor that moved is dropped from the chunks it covered before and the ones it covers now
+        old_decor = {json.dumps(tile, sort_keys=True): tile for tile in self.offgrid.values()}
+        new_decor = {json.dumps(tile, sort_keys=True): tile for tile in other.offgrid.values()}
+        for key in old_decor.keys() - new_decor.keys():
+            self.render_cache.invalidate_decor(old_decor[key])
+
+        self.chunks = other.chunks
+        self.tile_types = other.tile_types
+        self.type_classes = other.type_classes
+        self.type_ids = other.type_ids
+        self.tile_extras = other.tile_extras
+        self.offgrid = other.offgrid
+        self.offgrid_index = other.offgrid_index
+        self.offgrid_grid = None
+        self.grid_index = None
+        self.placed = max(self.placed, other.placed)
+        self.revision += 1
+        self.render_cache.overflow = None
+        self.render_cache.frames = None
+        for key in changed:
+            self.render_cache.invalidate_chunk(key)
+        for key in new_decor.keys() - old_decor.keys():
+            self.render_cache.invalidate_decor(new_decor[key])
+        self.collision_rects.rects = other.collision_rects.rects
+
+        # Layers in both versions are compared the same way, new ones are taken as they are
+        layers = {}
+        for name, layer in other.layers.items():
+            if name in self.layers:
+                self.layers[name].adopt(layer)
+                layers[name] = self.layers[name]
+            else:
+                layers[name] = layer
+        self.layers = layers
+        self.colliding_layers = [layer for name, layer in layers.items() if MAP_LAYERS[name]['collision']]
+        return changed
+
+    # Adds an offgrid tile, drawn under the grid at its pixel position
+    def add_offgrid(self, tile):
+        self.revision += 1
+        self.placed += 1
+        self.offgrid[id(tile)] = tile
+        self.offgrid_index.setdefault((tile['type'], tile['variant']), {})[id(tile)] = self.placed
+        if self.offgrid_grid is not None:
+            self.offgrid_grid.insert(tile, self.offgrid_rect(tile))
+        self.render_cache.invalidate_decor(tile)
+
+    # Removes an offgrid tile
+    def remove_offgrid(self, tile):
+        self.revision += 1
+        del self.offgrid[id(tile)]
+        tiles = self.offgrid_index[(tile['type'], tile['variant'])]
+        del tiles[id(tile)]
+        if not tiles:
+            del self.offgrid_index[(tile['type'], tile['variant'])]
+        self.render_cache.invalidate_decor(tile)
+        if self.offgrid_grid is not None:
+            self.offgrid_grid.remove(tile)
+
+    # Returns the pixel rect an offgrid tile's image covers
+    def offgrid_rect(self, tile):
+        img = self.game.assets[tile['type']][tile['variant']]
+        return pygame.Rect(math.floor(tile['pos'][0]), math.floor(tile['pos'][1]), img.get_width(), img.get_height())
+
+    # Returns the spatial index over the offgrid tiles, one cell per chunk, built on first use
+    # Built lazily because the game extracts spawners and pickups before their images would be needed
+    def get_offgrid_grid(self):
+        if self.offgrid_grid is None:
+            self.offgrid_grid = GridIndex(CHUNK_SIZE * self.tile_size)
+            for tile in self.offgrid.values():
+                self.offgrid_grid.insert(tile, self.offgrid_rect(tile))
+        return self.offgrid_grid
+
+    # Returns the offgrid tiles drawn over a pixel position, in draw order
+    def offgrid_at(self, pos):
+        return self.get_offgrid_grid().query_point(pos)
+
+    # Returns the offgrid tiles overlapping a pixel rect, such as the view, in draw order
+    def offgrid_in(self, rect):
+        return self.get_offgrid_grid().query_rect(rect)
+
+    # Fills the grid from the map file layout, a dict of tiles keyed by "x;y"
+    # Writes the chunk arrays directly and drops the caches once at the end instead of per tile like set_tile
+    def load_grid(self, grid):
+        chunks = self.chunks
+        type_ids = self.type_ids
+        for tile in grid.values():
+            tx, ty = int(tile['pos'][0]), int(tile['pos'][1])
+            flags = 0
+            if 'flip_x' in tile:
+                flags |= HAS_FLIP_X | (FLIP_X if tile['flip_x'] else 0)
+            if 'flip_y' in tile:
+                flags |= HAS_FLIP_Y | (FLIP_Y if tile['flip_y'] else 0)
+            key = (tx >> CHUNK_SHIFT, ty >> CHUNK_SHIFT)
+            index = ((ty & CHUNK_MASK) << CHUNK_SHIFT) | (tx & CHUNK_MASK)
+            chunk = chunks.get(key)
+            if chunk is None:
+                chunk = chunks[key] = TileChunk()
+            tile_id = type_ids.get(tile['type']) or self.type_id(tile['type'])
+            if chunk.types[index]:
+                self.unindex_tile(chunk.types[index], chunk.variants[index], tx, ty)
+            self.index_tile(tile_id, tile['variant'], tx, ty)
+            chunk.set(index, tile_id, tile['variant'], flags, self.type_classes[tile_id])
+            if not TILE_KEYS.issuperset(tile):
+                self.tile_extras[(tx, ty)] = {k: v for k, v in tile.items() if k not in TILE_KEYS}
+        self.revision += 1
+        self.render_cache.clear()
+        self.collision_rects.clear()
+
+    # Returns the grid in the map file layout, a dict of tiles keyed by "x;y"
+    def grid_dict(self):
+        return {f"{tile['pos'][0]};{tile['pos'][1]}": tile for tile in self.iter_tiles()}
+
+    # Returns a named layer, a tilemap of its own created empty when first asked for, the terrain layer is this tilemap
+    def get_layer(self, name):
+        if name == TERRAIN_LAYER:
+            return self
+        layer = self.layers.get(name)
+        if layer is None:
+            layer = self.layers[name] = Tilemap(self.game, self.tile_size)
+            # Keep the layers in their draw order, whatever order they were created in
+            self.layers = {layer_name: self.layers[layer_name] for layer_name in MAP_LAYERS if layer_name in self.layers}
+            if MAP_LAYERS[name]['collision']:
+                self.colliding_layers.append(layer)
+        return layer
+
+    # Returns the layers that have tiles in the map file layout, keyed by layer name
+    def layers_dict(self):
+        return {
+            name: {'tilemap': layer.grid_dict(), 'offgrid': layer.offgrid_tiles}
+            for name, layer in self.layers.items() if layer.chunks or layer.offgrid
+        }
+
+    # Fills the layers from the map file layout, skipping layers the game does not know about
+    def load_layers(self, layers):
+        for name, layer_data in layers.items():
+            if name not in MAP_LAYERS:
+                print(f"[Warning] Unknown map layer: {name}")
+                continue
+            layer = self.get_layer(name)
+            layer.load_grid(layer_data.get('tilemap', {}))
+            for tile in layer_data.get('offgrid', []):
+                layer.add_offgrid(tile)
+            if layer in self.colliding_layers:
+                layer.collision_rects.build()
 
     # Extracts the data from the tilemap, removing certain tiles, such as initial spawners
+    # Looks the pairs up in the type and variant index, so the cost follows the number of matches and not the map size
     def extract(self, id_pairs, keep=False):
-        matches = []
-        # Handle offgrid tiles (pixel unit position)
-        for tile in self.offgrid_tiles.copy():
-            if (tile['type'], tile['variant']) in id_pairs:
-                matches.append(tile.copy())
-                if not keep:
-                    self.offgrid_tiles.remove(tile)
-
-        # Handle tilemap tiles (tile map position)
-        for loc in list(self.tilemap):
-            tile = self.tilemap[loc]
-            if (tile['type'], tile['variant']) in id_pairs:
-                matches.append(tile.copy())
-                matches[-1]['pos'] = [
-                    matches[-1]['pos'][0] * self.tile_size,
-                    matches[-1]['pos'][1] * self.tile_size
-                ]
-                if not keep:
-                    del self.tilemap[loc]
+        id_pairs = list(dict.fromkeys(tuple(pair) for pair in id_pairs))
+
+        # Handle offgrid tiles (pixel unit position), in the order they were added
+        found = []
+        for pair in id_pairs:
+            found += [(placed, self.offgrid[tile_ref]) for tile_ref, placed in self.offgrid_index.get(pair, {}).items()]
+        found.sort(key=lambda match: match[0])
+        matches = [tile.copy() for placed, tile in found]
+        if not keep:
+            for placed, tile in found:
+                self.remove_offgrid(tile)
+
+        # Handle tilemap tiles (tile map position), comparing type ids rather than names
+        found = []
+        for tile_type, variant in id_pairs:
+            if tile_type in self.type_ids:
+                found += [(placed, tile_pos) for tile_pos, placed in self.get_grid_index().get((self.type_ids[tile_type], variant), {}).items()]
+        found.sort(key=lambda match: match[0])
+        for placed, tile_pos in found:
+            matches.append(self.get_tile(tile_pos))
+            matches[-1]['pos'] = [tile_pos[0] * self.tile_size, tile_pos[1] * self.tile_size]
+            if not keep:
+                self.remove_tile(tile_pos)
         return matches
-                    
+
     # Checks tiles for the existence of neighbors around it
     def tiles_around(self, pos):
         tiles = []
@@ -60,37 +459,40 @@ class Tilemap:
         tile_loc = (int(pos[0] // self.tile_size), int(pos[1] // self.tile_size))
         # Check each direction 
         for offset in NEIGHBOR_OFFSETS:
-            check_loc = str(tile_loc[0] + offset[0]) + ';' + str(tile_loc[1] + offset[1])
-            if check_loc in self.tilemap:
-                tiles.append(self.tilemap[check_loc])
+            tile = self.get_tile((tile_loc[0] + offset[0], tile_loc[1] + offset[1]))
+            if tile:
+                tiles.append(tile)
         return tiles
     
     # Checks for platforms around
     def platform_rects_around(self, pos):
-        rects = []
-        for tile in self.tiles_around(pos):
-            if tile['type'] == 'platform':
-                rects.append(pygame.Rect(
-                    tile['pos'][0] * self.tile_size,
-                    tile['pos'][1] * self.tile_size,
-                    self.tile_size,
-                    self.tile_size
-                ))
-        return rects
+        return self.collision_query(self.area_around(pos), (PLATFORM_LAYER,))
 
-    # Saves the tilemap and offgrid data on 'o' press
+    # Saves the tilemap and offgrid data on 'o' press, refreshing the binary copy if the map has one
+    # Layers are only written when they have tiles, so maps without any keep their old layout
     def save(self, path):
-        f = open(path, 'w')
-        json.dump({'tilemap': self.tilemap, 'tile_size': self.tile_size, 'offgrid': self.offgrid_tiles}, f)
-        f.close()
+        map_data = {'tilemap': self.grid_dict(), 'tile_size': self.tile_size, 'offgrid': self.offgrid_tiles}
+        layers = self.layers_dict()
+        if layers:
+            map_data['layers'] = layers
+        data = json.dumps(map_data).encode()
+        write_atomic(path, data)
+        if os.path.exists(binary_path(path)):
+            write_map(binary_path(path), self, source_key(path))
         
-    # Loads a map
+    # Loads a map, from its binary copy when there is one converted from the current JSON
+    # Checking the copy is current only takes a stat of the JSON, which is read only when there is no such copy
     def load(self, path):
-        self.tilemap = {}
-        self.offgrid_tiles = []
+        self.clear()
         try:
-            with open(path, 'r') as f:
-                map = f.read().strip()
+            if path.endswith(MAP_EXTENSION):
+                if not read_map(path, self):
+                    print(f"[Warning] Not a binary map: {path}")
+                self.collision_rects.build()
+                return
+            if not read_map(binary_path(path), self, source_key(path)):
+                with open(path, 'r') as f:
+                    map = f.read().strip()
                 # Do not read from an empty file, mainly for new map creation
                 if not map:
                     return
@@ -98,97 +500,214 @@ class Tilemap:
                 else:
                     map_data = json.loads(map)
                 # Set the tilemap, offgrid tiles and tile size from the map data
-                self.tilemap = map_data.get('tilemap', {})
+                self.load_grid(map_data.get('tilemap', {}))
                 self.tile_size = map_data.get('tile_size', self.tile_size)
-                self.offgrid_tiles = map_data.get('offgrid', [])
+                for tile in map_data.get('offgrid', []):
+                    self.add_offgrid(tile)
+                self.load_layers(map_data.get('layers', {}))
+            self.collision_rects.build()
         except FileNotFoundError:
             print(f"[Warning] Map file not found: {path}")
         except Exception as e:
             print(f"[Error] Unexpected error loading map '{path}': {e}")
 
+    # Streams the grid chunks of a binary map around the camera instead of loading them all, see ChunkStreamer
+    # Returns False, leaving the tilemap empty, if the file is missing or not converted from source_hash
+    def stream(self, path, source_hash=None):
+        self.clear()
+        streamer = ChunkStreamer(self, path)
+        if not streamer.open(source_hash):
+            self.clear()
+            return False
+        self.streamer = streamer
+        return True
+
+    # Moves the streamed chunks along with the view, does nothing for a fully loaded map
+    def stream_view(self, scroll, view_size, focus=None):
+        if self.streamer is not None:
+            self.streamer.update(scroll, view_size, focus)
+
+    # Returns True if a pixel position is in the streamed part of the map, always for a fully loaded map
+    def is_resident(self, pos):
+        if self.streamer is None:
+            return True
+        size = CHUNK_SIZE * self.tile_size
+        return self.streamer.is_resident((int(pos[0] // size), int(pos[1] // size)))
+
     # Return a tiles map coordinates from their pixel coordinates
     def get_tile_at(self, pos):
-        tile_loc = str(int(pos[0] // self.tile_size)) + ';' + str(int(pos[1] // self.tile_size))
-        return self.tilemap.get(tile_loc)
+        return self.get_tile((pos[0] // self.tile_size, pos[1] // self.tile_size))
+
+    # Returns the collision class flags at a tile position, 0 when empty
+    def class_at(self, tx, ty):
+        chunk = self.chunks.get((tx >> CHUNK_SHIFT, ty >> CHUNK_SHIFT))
+        if chunk is None:
+            return 0
+        return chunk.classes[((ty & CHUNK_MASK) << CHUNK_SHIFT) | (tx & CHUNK_MASK)]
 
     # Checks if a tile is listed as a phsyics tile
     def solid_check(self, pos):
-        tile = self.get_tile_at(pos)
-        return tile if tile and tile['type'] in PHYSICS_TILES else None
+        tx, ty = int(pos[0] // self.tile_size), int(pos[1] // self.tile_size)
+        chunk = self.chunks.get((tx >> CHUNK_SHIFT, ty >> CHUNK_SHIFT))
+        if chunk is None:
+            return None
+        index = ((ty & CHUNK_MASK) << CHUNK_SHIFT) | (tx & CHUNK_MASK)
+        if chunk.classes[index] & TILE_SOLID:
+            return self.make_tile(chunk, index, tx, ty)
+        return None
+
+    # Returns the collision class flags under each of many pixel positions in one pass, reusing the chunk between nearby points
+    def classes_at(self, points):
+        size = self.tile_size
+        chunks = self.chunks
+        classes = []
+        last_key = chunk = None
+        for x, y in points:
+            tx, ty = int(x // size), int(y // size)
+            key = (tx >> CHUNK_SHIFT, ty >> CHUNK_SHIFT)
+            if key != last_key:
+                chunk = chunks.get(key)
+                last_key = key
+            classes.append(chunk.classes[((ty & CHUNK_MASK) << CHUNK_SHIFT) | (tx & CHUNK_MASK)] if chunk else 0)
+        return classes
+
+    # Batched solid_check, returns True for each pixel position inside a physics tile
+    def solid_points(self, points):
+        return [bool(tile_class & TILE_SOLID) for tile_class in self.classes_at(points)]
 
-    # Checks for tiles which interact with entities at all times, or have no specific movement characteristics 
+    # Returns True as soon as any of the pixel positions is inside a physics tile, for line of sight sampling
+    def any_solid(self, points):
+        size = self.tile_size
+        chunks = self.chunks
+        last_key = chunk = None
+        for x, y in points:
+            tx, ty = int(x // size), int(y // size)
+            key = (tx >> CHUNK_SHIFT, ty >> CHUNK_SHIFT)
+            if key != last_key:
+                chunk = chunks.get(key)
+                last_key = key
+            if chunk and chunk.classes[((ty & CHUNK_MASK) << CHUNK_SHIFT) | (tx & CHUNK_MASK)] & TILE_SOLID:
+                return True
+        return False
+
+    # Returns the combined collision class flags of the tiles each pixel rect overlaps
+    def classes_in_rects(self, rects):
+        size = self.tile_size
+        classes = []
+        for rect in rects:
+            flags = 0
+            for tx in range(rect.left // size, (rect.right - 1) // size + 1):
+                for ty in range(rect.top // size, (rect.bottom - 1) // size + 1):
+                    flags |= self.class_at(tx, ty)
+            classes.append(flags)
+        return classes
+
+    # Returns the pixel area covered by the 3 x 3 tiles around a pixel position
+    def area_around(self, pos):
+        size = self.tile_size
+        return pygame.Rect((int(pos[0] // size) - 1) * size, (int(pos[1] // size) - 1) * size, size * 3, size * 3)
+
+    # Checks for tiles which interact with entities at all times, or have no specific movement characteristics
+    # Returns merged rects, so a wall or floor is one rect instead of one per tile
     def physics_rects_around(self, pos, include_spikes=False):
-        rects = []
-        for tile in self.tiles_around(pos):
-            if tile['type'] in PHYSICS_TILES or tile['type'] == 'half_tile' or (include_spikes and tile['type'] in HARMFUL_TILES):
-                x = tile['pos'][0] * self.tile_size
-                y = tile['pos'][1] * self.tile_size
-                rects.append(pygame.Rect(x, y, self.tile_size, self.tile_size))
+        layers = (SOLID_LAYER, SPIKE_LAYER) if include_spikes else (SOLID_LAYER,)
+        return self.collision_query(self.area_around(pos), layers)
+
+    # Returns the merged rects of the given collision layers overlapping a pixel area, from the terrain and colliding map layers
+    def collision_query(self, area, layers):
+        rects = self.collision_rects.query(area, layers)
+        for layer in self.colliding_layers:
+            rects += layer.collision_rects.query(area, layers)
         return rects
 
     # Automatically reshuffles certain tile types to form a more cohesive design
+    # Works a chunk at a time on a copy of its types padded with the neighboring chunks' edges, so no cell needs a lookup
     def autotile(self):
-        # Check every location in the map
-        for loc in self.tilemap:
-            tile = self.tilemap[loc]
-            neighbors = set()
-            # Check each side for a neighbor
-            for shift in [(1,0), (-1,0), (0, -1), (0, 1)]:
-                check_loc = str(tile['pos'][0] + shift[0]) + ';' + str(tile['pos'][1] + shift[1])
-                # If a neighbor exists
-                if check_loc in self.tilemap:
-                    # If it is of the same tile type as the neighbor add that direction
-                    if self.tilemap[check_loc]['type'] == tile['type']:
-                        neighbors.add(shift)
-            neighbors = tuple(sorted(neighbors))
-            # If its an autotile type, reskin the tiles according to their relative positions
-            if (tile['type'] in AUTOTILE_TYPES) and (neighbors in AUTOTILE_MAP):
-                tile['variant'] = AUTOTILE_MAP[neighbors]
+        autotile_ids = {self.type_ids[tile_type] for tile_type in AUTOTILE_TYPES if tile_type in self.type_ids}
+        if not autotile_ids:
+            return
+        padded_size = CHUNK_SIZE + 2
+        for (cx, cy), chunk in self.chunks.items():
+            if not autotile_ids.intersection(chunk.types):
+                continue
+            padded = self.padded_types(cx, cy)
+            for index, tile_id in enumerate(chunk.types):
+                if tile_id not in autotile_ids:
+                    continue
+                cell = PADDED_CELLS[index]
+                mask = (
+                    (padded[cell + 1] == tile_id)
+                    | (padded[cell - 1] == tile_id) << 1
+                    | (padded[cell - padded_size] == tile_id) << 2
+                    | (padded[cell + padded_size] == tile_id) << 3
+                )
+                # If the neighbors match a rule, reskin the tile according to its relative position
+                if mask in AUTOTILE_MASKS:
+                    tx, ty = tile_coords((cx, cy), index)
+                    self.set_variant(chunk, index, tx, ty, AUTOTILE_MASKS[mask])
+        self.render_cache.clear()
+
+    # Returns the types of a chunk with a one tile border taken from the neighboring chunks' edges, row by row
+    def padded_types(self, cx, cy):
+        padded_size = CHUNK_SIZE + 2
+        last_row = (CHUNK_SIZE + 1) * padded_size
+        padded = [0] * (padded_size * padded_size)
+        types = self.chunks[(cx, cy)].types
+        for y in range(CHUNK_SIZE):
+            row = (y + 1) * padded_size + 1
+            padded[row:row + CHUNK_SIZE] = types[y << CHUNK_SHIFT:(y + 1) << CHUNK_SHIFT]
+        left, right = self.chunks.get((cx - 1, cy)), self.chunks.get((cx + 1, cy))
+        up, down = self.chunks.get((cx, cy - 1)), self.chunks.get((cx, cy + 1))
+        if left is not None:
+            padded[padded_size:last_row:padded_size] = left.types[CHUNK_MASK::CHUNK_SIZE]
+        if right is not None:
+            padded[padded_size * 2 - 1:last_row + padded_size - 1:padded_size] = right.types[::CHUNK_SIZE]
+        if up is not None:
+            padded[1:1 + CHUNK_SIZE] = up.types[CHUNK_AREA - CHUNK_SIZE:]
+        if down is not None:
+            padded[last_row + 1:last_row + 1 + CHUNK_SIZE] = down.types[:CHUNK_SIZE]
+        return padded
+
+    # Reskins only the autotile tiles at the given tile positions and their four neighbors, for retiling after an edit
+    def autotile_cells(self, tile_positions):
+        cells = set()
+        for tx, ty in tile_positions:
+            cells.add((tx, ty))
+            cells.update((tx + dx, ty + dy) for dx, dy in AUTOTILE_BITS)
+        for tx, ty in cells:
+            key, index = chunk_coords(tx, ty)
+            chunk = self.chunks.get(key)
+            if chunk is None or self.tile_types[chunk.types[index]] not in AUTOTILE_TYPES:
+                continue
+            tile_id = chunk.types[index]
+            mask = 0
+            for (dx, dy), bit in AUTOTILE_BITS.items():
+                if self.tile_id(tx + dx, ty + dy) == tile_id:
+                    mask |= bit
+            if mask in AUTOTILE_MASKS and chunk.variants[index] != AUTOTILE_MASKS[mask]:
+                self.set_variant(chunk, index, tx, ty, AUTOTILE_MASKS[mask])
+                self.render_cache.invalidate_tile(tx, ty)
 
     # Returns dangerous tiles, currently just spikes
     def is_dangerous_tile(self, pos):
-        tile = self.get_tile_at(pos)
-        return tile and tile.get('type') == 'spikes'
-
-    # Render the tilemap and offgrid tiles
-    def render(self, surf, offset=(0, 0), scale=1.0):
-        # Offgrid tiles (pixel-based)
-        for tile in self.offgrid_tiles:
-            img = self.game.assets[tile['type']][tile['variant']]
-            # Vertical and horizontal flips
-            if tile.get('flip_x') or tile.get('flip_y'):
-                img = pygame.transform.flip(img, tile.get('flip_x', False), tile.get('flip_y', False))
-            # Optional scaling
-            if scale != 1.0:
-                img = pygame.transform.scale(
-                    img,
-                    (int(img.get_width() * scale), int(img.get_height() * scale))
-                )
-            surf.blit(img, (tile['pos'][0] * scale - offset[0], tile['pos'][1] * scale - offset[1]))
-
-        # Get number of tiles needed to fill screen and offset coords
-        tile_span_x = surf.get_width() / (self.tile_size * scale)
-        tile_span_y = surf.get_height() / (self.tile_size * scale)
-        start_x = int(math.floor(offset[0] / (self.tile_size * scale)))
-        start_y = int(math.floor(offset[1] / (self.tile_size * scale))) 
-
-        # Grid-aligned tiles, renders them as they are needed when moving across the screen        
-        for x in range(start_x - 1, int(start_x + tile_span_x) + 2):
-            for y in range(start_y - 1, int(start_y + tile_span_y) + 2):
-                
-                # Checks tiles in range for their images, flipping or scaling as needed
-                loc = f"{x};{y}"
-                if loc in self.tilemap:
-                    tile = self.tilemap[loc]
-                    img = self.game.assets[tile['type']][tile['variant']]
-                    if tile.get('flip_x') or tile.get('flip_y'):
-                        img = pygame.transform.flip(img, tile.get('flip_x', False), tile.get('flip_y', False))
-                    if scale != 1.0:
-                        img = pygame.transform.scale(
-                            img,
-                            (int(img.get_width() * scale), int(img.get_height() * scale))
-                        )
-                    # Use pixel coords for the actual display image
-                    px = tile['pos'][0] * self.tile_size * scale - offset[0]
-                    py = tile['pos'][1] * self.tile_size * scale - offset[1]
-                    surf.blit(img, (px, py))
+        return bool(self.class_at(int(pos[0] // self.tile_size), int(pos[1] // self.tile_size)) & TILE_HARMFUL)
+
+    # Render the tilemap and offgrid tiles from the baked chunk surfaces
+    def render(self, surf, offset=(0, 0), scale=1.0, parallax=True):
+        self.render_layers(surf, offset, scale, False, parallax)
+        self.render_cache.render(surf, offset=offset, scale=scale, clock=self.clock)
+
+    # Render the layers drawn over the player and entities
+    def render_front(self, surf, offset=(0, 0), scale=1.0, parallax=True):
+        self.render_layers(surf, offset, scale, True, parallax)
+
+    # Render the layers in front of or behind the terrain, each scrolled by its parallax factor unless parallax is off
+    def render_layers(self, surf, offset, scale, front, parallax=True):
+        for name, layer in self.layers.items():
+            if MAP_LAYERS[name]['front'] == front:
+                factor = MAP_LAYERS[name]['parallax'] if parallax else 1.0
+                layer.render_cache.render(surf, offset=(int(offset[0] * factor), int(offset[1] * factor)), scale=scale, clock=self.clock)
+
+    # Advances the clock every animated tile shares, once per frame
+    def tick(self):
+        self.clock += 1
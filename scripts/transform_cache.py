@@ -0,0 +1,51 @@
+import threading
+import pygame
+from collections import OrderedDict
+from scripts.config import TRANSFORM_CACHE_BYTES
+
+# Flipped and scaled copies of images, so a transform drawn every frame is only done the first time
+# Keyed by (image, flip_x, flip_y, scale), evicting the least recently used copies once they take more than max_bytes
+# Copies are shared, anything changing one draws it from a scratch copy instead
+# Thumbnails are baked on a worker thread through the same cache, so the cache is only touched holding the lock
+class TransformCache:
+    def __init__(self, max_bytes=TRANSFORM_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.surfaces = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    # Returns the image flipped and then scaled, scaled sizes are rounded down like int(width * scale)
+    # Unflipped unscaled requests still get a transformed copy, it blits slightly differently from the source image
+    def get(self, img, flip_x=False, flip_y=False, scale=1.0):
+        key = (img, bool(flip_x), bool(flip_y), scale)
+        with self.lock:
+            surf = self.surfaces.get(key)
+            if surf is not None:
+                self.surfaces.move_to_end(key)
+                self.hits += 1
+                return surf
+            self.misses += 1
+            surf = pygame.transform.flip(img, key[1], key[2])
+            if scale != 1.0:
+                surf = pygame.transform.scale(surf, (int(img.get_width() * scale), int(img.get_height() * scale)))
+            self.surfaces[key] = surf
+            self.bytes += surf.get_width() * surf.get_height() * surf.get_bytesize()
+            while self.bytes > self.max_bytes and len(self.surfaces) > 1:
+                _, evicted = self.surfaces.popitem(last=False)
+                self.bytes -= evicted.get_width() * evicted.get_height() * evicted.get_bytesize()
+            return surf
+
+    # Drops every copy, keeping the stats
+    def clear(self):
+        with self.lock:
+            self.surfaces.clear()
+            self.bytes = 0
+
+    # Share of requests served from the cache
+    def hit_rate(self):
+        return self.hits / max(1, self.hits + self.misses)
+
+# The one cache every renderer draws its flipped and scaled images from
+transforms = TransformCache()
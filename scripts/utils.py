@@ -72,7 +72,7 @@ def render_text(surf, text, font_type, font_size, color, x, y, outline=False):
 
     surf.blit(text_surface, (x, y))
 
-# Render centered text
+# Render centered text, returns the rect drawn onto
 def render_centered_text(screen, text, font_type, font_size, color, y, bold, bold_size=1):
     # Allow both string font names and preloaded pygame Font objects
     if isinstance(font_type, pygame.font.Font):
@@ -87,14 +87,16 @@ def render_centered_text(screen, text, font_type, font_size, color, y, bold, bol
 
     # Optional black outline
     outline_color = (0, 0, 0)
+    drawn = text_rect.copy()
     for dx in [-1, 0, 1]:
         for dy in [-1, 0, 1]:
             if dx != 0 or dy != 0:
                 outline_surf = font.render(text, True, outline_color)
                 outline_rect = outline_surf.get_rect(center=(screen.get_width() // 2 + dx, y + dy))
-                screen.blit(outline_surf, outline_rect)
+                drawn.union_ip(screen.blit(outline_surf, outline_rect))
 
     screen.blit(text_surface, text_rect)
+    return drawn
 
 # Pause menu
 def pause_menu(self, offset):
@@ -105,13 +107,19 @@ def pause_menu(self, offset):
     for channel in self.dedicated_channels.values():
         channel.pause()
 
+    # The pause text goes over the last frame, at the window's full size
+    self.presenter.window()
     while paused:
-        render_centered_text(self.screen, "Paused", self.font_path, 46, COLOR_CODES["Kohaku"], self.screen.get_height() // 3 - 120, True, 2)
-        render_centered_text(self.screen, "Esc to Resume", self.font_path, 16, COLOR_CODES["Shironeri"], self.screen.get_height() // 3 - 60, True, 2)
-        render_centered_text(self.screen, "Q to Quit to Menu", self.font_path, 16, COLOR_CODES["Shironeri"], self.screen.get_height() // 3 - 30, True, 2)
-        render_centered_text(self.screen, "R to Restart Level", self.font_path, 16, COLOR_CODES["Shironeri"], self.screen.get_height() // 3 , True, 2)
-
-        pygame.display.update()
+        drawn = [
+            render_centered_text(self.screen, "Paused", self.font_path, 46, COLOR_CODES["Kohaku"], self.screen.get_height() // 3 - 120, True, 2),
+            render_centered_text(self.screen, "Esc to Resume", self.font_path, 16, COLOR_CODES["Shironeri"], self.screen.get_height() // 3 - 60, True, 2),
+            render_centered_text(self.screen, "Q to Quit to Menu", self.font_path, 16, COLOR_CODES["Shironeri"], self.screen.get_height() // 3 - 30, True, 2),
+            render_centered_text(self.screen, "R to Restart Level", self.font_path, 16, COLOR_CODES["Shironeri"], self.screen.get_height() // 3 , True, 2),
+        ]
+
+        # Only the text is drawn over the last frame, so pausing presents just the text
+        self.presenter.present(damage=drawn)
+        self.clock.tick(60)
         # Full game close loop
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
@@ -141,8 +149,15 @@ def pause_menu(self, offset):
 
     return True
 
-# Start menu
+# Start menu, the level thumbnail worker it starts is stopped however the menu is left
 def start_menu(self, resume_data=None):
+    try:
+        return start_menu_loop(self, resume_data)
+    finally:
+        self.thumbnails.stop()
+
+# Runs the start menu until a level is chosen or the game is closed
+def start_menu_loop(self, resume_data):
     WIDTH, HEIGHT = 320, 240
     menu_sparrows = []
     sparrow_timer = 0
@@ -160,6 +175,11 @@ def start_menu(self, resume_data=None):
     )
     level_names = [f.replace(".json", "") for f in level_files]
 
+    # Level thumbnails, any missing or out of date are drawn in the background while the menu runs
+    level_thumbnails = {}
+    for level_file in level_files:
+        self.thumbnails.get(os.path.join("data/maps", level_file))
+
     # Base start state unless overwritten with save data for initial game boot
     selected_slot = 1
     menu_state = "slot"
@@ -189,7 +209,9 @@ def start_menu(self, resume_data=None):
     run = True
     clock=pygame.time.Clock()
     while run:
+        # The background is the same every frame, only what is drawn over it is presented
         self.screen.blit(background, (0, 0))
+        drawn = []
 
         # Update menu sparrows
         sparrow_timer += 1
@@ -206,18 +228,18 @@ def start_menu(self, resume_data=None):
         # Render menu sparrows
         for sparrow in menu_sparrows[:]:
             sparrow.update()
-            sparrow.render(game = None, surface = self.screen)
+            drawn.append(sparrow.render(game = None, surface = self.screen))
             # Remove them when killed by sparrow logic when off screen
             if sparrow.dead:
                 menu_sparrows.remove(sparrow)
 
         # Render main title
-        render_centered_text(self.screen, "Ninja Hiro", self.font_path, 48, COLOR_CODES["Kohaku"], 100, True, 2)
+        drawn.append(render_centered_text(self.screen, "Ninja Hiro", self.font_path, 48, COLOR_CODES["Kohaku"], 100, True, 2))
 
         # Render text for save slot selection
         if menu_state == "slot":
-            render_centered_text(self.screen, f"Save Slot: {selected_slot}", self.font_path, 28, COLOR_CODES["Ai"], self.screen.get_height() - 120, True, 2)
-            render_centered_text(self.screen, "A / D to choose save | SPACE to continue", self.font_path, 16, COLOR_CODES["Shironeri"], self.screen.get_height() - 40, False, 2)
+            drawn.append(render_centered_text(self.screen, f"Save Slot: {selected_slot}", self.font_path, 28, COLOR_CODES["Ai"], self.screen.get_height() - 120, True, 2))
+            drawn.append(render_centered_text(self.screen, "A / D to choose save | SPACE to continue", self.font_path, 16, COLOR_CODES["Shironeri"], self.screen.get_height() - 40, False, 2))
 
         # Else render text for character and level selection
         elif menu_state == "select":
@@ -244,12 +266,21 @@ def start_menu(self, resume_data=None):
                 preview_rect = preview_img.get_rect(center=(self.screen.get_width() // 2, self.screen.get_height() - 260))
                 offset = math.sin(pygame.time.get_ticks() / 300) * 3
                 preview_rect.centery += int(offset)
-                self.screen.blit(preview_img, preview_rect)
+                drawn.append(self.screen.blit(preview_img, preview_rect))
+
+            # Level thumbnail, shown once the background worker has it ready
+            thumbnail = self.thumbnails.get(os.path.join("data/maps", level_files[selected_level_index]))
+            if thumbnail:
+                if level_name not in level_thumbnails:
+                    level_thumbnails[level_name] = pygame.transform.scale(thumbnail, (thumbnail.get_width() * 3 // 2, thumbnail.get_height() * 3 // 2))
+                thumbnail_rect = level_thumbnails[level_name].get_rect(center=(self.screen.get_width() // 2, 250))
+                self.screen.blit(level_thumbnails[level_name], thumbnail_rect)
+                drawn.append(pygame.draw.rect(self.screen, COLOR_CODES["Shironeri"], thumbnail_rect.inflate(4, 4), 2))
 
             # Shows options for characetr and level select at the bottom
-            render_centered_text(self.screen, f"Character: {self.character_data[selected_character]['name']}", self.font_path, 24, COLOR_CODES["Matcha"], self.screen.get_height() - 140, True, 2)             
-            render_centered_text(self.screen, f"Level: {level_name}", self.font_path, 24, COLOR_CODES["Ai"], self.screen.get_height() - 90, True, 2)
-            render_centered_text(self.screen, "A / D Level | W / S Character | SPACE to start", self.font_path, 16, COLOR_CODES["Shironeri"], self.screen.get_height() - 40, False)
+            drawn.append(render_centered_text(self.screen, f"Character: {self.character_data[selected_character]['name']}", self.font_path, 24, COLOR_CODES["Matcha"], self.screen.get_height() - 140, True, 2))
+            drawn.append(render_centered_text(self.screen, f"Level: {level_name}", self.font_path, 24, COLOR_CODES["Ai"], self.screen.get_height() - 90, True, 2))
+            drawn.append(render_centered_text(self.screen, "A / D Level | W / S Character | SPACE to start", self.font_path, 16, COLOR_CODES["Shironeri"], self.screen.get_height() - 40, False))
 
         keys = pygame.key.get_pressed()
         current_time = pygame.time.get_ticks()
@@ -269,12 +300,14 @@ def start_menu(self, resume_data=None):
                 selected_character_index = (selected_character_index - 1) % len(unlocked)
                 last_key_action_time = current_time
 
-        pygame.display.update()
+        self.presenter.present(damage=drawn)
 
         # Handle all other events in main menu
         for event in pygame.event.get():
             # Exit game
             if event.type == pygame.QUIT:
+                # The worker draws with pygame, so it has to be done before pygame shuts down
+                self.thumbnails.stop()
                 pygame.quit()
                 return "quit"
             # All other keys with no hold key functionality
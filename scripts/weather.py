@@ -2,6 +2,7 @@ import pygame
 import random
 import math
 from scripts.config import COLOR_CODES
+from scripts.damage import mark_drawn
 
 RAIN_COLORS = [
     COLOR_CODES["Ai"],
@@ -84,4 +85,4 @@ class RainSystem:
             end_y = start_y + drop.length
 
             # Draw the raindrop as a short slanted line
-            pygame.draw.line(surface, drop.color, (start_x, start_y), (end_x, end_y), 1)
+            mark_drawn(surface, pygame.draw.line(surface, drop.color, (start_x, start_y), (end_x, end_y), 1))
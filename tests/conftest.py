@@ -0,0 +1,17 @@
+import os
+import sys
+import pytest
+
+# Tests draw offscreen and read assets by their paths relative to the repository, like the game does
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+from scripts.map_render import render_game
+
+# A stand in for the game holding the tile images, with a display open so images convert like in the game
+@pytest.fixture(scope='session')
+def game():
+    return render_game()
@@ -0,0 +1,64 @@
+import random
+import pygame
+from scripts.damage import DamageSurface, steady
+from scripts.outline import OutlineSurface
+from scripts.presenter import Presenter, merge_rects
+
+# Returns a surface of one color
+def solid(color, size):
+    surf = pygame.Surface(size, pygame.SRCALPHA)
+    surf.fill(color)
+    return surf
+
+def test_steady_images_only_count_once_moved():
+    frame = DamageSurface((64, 64))
+    background = steady(solid((30, 60, 90, 255), (64, 64)))
+    frame.blit(background, (0, 0))
+    assert frame.take_damage() == [pygame.Rect(0, 0, 64, 64)]
+
+    # Blitted where it was, nothing under it changed
+    frame.blit(background, (0, 0))
+    assert frame.take_damage() == []
+
+    # Moved, both where it was and where it went count
+    frame.blit(background, (2, 0))
+    assert sorted(frame.take_damage()) == [pygame.Rect(0, 0, 64, 64), pygame.Rect(2, 0, 64, 64)]
+
+def test_damage_lasts_a_frame_after_drawing():
+    frame = DamageSurface((64, 64))
+    frame.blit(solid((255, 0, 0, 255), (8, 8)), (10, 10))
+    assert frame.take_damage() == [pygame.Rect(10, 10, 8, 8)]
+    # Whatever was drawn there last frame has to be drawn over
+    assert frame.take_damage() == [pygame.Rect(10, 10, 8, 8)]
+    assert frame.take_damage() == []
+
+def test_merge_rects_joins_overlaps_and_caps_count():
+    bounds = pygame.Rect(0, 0, 100, 100)
+    assert merge_rects([(0, 0, 10, 10), (5, 5, 10, 10), (50, 50, 200, 5)], bounds, 8) == [pygame.Rect(0, 0, 15, 15), pygame.Rect(50, 50, 50, 5)]
+    assert merge_rects([(0, 0, 5, 5), (20, 20, 5, 5), (40, 40, 5, 5)], bounds, 2) == [pygame.Rect(0, 0, 45, 45)]
+
+def test_partial_presents_match_whole_ones(game):
+    # Presented onto a stand in for the window, the open display is too small to hold a frame
+    screen = pygame.Surface((960, 720))
+    presenter = Presenter(screen, 'scale')
+    frame = DamageSurface((320, 240))
+    layer = OutlineSurface(frame.get_size())
+    background = steady(solid((30, 60, 90, 255), frame.get_size()))
+    chunk = steady(solid((90, 200, 40, 255), (64, 24)))
+    sprite = solid((255, 255, 0, 255), (12, 12))
+    rng = random.Random(3)
+    for index in range(60):
+        # Drawn like a game frame, a still background and tiles with sprites moving around over them
+        layer.fill((0, 0, 0, 0))
+        frame.blit(background, (0, 0))
+        for x in range(0, frame.get_width(), 64):
+            if rng.random() < 0.9:
+                layer.blit(chunk, (x + index // 20, 100))
+        for _ in range(rng.randrange(4)):
+            layer.blit(sprite, (rng.randrange(frame.get_width()), rng.randrange(frame.get_height())))
+        layer.draw_outline(frame)
+        frame.blit(layer, (0, 0))
+        presenter.present(frame, view=(0, 0))
+        expected = pygame.transform.scale(frame, screen.get_size())
+        assert pygame.image.tobytes(screen, 'RGB') == pygame.image.tobytes(expected, 'RGB')
+    assert presenter.partial_presents > presenter.full_presents
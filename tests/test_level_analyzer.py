@@ -0,0 +1,133 @@
+import json
+import types
+from scripts.config import COYOTE_FRAMES, SLIDE_SPEED
+from scripts.entities import BasePlayer
+from scripts.level_analyzer import MoveGraph, PLAYER_SIZE, STANDING_PLANS, CLIMBS, MAX_MOVE_FRAMES, find_problems
+from scripts.tilemap import Tilemap
+
+# A level to move around in, '#' is stone, '=' a platform, letters are spawners (P player, G gunner, Y yurei)
+# A shaft to climb, a ledge over a drop and platforms to jump up through
+LEVEL = [
+    '##########################',
+    '#........................#',
+    '#........................#',
+    '#..##....===.............#',
+    '#..#..............####...#',
+    '#..#....###..............#',
+    '#..#.........==..........#',
+    '#..#..#######............#',
+    '#..#..#..................#',
+    '#.....#......===.....#...#',
+    '#.....#..............#...#',
+    '##########################',
+]
+
+# Stands in for animations and sounds, doing nothing whatever is asked of it
+class Stub:
+    def copy(self):
+        return self
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+# Hands out a stub for any asset or sound the player asks for
+class StubAssets(dict):
+    def __missing__(self, key):
+        return Stub()
+
+# A stand in for the game with just what BasePlayer reads, and the level as its tilemap
+def level_game(rows=LEVEL):
+    game = types.SimpleNamespace(assets=StubAssets(), sfx=StubAssets(), particles=[], sparks=[], dead=0, screenshake=0, debug_hitboxes=False)
+    game.tilemap = Tilemap(game)
+    for ty, row in enumerate(rows):
+        for tx, char in enumerate(row):
+            if char in '#=':
+                game.tilemap.set_tile({'type': 'stone' if char == '#' else 'platform', 'variant': 0, 'pos': [tx, ty]})
+    game.tilemap.collision_rects.build()
+    return game
+
+# Plays a plan out with the game's own player, inputs given between updates like the game's event loop does
+# Returns what MoveGraph.run would, the tile landed in and the tiles the middle of the player passed through
+def play(game, graph, x, y, plan):
+    direction, jump, air_jump, dash, climb = plan
+    w, h = PLAYER_SIZE
+    player = BasePlayer(game, (x, y), PLAYER_SIZE)
+    player.was_grounded = COYOTE_FRAMES
+    player.input_vector = [direction, 0]
+    player.flip = direction < 0
+    if jump == 'slide':
+        player.velocity[0] = SLIDE_SPEED * direction
+        player.slide_boost_timer = player.slide_boost_duration
+    if jump:
+        player.jump()
+    touched = set()
+    for frame in range(MAX_MOVE_FRAMES):
+        player.input_vector = [direction, 0]
+        if frame == dash and direction:
+            player.dash()
+        if frame == air_jump or (climb and player.wall_slide):
+            wall_slide = player.wall_slide
+            if player.jump() and wall_slide and climb == 'chimney':
+                direction = -direction
+        player.update(game.tilemap, (direction, 0))
+        touched.add((int((player.pos[0] + w / 2) // 16), int((player.pos[1] + h / 2) // 16)))
+        if game.dead:
+            return None, touched
+        if player.collisions['down'] and frame:
+            return graph.land(*player.pos), touched
+    return None, touched
+
+def test_moves_follow_the_player():
+    game = level_game()
+    graph = MoveGraph(game.tilemap)
+    plans = STANDING_PLANS + [plan[:4] + (climb,) for plan in STANDING_PLANS if plan[0] for climb in CLIMBS]
+    checked = 0
+    for ty in range(len(LEVEL)):
+        for tx in range(len(LEVEL[0])):
+            if not graph.standable(tx, ty):
+                continue
+            x, y = tx * 16 + (16 - PLAYER_SIZE[0]) / 2, (ty + 1) * 16 - PLAYER_SIZE[1]
+            for plan in plans:
+                landing, touched, _ = graph.run(x, y, plan)
+                assert (landing, touched) == play(game, graph, x, y, plan), (tx, ty, plan)
+                checked += 1
+    assert checked > 1000
+
+# Writes a level out as a map, spawners placed on the ground of their tiles
+def write_level(tmp_path, rows):
+    game = level_game(rows)
+    offgrid = []
+    for ty, row in enumerate(rows):
+        for tx, char in enumerate(row):
+            if char in 'PGY':
+                offgrid.append({'type': 'spawners', 'variant': 'PGOY'.index(char), 'pos': [tx * 16 + 4, ty * 16 + 1]})
+    path = tmp_path / 'level.json'
+    path.write_text(json.dumps({'tilemap': game.tilemap.grid_dict(), 'tile_size': 16, 'offgrid': offgrid}))
+    return str(path)
+
+def test_unreachable_enemies_are_only_warned_about(tmp_path):
+    path = write_level(tmp_path, [
+        '##############',
+        '#.......#....#',
+        '#.......#....#',
+        '#.P.....#.G..#',
+        '##############',
+    ])
+    problems, warnings = find_problems(path)
+    assert problems == []
+    assert warnings == ["Possibly unreachable enemy (gunner) at (164, 49)"]
+
+def test_enemies_are_met_where_they_walk_or_fly_to(tmp_path):
+    # The gunner walks the long floor out to the player, the yurei flies down to where it sees the player
+    path = write_level(tmp_path, [
+        '########################',
+        '#......................#',
+        '#...............Y......#',
+        '#......................#',
+        '#......................#',
+        '#.P..#.................#',
+        '######.................#',
+        '######..G..............#',
+        '########################',
+    ])
+    assert find_problems(path) == ([], [])
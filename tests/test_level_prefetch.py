@@ -0,0 +1,41 @@
+import threading
+from scripts.level_prefetch import LevelPrefetcher
+
+# Prepares levels only once the test lets each one finish, recording what was discarded
+class SlowLevels:
+    def __init__(self):
+        self.release = {}
+        self.discarded = []
+
+    def prepare(self, map_id):
+        self.release.setdefault(map_id, threading.Event()).wait(5)
+        return f'level {map_id}'
+
+    def finish(self, map_id):
+        self.release.setdefault(map_id, threading.Event()).set()
+
+def test_replaced_workers_never_hand_out_their_level():
+    levels = SlowLevels()
+    prefetcher = LevelPrefetcher(levels.prepare, levels.discarded.append)
+    prefetcher.start(1)
+    old_worker = prefetcher.thread
+    prefetcher.start(2)
+
+    # The new level finishes first and the worker for the old one after it
+    levels.finish(2)
+    prefetcher.thread.join()
+    levels.finish(1)
+    old_worker.join()
+    assert prefetcher.take(1) is None
+    assert prefetcher.take(2) == 'level 2'
+    assert levels.discarded == ['level 1']
+
+def test_take_waits_for_the_level_asked_for():
+    levels = SlowLevels()
+    prefetcher = LevelPrefetcher(levels.prepare, levels.discarded.append)
+    prefetcher.start(1)
+    prefetcher.start(2)
+    threading.Timer(0.05, levels.finish, (2,)).start()
+    assert prefetcher.take(2) == 'level 2'
+    levels.finish(1)
+    assert prefetcher.take(2) is None
@@ -0,0 +1,147 @@
+import glob
+import json
+import os
+import shutil
+import struct
+import types
+from array import array
+from scripts import map_format
+from scripts.map_format import HEADER, CHUNK_ENTRY, binary_path, read_map, source_key
+from scripts.tile_chunks import CHUNK_AREA
+from scripts.tilemap import Tilemap
+
+# A map using everything the format stores: flips, extra keys on grid and offgrid tiles, offgrid positions that are
+# whole numbers and ones that are not, tiles on both sides of the origin and tiles in the other layers
+MAP = {
+    'tilemap': {
+        '0;0': {'type': 'grass', 'variant': 1, 'pos': [0, 0]},
+        '1;0': {'type': 'stone', 'variant': 3, 'pos': [1, 0], 'flip_x': True, 'flip_y': False},
+        '-20;-3': {'type': 'grass', 'variant': 0, 'pos': [-20, -3], 'flip_y': True},
+        '40;7': {'type': 'platform', 'variant': 2, 'pos': [40, 7], 'door': 'north'},
+    },
+    'tile_size': 16,
+    'offgrid': [
+        {'type': 'spawners', 'variant': 0, 'pos': [20, 33]},
+        {'type': 'decor', 'variant': 4, 'pos': [-7.5, 12.25], 'flip_x': False},
+        {'type': 'spawners', 'variant': 2, 'pos': [300, -41.0], 'flip_x': True, 'flip_y': True, 'patrol': [1, 2]},
+    ],
+    'layers': {
+        'background': {
+            'tilemap': {'5;-2': {'type': 'stone', 'variant': 0, 'pos': [5, -2], 'flip_x': False}},
+            'offgrid': [{'type': 'large_decor', 'variant': 1, 'pos': [64.5, 80]}],
+        },
+        'foreground': {
+            'tilemap': {'-1;3': {'type': 'grass', 'variant': 7, 'pos': [-1, 3]}},
+            'offgrid': [],
+        },
+    },
+}
+
+# Writes a map out as JSON, returning its path
+def write_json(tmp_path, map_data, name='level.json'):
+    path = tmp_path / name
+    path.write_text(json.dumps(map_data))
+    return str(path)
+
+# Returns what a loaded tilemap holds in the map file layout, to compare with the JSON it came from
+def contents(tilemap):
+    return {'tilemap': tilemap.grid_dict(), 'tile_size': tilemap.tile_size, 'offgrid': tilemap.offgrid_tiles, 'layers': tilemap.layers_dict()}
+
+def test_json_maps_round_trip_through_binary(tmp_path):
+    path = write_json(tmp_path, MAP)
+    assert map_format.main([path]) == 0
+    assert read_map(binary_path(path), Tilemap(None), source_key(path))
+    tilemap = Tilemap(None)
+    tilemap.load(path)
+    assert contents(tilemap) == MAP
+
+    # Loaded from the binary copy, the type index and collision rects are the ones the JSON gives
+    from_json = Tilemap(None)
+    from_json.load(shutil.copy(path, str(tmp_path / 'copy.json')))
+    assert sorted(tilemap.get_grid_index().items()) == sorted(from_json.get_grid_index().items())
+    assert tilemap.collision_rects.export() == from_json.collision_rects.export()
+
+def test_writing_leaves_the_type_table_alone(tmp_path):
+    # Offgrid only types get ids in the file, not in the tilemap being written
+    path = write_json(tmp_path, MAP)
+    tilemap = Tilemap(None)
+    tilemap.load(path)
+    tile_types = list(tilemap.tile_types)
+    assert 'spawners' not in tile_types
+    map_format.write_map(binary_path(path), tilemap, source_key(path))
+    assert tilemap.tile_types == tile_types and len(tilemap.type_classes) == len(tile_types)
+    binary = Tilemap(None)
+    assert read_map(binary_path(path), binary, source_key(path))
+    assert contents(binary) == MAP
+
+def test_shipped_maps_round_trip_through_binary(tmp_path):
+    for source in sorted(glob.glob('data/maps/*.json')):
+        path = shutil.copy(source, tmp_path)
+        assert map_format.main([path]) == 0, source
+        with open(path) as f:
+            map_data = json.load(f)
+        tilemap = Tilemap(None)
+        tilemap.load(path)
+        assert contents(tilemap) == {'layers': {}, **map_data}, source
+
+def test_stale_binary_copies_are_not_loaded(tmp_path):
+    path = write_json(tmp_path, MAP)
+    map_format.main([path])
+    key = source_key(path)
+
+    # Edited to the same size, only the modification time tells the copy apart
+    edited = json.loads(json.dumps(MAP))
+    edited['tilemap']['0;0']['variant'] = 2
+    mtime = os.stat(path).st_mtime_ns
+    write_json(tmp_path, edited)
+    os.utime(path, ns=(mtime + 1000000, mtime + 1000000))
+    assert os.path.getsize(path) == struct.unpack_from('<Q', key)[0]
+    assert not read_map(binary_path(path), Tilemap(None), source_key(path))
+    tilemap = Tilemap(None)
+    tilemap.load(path)
+    assert contents(tilemap) == edited
+
+    # Saving refreshes the copy, which is then loaded again
+    tilemap.set_tile({'type': 'stone', 'variant': 5, 'pos': [2, 0]})
+    tilemap.save(path)
+    assert read_map(binary_path(path), Tilemap(None), source_key(path))
+    reloaded = Tilemap(None)
+    reloaded.load(path)
+    assert reloaded.grid_dict() == tilemap.grid_dict()
+
+# An array as a big endian host makes one, reading and writing raw bytes most significant byte first
+class BigEndianArray(array):
+    def __new__(cls, typecode, initializer=()):
+        values = super().__new__(cls, typecode, initializer)
+        if isinstance(initializer, (bytes, bytearray)):
+            values.byteswap()
+        return values
+
+    def tobytes(self):
+        swapped = array(self.typecode, self)
+        swapped.byteswap()
+        return swapped.tobytes()
+
+def test_binary_maps_are_little_endian_on_any_host(tmp_path, monkeypatch):
+    path = write_json(tmp_path, MAP)
+    map_format.main([path])
+    with open(binary_path(path), 'rb') as f:
+        data = f.read()
+
+    # The first chunk's type ids are stored least significant byte first
+    tilemap = Tilemap(None)
+    tilemap.load(path)
+    extras_size = HEADER.unpack_from(data)[7]
+    offset = HEADER.size + sum(1 + len(name) for name in tilemap.tile_types[1:]) + extras_size
+    cx, cy, count, chunk_offset = CHUNK_ENTRY.unpack_from(data, offset)
+    assert list(struct.unpack_from(f'<{CHUNK_AREA}H', data, chunk_offset)) == list(tilemap.chunks[(cx, cy)].types)
+
+    # A big endian host writes the same bytes and reads them back into the same map
+    monkeypatch.setattr(map_format, 'array', BigEndianArray)
+    monkeypatch.setattr(map_format, 'sys', types.SimpleNamespace(byteorder='big'))
+    big_endian = Tilemap(None)
+    big_endian.load(path)
+    assert contents(big_endian) == MAP
+    map_format.write_map(binary_path(path), big_endian, source_key(path))
+    with open(binary_path(path), 'rb') as f:
+        assert f.read() == data
@@ -0,0 +1,61 @@
+import types
+import pygame
+from scripts import tile_cache
+from scripts.tile_chunks import CHUNK_SIZE
+from scripts.tilemap import Tilemap
+
+# Returns a surface of one color, the size of a tile unless given
+def solid(color, size=(16, 16)):
+    surf = pygame.Surface(size, pygame.SRCALPHA)
+    surf.fill(color)
+    return surf
+
+# Returns the pixels of a surface, for comparing two drawings
+def pixels(surf):
+    return pygame.image.tobytes(surf, 'RGBA')
+
+def test_animated_tiles_cycle_their_frames(monkeypatch):
+    # Variant 0 cycles through three colors, variant 1 has no frame list and stays in the bake
+    game = types.SimpleNamespace(assets={
+        'water': [solid((255, 0, 0, 255)), solid((0, 255, 0, 255)), solid((0, 0, 255, 255))],
+    })
+    monkeypatch.setitem(tile_cache.ANIMATED_TILES, 'water', {'frames': [[0, 1, 2]], 'duration': 30})
+    frames = tile_cache.ANIMATED_TILES['water']
+    tilemap = Tilemap(game)
+    tilemap.set_tile({'type': 'water', 'variant': 0, 'pos': [2, 3]})
+    tilemap.set_tile({'type': 'water', 'variant': 1, 'pos': [4, 3]})
+
+    cells = tilemap.render_cache.get_animated((0, 0))
+    assert [(tx, ty) for tx, ty, _, _, _ in cells] == [(2, 3)]
+    for step in range(len(frames['frames'][0])):
+        tilemap.clock = step * frames['duration']
+        drawn = pygame.Surface((96, 96), pygame.SRCALPHA)
+        tilemap.render(drawn)
+        expected = pygame.Surface((96, 96), pygame.SRCALPHA)
+        expected.blit(game.assets['water'][frames['frames'][0][step]], (32, 48))
+        expected.blit(game.assets['water'][1], (64, 48))
+        assert pixels(drawn) == pixels(expected)
+
+def test_animated_tiles_are_drawn_in_chunk_order(monkeypatch):
+    # A 32 pixel animated tile on the last column of a chunk spills into the next chunk, whose tile is drawn after it
+    game = types.SimpleNamespace(assets={
+        'wide': [solid((255, 0, 0, 255), (32, 32)), solid((0, 0, 255, 255), (32, 32))],
+        'block': [solid((0, 255, 0, 255))],
+    })
+    monkeypatch.setitem(tile_cache.ANIMATED_TILES, 'wide', {'frames': [[0, 1]], 'duration': 4})
+    tilemap = Tilemap(game)
+    tilemap.set_tile({'type': 'wide', 'variant': 0, 'pos': [CHUNK_SIZE - 1, 0]})
+    tilemap.set_tile({'type': 'block', 'variant': 0, 'pos': [CHUNK_SIZE, 0]})
+    tilemap.set_tile({'type': 'block', 'variant': 0, 'pos': [CHUNK_SIZE - 1, 1]})
+
+    # Drawn tile by tile in column order, as the map has always been drawn, also with the animated tile's own chunk out of view
+    tiles = [('wide', None, (CHUNK_SIZE - 1, 0)), ('block', 0, (CHUNK_SIZE - 1, 1)), ('block', 0, (CHUNK_SIZE, 0))]
+    for offset in [((CHUNK_SIZE - 2) * 16, -16), (CHUNK_SIZE * 16, -16)]:
+        for clock, variant in [(0, 0), (4, 1)]:
+            tilemap.clock = clock
+            drawn = pygame.Surface((80, 64), pygame.SRCALPHA)
+            tilemap.render(drawn, offset=offset)
+            expected = pygame.Surface((80, 64), pygame.SRCALPHA)
+            for tile_type, tile_variant, (tx, ty) in tiles:
+                expected.blit(game.assets[tile_type][variant if tile_variant is None else tile_variant], (tx * 16 - offset[0], ty * 16 - offset[1]))
+            assert pixels(drawn) == pixels(expected)